@@ -23,6 +23,8 @@ from typing import Any, Dict, Iterable, List, Optional, Sequence, Type
 
 import aiohttp
 
+from pfmsoft.util.file.json_backend import get_json_backend
+
 logger = logging.getLogger(__name__)
 logger.addHandler(logging.NullHandler())
 
@@ -271,15 +273,16 @@ class PrintPageNumber(HttpResultHandlerABC):
 
 
 class ResponseToJson(HttpResultHandlerABC):
-    def __init__(self):
+    def __init__(self, json_backend: Optional[str] = "json"):
         super().__init__()
+        self.loads = get_json_backend(json_backend).loads
 
     async def handle_result(self, action, queue, response):
         logger.debug("In %s with action: %s", self.__class__.__name__, action.name)
         if response.status == 200:
             try:
                 json_data = {}
-                json_data = await response.json()
+                json_data = await response.json(loads=self.loads)
                 # assert len(json_data) > 1
                 action.context["response_json"] = json_data
             except Exception:
@@ -589,12 +592,24 @@ def write_list_of_dicts_to_csv(
     return total_count + 1
 
 
-def save_json(data: Any, file_path: Path, indent=2, sort_keys=False) -> bool:
+def save_json(
+    data: Any,
+    file_path: Path,
+    indent=2,
+    sort_keys=False,
+    json_backend: Optional[str] = "json",
+) -> bool:
     try:
         if not file_path.parent.exists():
             file_path.parent.mkdir(parents=True)
-        with open(file_path, "w") as json_file:
-            json.dump(data, json_file, indent=indent, sort_keys=sort_keys)
+        backend = get_json_backend(json_backend)
+        if backend.name == "json":
+            with open(file_path, "w") as json_file:
+                json.dump(data, json_file, indent=indent, sort_keys=sort_keys)
+        else:
+            json_text = backend.dumps(data, indent=indent, sort_keys=sort_keys)
+            with open(file_path, "w", encoding="utf8") as json_file:
+                json_file.write(json_text)
         return True
     except Exception as e:
         logger.exception("Error trying to save json data to %s", file_path)
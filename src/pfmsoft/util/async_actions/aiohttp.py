@@ -8,6 +8,8 @@ from typing import TYPE_CHECKING, Any, Dict, Optional, Sequence, Union
 from aiohttp import ClientResponse, ClientSession
 
 from pfmsoft.util.collection.misc import optional_object
+from pfmsoft.util.file.json_backend import get_json_backend
+from pfmsoft.util.file_hash.async_hash import AsyncFileHasher
 
 logger = logging.getLogger(__name__)
 
@@ -176,12 +178,52 @@ class AiohttpActionMessenger:
 
 
 class ResponseToJson(AiohttpActionCallback):
-    def __init__(self) -> None:
+    """
+    Decode the response body as json, and store it as the action result.
+
+    :param json_backend: The json library to use, see :func:`get_json_backend`.
+        ``None`` for the fastest installed. Defaults to "json", the standard library.
+    """
+
+    def __init__(self, json_backend: Optional[str] = "json") -> None:
+        super().__init__()
+        self.loads = get_json_backend(json_backend).loads
+
+    async def do_callback(self, caller: AiohttpAction, *args, **kwargs):
+        if caller.response is not None:
+            caller.result = await caller.response.json(loads=self.loads)
+
+
+class HashResponse(AiohttpActionCallback):
+    """
+    Hash the response body, and store the digest in the action context.
+
+    Hashing runs through an :class:`AsyncFileHasher`, so it does not block the
+    event loop. Share one hasher between callbacks to share its concurrency limit.
+
+    :param hash_method: The name of a hasher. Defaults to "sha256".
+    :param hasher: The :class:`AsyncFileHasher` to use. Defaults to a new hasher.
+    :param context_key: The key for the digest in `caller.context`.
+        Defaults to "response_hash".
+    """
+
+    def __init__(
+        self,
+        hash_method: str = "sha256",
+        hasher: Optional[AsyncFileHasher] = None,
+        context_key: str = "response_hash",
+    ) -> None:
         super().__init__()
+        self.hash_method = hash_method
+        self.hasher = optional_object(hasher, AsyncFileHasher)
+        self.context_key = context_key
 
     async def do_callback(self, caller: AiohttpAction, *args, **kwargs):
         if caller.response is not None:
-            caller.result = await caller.response.json()
+            data = await caller.response.read()
+            caller.context[self.context_key] = await self.hasher.hash_bytes(
+                data, self.hash_method
+            )
 
 
 class ResponseToText(AiohttpActionCallback):
@@ -0,0 +1,98 @@
+"""Open plain or compressed files through one function.
+
+The codec is picked from the file suffix, or given explicitly. gzip, bz2 and
+xz use the standard library. zstd needs the optional ``zstandard`` package, and
+is the only codec here that can compress with several threads.
+"""
+import bz2
+import gzip
+import logging
+import lzma
+from pathlib import Path
+from typing import IO, Optional
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - depends on the environment
+    zstandard = None
+
+#### setting up logger ####
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+#: Infer the compression from the file suffix.
+INFER = "infer"
+COMPRESSION_SUFFIXES = {".gz": "gzip", ".bz2": "bz2", ".xz": "xz", ".zst": "zstd"}
+COMPRESSIONS = tuple(COMPRESSION_SUFFIXES.values())
+
+
+def compression_from_suffix(file_path: Path) -> Optional[str]:
+    """
+    The compression of a file, from its suffix.
+
+    :param file_path: The :py:class:`pathlib.Path` of the file.
+    :return: One of :data:`COMPRESSIONS`, or ``None`` for an uncompressed file.
+    """
+    return COMPRESSION_SUFFIXES.get(file_path.suffix.lower())
+
+
+def open_compressed(
+    file_path: Path,
+    mode: str = "rt",
+    compression: Optional[str] = INFER,
+    level: Optional[int] = None,
+    threads: int = 0,
+    encoding: Optional[str] = None,
+    newline: Optional[str] = None,
+) -> IO:
+    """
+    Open a file, compressing or decompressing it as a stream.
+
+    :param file_path: The :py:class:`pathlib.Path` of the file.
+    :param mode: File mode as used in :func:`open`, e.g. 'rt', 'wt', 'xt', 'ab'.
+        Modes without 'b' are text modes. Defaults to 'rt'.
+    :param compression: One of :data:`COMPRESSIONS`, ``None`` for a plain file, or
+        :data:`INFER` to pick from the suffix. Defaults to :data:`INFER`.
+    :param level: The compression level when writing, ``None`` for the codec
+        default. For xz this is the preset. Defaults to ``None``.
+    :param threads: Worker threads for zstd compression, 0 for none, -1 for one
+        per cpu. Ignored by the other codecs. Defaults to 0.
+    :param encoding: The text encoding, as used in :func:`open`. Defaults to
+        ``None``.
+    :param newline: The newline handling, as used in :func:`open`. Defaults to
+        ``None``.
+    :raises ValueError: If the compression is unknown.
+    :raises ImportError: If zstd is used without the ``zstandard`` package.
+    :return: A file object.
+    """
+    if compression == INFER:
+        compression = compression_from_suffix(file_path)
+    text_options = {} if "b" in mode else {"encoding": encoding, "newline": newline}
+    if compression is None:
+        return open(file_path, mode, **text_options)
+    if "b" not in mode and "t" not in mode:
+        mode += "t"
+    writing = "r" not in mode
+    if compression == "gzip":
+        if level is None or not writing:
+            return gzip.open(file_path, mode, **text_options)
+        return gzip.open(file_path, mode, compresslevel=level, **text_options)
+    if compression == "bz2":
+        if level is None or not writing:
+            return bz2.open(file_path, mode, **text_options)
+        return bz2.open(file_path, mode, compresslevel=level, **text_options)
+    if compression == "xz":
+        preset = level if writing else None
+        return lzma.open(file_path, mode, preset=preset, **text_options)
+    if compression == "zstd":
+        if zstandard is None:
+            raise ImportError("zstd compression needs the zstandard package.")
+        if not writing:
+            return zstandard.open(file_path, mode, **text_options)
+        cctx = zstandard.ZstdCompressor(
+            level=3 if level is None else level, threads=threads
+        )
+        return zstandard.open(file_path, mode, cctx=cctx, **text_options)
+    raise ValueError(
+        f"Unknown compression {compression!r}, expected one of {COMPRESSIONS}."
+    )
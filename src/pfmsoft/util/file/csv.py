@@ -25,8 +25,11 @@ from typing import (
     Optional,
     Sequence,
     TextIO,
+    Union,
 )
 
+from pfmsoft.util.file.compression import INFER, open_compressed
+
 #### setting up logger ####
 logger = logging.getLogger(__name__)
 logger.addHandler(logging.NullHandler())
@@ -107,6 +110,9 @@ def write_list_to_csv(
     exist_ok: bool = True,
     has_header: bool = True,
     headers: Optional[Sequence[str]] = None,
+    compression: Optional[str] = INFER,
+    compression_level: Optional[int] = None,
+    compression_threads: int = 0,
 ) -> int:
     """
     Writes an iterator of lists to a file in csv format.
@@ -118,6 +124,11 @@ def write_list_to_csv(
     :param exist_ok: [description], by default True
     :param has_header: First row of supplied data is the header, by default True
     :param headers: Headers to use if not supplied in data, by default None
+    :param compression: Compression of the file, see :func:`open_compressed`, by
+        default inferred from the suffix, e.g. ".csv.gz"
+    :param compression_level: Compression level, by default None, the codec default
+    :param compression_threads: Compression threads, where the codec supports them,
+        by default 0
     :returns: Number of rows saved, not including a header
     :raises ValueError: Number of items in a row does not match number of headers.
     """
@@ -127,7 +138,15 @@ def write_list_to_csv(
             raise ValueError(f"Unsupported file mode '{mode}'.")
         if parents:
             file_path.parent.mkdir(parents=parents, exist_ok=exist_ok)
-        with file_path.open(mode, encoding="utf8", newline="") as file_out:
+        with open_compressed(
+            file_path,
+            mode,
+            compression,
+            level=compression_level,
+            threads=compression_threads,
+            encoding="utf8",
+            newline="",
+        ) as file_out:
             writer = csv.writer(file_out)
             iterable_data = iter(data)
 
@@ -160,21 +179,54 @@ def write_list_to_csv(
 
 
 def read_csv_to_row_factory(
-    file_in: TextIO,
+    file_in: Union[TextIO, Path],
     row_factory: Callable[[Sequence[str], dict], Any],
     headers_in_first_row: bool = True,
     context: Optional[dict] = None,
+    compression: Optional[str] = INFER,
 ) -> Generator[Any, None, None]:
+    """
+    Read csv rows through a factory made by `row_factory`.
+
+    :param file_in: An open text file, or the :py:class:`pathlib.Path` of a csv
+        file, which may be compressed. A path is opened when the first row is
+        read, and closed when the rows are exhausted.
+    :param row_factory: Makes a row factory from the headers and `context`.
+    :param headers_in_first_row: The first row holds the headers, by default True
+    :param context: Passed to `row_factory`, by default None
+    :param compression: Compression of a file given by path, see
+        :func:`open_compressed`, by default inferred from the suffix
+    :return: A generator of rows.
+    """
     # TODO change context to header or header_override
     if context is None:
         context = {}
+    if isinstance(file_in, Path):
+        return _read_csv_file_to_row_factory(
+            file_in, row_factory, headers_in_first_row, context, compression
+        )
     reader = csv.reader(file_in)
     if headers_in_first_row:
         headers = next(reader)
     else:
         headers = []
     factory = row_factory(headers, context)
-    return (factory(*row) for row in reader)
+    return (factory(row) for row in reader)
+
+
+def _read_csv_file_to_row_factory(
+    file_path: Path,
+    row_factory: Callable[[Sequence[str], dict], Any],
+    headers_in_first_row: bool,
+    context: dict,
+    compression: Optional[str],
+) -> Generator[Any, None, None]:
+    with open_compressed(
+        file_path, "rt", compression, encoding="utf8", newline=""
+    ) as file_in:
+        yield from read_csv_to_row_factory(
+            file_in, row_factory, headers_in_first_row, context
+        )
 
 
 def named_tuple_factory(headers, context):
@@ -0,0 +1,249 @@
+"""Read a large csv file with a :class:`RecordReader` across a pool of processes.
+
+The file is split into byte ranges that start and end on record boundaries.
+A newline only ends a record if it is outside quotes, which is found by
+counting quote characters from the previous boundary. An escaped quote is two
+quote characters, so it never changes the count's parity. Each range is
+then parsed with :func:`csv.reader` in a worker process, by a copy of the
+given :class:`RecordReader`.
+"""
+import copy
+import csv
+import io
+import logging
+import mmap
+import os
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from itertools import chain
+from pathlib import Path
+from typing import (
+    Any,
+    Deque,
+    Dict,
+    Generator,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+from pfmsoft.util.file.csv_record import RecordReader
+
+#### setting up logger ####
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+DEFAULT_CHUNK_SIZE = 16 * 1024 * 1024
+
+
+def _boundary_after(data: mmap.mmap, start: int, target: int, quote: bytes) -> int:
+    # `start` is a record boundary, so quotes are balanced there.
+    parity = data[start:target].count(quote) & 1
+    position = target
+    while True:
+        newline = data.find(b"\n", position)
+        if newline == -1:
+            return len(data)
+        parity ^= data[position:newline].count(quote) & 1
+        if not parity:
+            return newline + 1
+        position = newline + 1
+
+
+def record_boundaries(
+    file_path: Path,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    skip_header: bool = False,
+    quotechar: str = '"',
+) -> List[int]:
+    """
+    Find byte offsets that split a csv file into chunks of whole records.
+
+    The file must use an ascii compatible encoding, such as utf8, so the quote
+    and newline bytes can not be part of another character.
+
+    :param file_path: The :py:class:`pathlib.Path` to the csv file.
+    :param chunk_size: The approximate size of each chunk in bytes. Defaults to 16 MiB.
+    :param skip_header: Start the first chunk after the first record. Defaults to
+        ``False``.
+    :param quotechar: The csv quote character. Defaults to '"'.
+    :raises ValueError: If `chunk_size` is less than 1.
+    :return: The offsets, from the start of the first chunk to the end of the file.
+        Chunk `n` is the bytes from offset `n` up to offset `n + 1`.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1.")
+    quote = quotechar.encode("ascii")
+    with open(file_path, "rb") as file_in:
+        if os.fstat(file_in.fileno()).st_size == 0:
+            return [0]
+        with mmap.mmap(file_in.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            position = _boundary_after(data, 0, 0, quote) if skip_header else 0
+            boundaries = [position]
+            while position < len(data):
+                target = position + chunk_size
+                if target >= len(data):
+                    position = len(data)
+                else:
+                    position = _boundary_after(data, position, target, quote)
+                boundaries.append(position)
+    return boundaries
+
+
+def read_records_from_range(
+    file_path: Path,
+    start: int,
+    end: int,
+    record_reader: RecordReader,
+    headers: Optional[Sequence[str]] = None,
+    encoding: str = "utf8",
+    **fmtparams,
+) -> List[Any]:
+    """
+    Read the records in a byte range of a csv file.
+
+    :param file_path: The :py:class:`pathlib.Path` to the csv file.
+    :param start: The offset of the first record, see :func:`record_boundaries`.
+    :param end: The offset after the last record.
+    :param record_reader: The :class:`RecordReader` to make the records.
+    :param headers: The header row, passed to `record_reader` ahead of the records
+        if it reads headers in the first row. Defaults to ``None``.
+    :param encoding: The file encoding. Defaults to "utf8".
+    :param `**fmtparams`: Formatting parameters for :func:`csv.reader`.
+    :return: The records.
+    """
+    with open(file_path, "rb") as file_in:
+        file_in.seek(start)
+        text = file_in.read(end - start).decode(encoding)
+    rows = csv.reader(io.StringIO(text, newline=""), **fmtparams)
+    if headers is not None:
+        rows = chain([headers], rows)
+    return list(record_reader.read_records(rows))
+
+
+def parallel_read_records(
+    file_path: Path,
+    record_reader: RecordReader,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    max_workers: Optional[int] = None,
+    ordered: bool = True,
+    max_in_flight: Optional[int] = None,
+    encoding: str = "utf8",
+    **fmtparams,
+) -> Iterator[Any]:
+    """
+    Read the records of a csv file in parallel, a parallel counterpart to
+    :func:`read_records_from_file`.
+
+    Each worker gets a copy of `record_reader`, made before it reads anything, so
+    the reader and its records must be picklable. Records made by
+    :class:`NamedTupleRecordReader` are not, as their class is made at run time.
+    The `line_no` passed to a record factory counts from the start of each chunk.
+    Arguments are checked, and the chunk boundaries and headers read, when this
+    is called. After that, `record_reader.headers()` returns the headers.
+
+    :param file_path: The :py:class:`pathlib.Path` to the csv file.
+    :param record_reader: The :class:`RecordReader` to make the records.
+    :param chunk_size: The approximate size of each chunk in bytes. Defaults to 16 MiB.
+    :param max_workers: Number of worker processes. Defaults to ``os.cpu_count()``.
+    :param ordered: Yield records in file order, otherwise yield each chunk of
+        records as it completes. Defaults to ``True``.
+    :param max_in_flight: Maximum number of chunks submitted but not yet yielded.
+        Defaults to twice `max_workers`.
+    :param encoding: The file encoding, which must be ascii compatible. Defaults to
+        "utf8".
+    :param `**fmtparams`: Formatting parameters for :func:`csv.reader`.
+    :raises ValueError: If `max_workers` or `max_in_flight` is less than 1.
+    :return: An iterator of the records.
+    """
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    if max_in_flight is None:
+        max_in_flight = max_workers * 2
+    if max_workers < 1 or max_in_flight < 1:
+        raise ValueError("max_workers and max_in_flight must be at least 1.")
+    worker_reader = copy.copy(record_reader)
+    headers_first = record_reader.read_headers_in_first_row
+    boundaries = record_boundaries(
+        file_path,
+        chunk_size,
+        skip_header=headers_first,
+        quotechar=fmtparams.get("quotechar", '"'),
+    )
+    headers = None
+    if headers_first:
+        with open(file_path, "rb") as file_in:
+            header_text = file_in.read(boundaries[0]).decode(encoding)
+        headers = next(
+            csv.reader(io.StringIO(header_text, newline=""), **fmtparams), []
+        )
+        # Set up the callers reader as if it had read the file itself.
+        record_reader.record_factory = record_reader._init_record_factory(headers)
+    ranges = list(zip(boundaries, boundaries[1:]))
+    return _parallel_records(
+        file_path,
+        ranges,
+        worker_reader,
+        headers,
+        max_workers,
+        ordered,
+        max_in_flight,
+        encoding,
+        fmtparams,
+    )
+
+
+def _parallel_records(
+    file_path: Path,
+    ranges: List[Tuple[int, int]],
+    worker_reader: RecordReader,
+    headers: Optional[List[str]],
+    max_workers: int,
+    ordered: bool,
+    max_in_flight: int,
+    encoding: str,
+    fmtparams: Dict[str, Any],
+) -> Generator[Any, None, None]:
+    # The pool is only started once iteration begins, so an unused generator
+    # leaves nothing to shut down.
+    executor = ProcessPoolExecutor(max_workers=max_workers)
+
+    def submit(byte_range: Tuple[int, int]) -> Future:
+        return executor.submit(
+            read_records_from_range,
+            file_path,
+            byte_range[0],
+            byte_range[1],
+            worker_reader,
+            headers,
+            encoding,
+            **fmtparams,
+        )
+
+    pending_ordered: Deque[Future] = deque()
+    pending: Set[Future] = set()
+    try:
+        for byte_range in ranges:
+            if ordered:
+                pending_ordered.append(submit(byte_range))
+                if len(pending_ordered) >= max_in_flight:
+                    yield from pending_ordered.popleft().result()
+                continue
+            pending.add(submit(byte_range))
+            if len(pending) >= max_in_flight:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from future.result()
+        while pending_ordered:
+            yield from pending_ordered.popleft().result()
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield from future.result()
+    finally:
+        for future in chain(pending_ordered, pending):
+            future.cancel()
+        executor.shutdown(wait=True)
@@ -5,17 +5,38 @@ regular csv util library.
 
 """
 import csv
+import keyword
 import logging
 from abc import ABC, abstractmethod
 from collections import namedtuple
 from dataclasses import dataclass
+from itertools import islice
 from pathlib import Path
-from typing import Any, Callable, Generator, Iterable, Optional, Sequence, Type
+from time import perf_counter
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generator,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+)
+
+from pfmsoft.util.file.read_write import open_for_save
 
 #### setting up logger ####
 logger = logging.getLogger(__name__)
 logger.addHandler(logging.NullHandler())
 
+# Marks a :class:`Column` without a default, as ``None`` is a valid default.
+_NO_DEFAULT = object()
+
 
 @dataclass
 class RemappedHeader:
@@ -188,6 +209,287 @@ class NamedTupleRecordWriter(RecordWriter):
         return record_factory
 
 
+def _record_repr(self) -> str:
+    values = ", ".join(f"{x}={getattr(self, x)!r}" for x in self._fields)
+    return f"{type(self).__name__}({values})"
+
+
+def _record_eq(self, other) -> Any:
+    if type(other) is not type(self):
+        return NotImplemented
+    return tuple(self) == tuple(other)
+
+
+def _record_iter(self) -> Iterator[Any]:
+    return (getattr(self, x) for x in self._fields)
+
+
+def _record_asdict(self) -> Dict[str, Any]:
+    return dict(zip(self._fields, self))
+
+
+def make_record_class(
+    class_name: str,
+    fields: Sequence[str],
+    converters: Optional[Dict[str, Callable[[str], Any]]] = None,
+) -> type:
+    """
+    Compile a row class with `__slots__` for a set of fields.
+
+    The generated `__init__` takes the fields positionally and assigns each one,
+    through its converter if it has one, so making a record is a single
+    constructor call. Instances have no `__dict__`, so they are much smaller than
+    a dict per row. Like a namedtuple class, a generated class can not be pickled
+    by reference.
+
+    :param class_name: The name of the class.
+    :param fields: The field names, valid identifiers not starting with "_".
+    :param converters: A dict of field name to a function that converts the csv
+        string, e.g. ``{"price": float}``. Defaults to ``None``, no conversion.
+    :raises ValueError: If a field name is invalid or repeated, or a converter
+        names an unknown field.
+    :return: The row class.
+    """
+    fields = tuple(fields)
+    converters = converters or {}
+    for name in fields:
+        if not name.isidentifier() or keyword.iskeyword(name) or name.startswith("_"):
+            raise ValueError(f"{name!r} is not a valid record field name.")
+    if len(set(fields)) != len(fields):
+        raise ValueError(f"Record field names are repeated in {fields}.")
+    unknown = set(converters).difference(fields)
+    if unknown:
+        raise ValueError(f"Converters given for unknown fields {sorted(unknown)}.")
+    namespace: Dict[str, Any] = {}
+    lines = [f"def __init__(_self, {', '.join(fields)}):"]
+    for index, name in enumerate(fields):
+        if name in converters:
+            namespace[f"_convert_{index}"] = converters[name]
+            lines.append(f"    _self.{name} = _convert_{index}({name})")
+        else:
+            lines.append(f"    _self.{name} = {name}")
+    if not fields:
+        lines.append("    pass")
+    exec("\n".join(lines), namespace)  # pylint: disable=exec-used
+    return type(
+        class_name,
+        (),
+        {
+            "__slots__": fields,
+            "_fields": fields,
+            "__init__": namespace["__init__"],
+            "__repr__": _record_repr,
+            "__eq__": _record_eq,
+            "__iter__": _record_iter,
+            "_asdict": _record_asdict,
+        },
+    )
+
+
+class SlotsRecordReader(RecordReader):
+    """
+    Read records as instances of a row class compiled from the headers.
+
+    See :func:`make_record_class`. The class, and the converter for each column,
+    are chosen once when the headers are read.
+
+    :param read_headers_in_first_row: Read the headers from the first row.
+        Defaults to ``True``.
+    :param remapped_headers: Headers to use instead, their `data_field` names the
+        record fields. Defaults to ``None``.
+    :param record_class_name: The name of the row class. Defaults to "Record".
+    :param converters: A dict of field name to converter for that column. Defaults
+        to ``None``, all values stay strings.
+    """
+
+    def __init__(
+        self,
+        read_headers_in_first_row=True,
+        remapped_headers=None,
+        record_class_name: str = "Record",
+        converters: Optional[Dict[str, Callable[[str], Any]]] = None,
+    ):
+        self.record_class_name: str = record_class_name
+        self.converters = converters
+        self.record_class: Optional[type] = None
+        super().__init__(
+            read_headers_in_first_row=read_headers_in_first_row,
+            remapped_headers=remapped_headers,
+        )
+
+    def _init_record_factory(self, record) -> Callable[[int, Sequence[str]], Any]:
+        if self.read_headers_in_first_row:
+            self._headers = record
+        self._remap_headers()
+        record_class = make_record_class(
+            self.record_class_name, self._headers, self.converters
+        )
+        self.record_class = record_class
+
+        def record_factory(line_no, record):
+            _ = line_no
+            return record_class(*record)
+
+        return record_factory
+
+
+@dataclass
+class Column:
+    """
+    A column of a :class:`RecordSchema`.
+
+    :param file_field: The column header in the file.
+    :param converter: Converts the csv string, e.g. ``int``. Defaults to ``None``,
+        the value stays a string.
+    :param default: The value used when the csv field is empty, which may be
+        ``None``. Defaults to no default, an empty field is passed to the converter.
+    :param data_field: The field name in the record. Defaults to `file_field`.
+    :param index: The position of the column in the file, for files without a
+        header row. Defaults to ``None``, found from the headers.
+    """
+
+    file_field: str
+    converter: Optional[Callable[[str], Any]] = None
+    default: Any = _NO_DEFAULT
+    data_field: Optional[str] = None
+    index: Optional[int] = None
+
+    @property
+    def field_name(self) -> str:
+        return self.file_field if self.data_field is None else self.data_field
+
+
+class RecordSchema:
+    """
+    The columns to read from a csv file, with their types and defaults.
+
+    Only the declared columns are picked from each row, and their converters run
+    before the record is made. Other columns are never converted or stored.
+
+    :param columns: The columns, in record field order.
+    :raises ValueError: If a record field name is repeated.
+    """
+
+    def __init__(self, columns: Sequence[Column]):
+        self.columns: Tuple[Column, ...] = tuple(columns)
+        names = self.field_names()
+        if len(set(names)) != len(names):
+            raise ValueError(f"Record field names are repeated in {names}.")
+
+    def field_names(self) -> Tuple[str, ...]:
+        return tuple(x.field_name for x in self.columns)
+
+    def project(self, field_names: Sequence[str]) -> "RecordSchema":
+        """
+        A schema with only some of the columns.
+
+        :param field_names: The record field names to keep, in the new order.
+        :raises KeyError: If a name is not in the schema.
+        :return: The new schema.
+        """
+        by_name = {x.field_name: x for x in self.columns}
+        return RecordSchema([by_name[x] for x in field_names])
+
+    def column_indexes(self, headers: Sequence[str]) -> List[int]:
+        """
+        Find the position of each column in a row.
+
+        :param headers: The file headers, may be empty if every column has an
+            `index`.
+        :raises ValueError: If a column is not in the headers.
+        :return: The positions, in schema order.
+        """
+        positions = {name: index for index, name in enumerate(headers)}
+        indexes = []
+        for column in self.columns:
+            if column.index is not None:
+                indexes.append(column.index)
+            elif column.file_field in positions:
+                indexes.append(positions[column.file_field])
+            else:
+                raise ValueError(
+                    f"Column {column.file_field!r} is not in the headers {headers}."
+                )
+        return indexes
+
+    def compile_projection(
+        self, headers: Sequence[str]
+    ) -> Callable[[Sequence[str]], Tuple[Any, ...]]:
+        """
+        Compile a function that picks and converts the columns of a row.
+
+        :param headers: The file headers, see :meth:`column_indexes`.
+        :return: A function of a csv row, returning a tuple of converted values.
+        """
+        namespace: Dict[str, Any] = {}
+        values = []
+        for position, (column, index) in enumerate(
+            zip(self.columns, self.column_indexes(headers))
+        ):
+            value = f"row[{index}]"
+            if column.converter is not None and column.converter is not str:
+                namespace[f"_convert_{position}"] = column.converter
+                value = f"_convert_{position}({value})"
+            if column.default is not _NO_DEFAULT:
+                namespace[f"_default_{position}"] = column.default
+                value = f"({value} if row[{index}] else _default_{position})"
+            values.append(value)
+        source = f"def project(row):\n    return ({', '.join(values)},)"
+        if not values:
+            source = "def project(row):\n    return ()"
+        exec(source, namespace)  # pylint: disable=exec-used
+        return namespace["project"]
+
+
+class SchemaRecordReader(RecordReader):
+    """
+    Read only the columns of a :class:`RecordSchema`, converted to their types.
+
+    Records are instances of a row class from :func:`make_record_class`, or
+    plain tuples.
+
+    :param schema: The columns to read.
+    :param read_headers_in_first_row: Find columns by the headers in the first row.
+        Otherwise each column needs an `index`. Defaults to ``True``.
+    :param record_class_name: The name of the row class. Defaults to "Record".
+    :param as_tuple: Make tuples instead of row class instances. Defaults to
+        ``False``.
+    """
+
+    def __init__(
+        self,
+        schema: RecordSchema,
+        read_headers_in_first_row=True,
+        record_class_name: str = "Record",
+        as_tuple: bool = False,
+    ):
+        self.schema = schema
+        self.record_class_name: str = record_class_name
+        self.as_tuple = as_tuple
+        self.record_class: Optional[type] = None
+        super().__init__(read_headers_in_first_row=read_headers_in_first_row)
+
+    def _init_record_factory(self, record) -> Callable[[int, Sequence[str]], Any]:
+        file_headers = record if self.read_headers_in_first_row else []
+        project = self.schema.compile_projection(file_headers)
+        self._headers = self.schema.field_names()
+        if self.as_tuple:
+
+            def tuple_factory(line_no, record):
+                _ = line_no
+                return project(record)
+
+            return tuple_factory
+        record_class = make_record_class(self.record_class_name, self._headers)
+        self.record_class = record_class
+
+        def record_factory(line_no, record):
+            _ = line_no
+            return record_class(*project(record))
+
+        return record_factory
+
+
 class TupleRecordReader(RecordReader):
     def __init__(self, read_headers_in_first_row=True, remapped_headers=None):
         super().__init__(
@@ -265,9 +567,152 @@ def write_record_to_csv(
     return total_count + 1
 
 
+class WriteStats(NamedTuple):
+    """
+    The result of a bulk write.
+
+    :param rows: Number of records written, not counting the header.
+    :param seconds: Time taken.
+    """
+
+    rows: int
+    seconds: float
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+def bulk_write_record_to_csv(
+    file_path: Path,
+    record_writer: RecordWriter,
+    header_in_first_line: bool = True,
+    parents: bool = False,
+    exist_ok: bool = True,
+    batch_size: int = 10000,
+    buffer_size: int = 1024 * 1024,
+    atomic: bool = False,
+    **fmtparams,
+) -> WriteStats:
+    """
+    Write records to csv in batches, a faster :func:`write_record_to_csv`.
+
+    Records are pulled from :meth:`RecordWriter.write_records` `batch_size` at a
+    time and written with a single :meth:`csv.writer.writerows` call, through a
+    file buffer of `buffer_size` bytes.
+
+    :param file_path: Output :py:class:`pathlib.Path` of the csv file.
+    :param record_writer: The :class:`RecordWriter` with the records to write.
+    :param header_in_first_line: Write the writer's headers first. Defaults to
+        ``True``.
+    :param parents: Make parent directories if they don't exist. As used by
+        :func:`pathlib.Path.mkdir()`. Defaults to ``False``.
+    :param exist_ok: Suppress exception if parent directory exists as directory.
+        As used by :func:`pathlib.Path.mkdir`. Defaults to ``True``.
+    :param batch_size: Number of records per `writerows` call. Defaults to 10000.
+    :param buffer_size: Size of the file buffer in bytes. Defaults to 1 MiB.
+    :param atomic: Write to a temporary file next to `file_path`, and rename it
+        into place when done, so a partial file is never seen at `file_path`. See
+        :func:`open_for_save`. Defaults to ``False``.
+    :param `**fmtparams`: Formatting parameters for :func:`csv.writer`.
+    :raises ValueError: If `batch_size` is less than 1.
+    :return: The number of records written, and the time taken.
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1.")
+    start = perf_counter()
+    if parents:
+        file_path.parent.mkdir(parents=parents, exist_ok=exist_ok)
+    rows = 0
+    try:
+        with open_for_save(
+            file_path,
+            "w",
+            atomic=atomic,
+            encoding="utf8",
+            newline="",
+            buffering=buffer_size,
+        ) as file_out:
+            writer = csv.writer(file_out, **fmtparams)
+            records = record_writer.write_records()
+            batch = list(islice(records, batch_size))
+            if batch and header_in_first_line:
+                writer.writerow(record_writer.headers())
+            while batch:
+                writer.writerows(batch)
+                rows += len(batch)
+                batch = list(islice(records, batch_size))
+    except Exception as error:
+        logger.exception("Error trying to write csv records to %s", file_path)
+        raise error
+    stats = WriteStats(rows, perf_counter() - start)
+    logger.info(
+        "Wrote %d rows to %s in %.3f seconds, %.0f rows/s.",
+        stats.rows,
+        file_path,
+        stats.seconds,
+        stats.rows_per_second,
+    )
+    return stats
+
+
 def read_records_from_file(file_path: Path, record_reader: RecordReader):
-    data = []
-    with file_path.open("r") as file_in:
-        csv_reader = csv.reader(file_in)
-        data = [x for x in record_reader.read_records(csv_reader)]
+    data = list(
+        iter_records_from_file(file_path, record_reader, encoding=None, newline=None)
+    )
     return data
+
+
+def iter_records_from_file(
+    file_path: Path,
+    record_reader: RecordReader,
+    batch_size: Optional[int] = None,
+    encoding: Optional[str] = "utf8",
+    newline: Optional[str] = "",
+    **fmtparams,
+) -> Iterator[Any]:
+    """
+    Lazily read the records of a csv file, a streaming :func:`read_records_from_file`.
+
+    Only the current record, or batch of records, is held in memory. The file is
+    closed when the generator is exhausted, closed, or garbage collected, so a
+    loop can stop early without leaking the file handle. Arguments are checked
+    when this is called, the file is opened once iteration begins.
+
+    :param file_path: The :py:class:`pathlib.Path` to the csv file.
+    :param record_reader: The :class:`RecordReader` to make the records.
+    :param batch_size: Yield lists of up to `batch_size` records instead of single
+        records. Defaults to ``None``, single records.
+    :param encoding: The file encoding, ``None`` for the platform default. Defaults
+        to "utf8".
+    :param newline: The `newline` argument of :func:`open`. The csv module expects
+        "", which keeps newlines inside quoted fields as written. Defaults to "".
+    :param `**fmtparams`: Formatting parameters for :func:`csv.reader`.
+    :raises ValueError: If `batch_size` is less than 1.
+    :return: An iterator of the records, or lists of records.
+    """
+    if batch_size is not None and batch_size < 1:
+        raise ValueError("batch_size must be at least 1.")
+    return _iter_records(
+        file_path, record_reader, batch_size, encoding, newline, fmtparams
+    )
+
+
+def _iter_records(
+    file_path: Path,
+    record_reader: RecordReader,
+    batch_size: Optional[int],
+    encoding: Optional[str],
+    newline: Optional[str],
+    fmtparams: Dict[str, Any],
+) -> Generator[Any, None, None]:
+    with file_path.open("r", encoding=encoding, newline=newline) as file_in:
+        records = record_reader.read_records(csv.reader(file_in, **fmtparams))
+        if batch_size is None:
+            yield from records
+            return
+        while True:
+            batch = list(islice(records, batch_size))
+            if not batch:
+                return
+            yield batch
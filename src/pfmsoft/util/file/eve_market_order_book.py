@@ -0,0 +1,374 @@
+"""Indexes and order books over market orders, for best price queries without scans.
+
+A :class:`MarketOrderIndex` keeps hash indexes of orders by type, location and
+system, and an :class:`OrderBook` for each type at each location. Each book has
+a sorted :class:`PriceLadder` per side, so best bid, best ask and spread are
+constant time, and the volume at or better than a price is a prefix sum over a
+Fenwick tree, logarithmic in the number of price levels.
+Orders can be added and removed one at a time, e.g. as they stream from
+:meth:`MarketOrderRecordReader.read_records`.
+"""
+import logging
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pfmsoft.util.file.eve_market_orders import MarketOrder
+
+#### setting up logger ####
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+
+class PriceLevel:
+    """
+    The orders at one price on one side of a book.
+
+    :param price: The price.
+    :param volume: The total `volume_remain` of the orders.
+    :param order_count: The number of orders.
+    """
+
+    __slots__ = ("price", "volume", "order_count")
+
+    def __init__(self, price: float, volume: int = 0, order_count: int = 0):
+        self.price = price
+        self.volume = volume
+        self.order_count = order_count
+
+    def __repr__(self):
+        return (
+            f"<PriceLevel(price={self.price}, volume={self.volume}, "
+            f"order_count={self.order_count})>"
+        )
+
+
+class PriceLadder:
+    """
+    The price levels of one side of a book, kept sorted by price.
+
+    Adding or removing an order at an existing price is O(log levels). A new or
+    emptied price level is O(levels), to keep the prices sorted, and the next
+    :meth:`depth` rebuilds the volume prefix sums in O(levels). :meth:`depth` is
+    otherwise O(log levels).
+
+    :param is_buy_order: ``True`` for bids, where the best price is the highest.
+        ``False`` for asks, where the best price is the lowest.
+    """
+
+    def __init__(self, is_buy_order: bool):
+        self.is_buy_order = is_buy_order
+        self.prices: List[float] = []
+        self.levels: Dict[float, PriceLevel] = {}
+        # Fenwick tree of volumes, by position in prices. None when out of date.
+        self._tree: Optional[List[int]] = None
+
+    def __len__(self) -> int:
+        return len(self.prices)
+
+    def __iter__(self) -> Iterator[PriceLevel]:
+        """Iterate over the levels, best price first."""
+        prices = reversed(self.prices) if self.is_buy_order else iter(self.prices)
+        return (self.levels[x] for x in prices)
+
+    def add(self, price: float, volume: int):
+        """
+        Add an order to the ladder.
+
+        :param price: The order price.
+        :param volume: The order `volume_remain`.
+        """
+        level = self.levels.get(price)
+        if level is None:
+            level = self.levels[price] = PriceLevel(price)
+            insort(self.prices, price)
+            self._tree = None
+        elif self._tree is not None:
+            self._update_tree(price, volume)
+        level.volume += volume
+        level.order_count += 1
+
+    def remove(self, price: float, volume: int):
+        """
+        Remove an order from the ladder.
+
+        :param price: The order price.
+        :param volume: The order `volume_remain`, as it was added.
+        :raises KeyError: If there are no orders at the price.
+        """
+        level = self.levels[price]
+        level.volume -= volume
+        level.order_count -= 1
+        if level.order_count == 0:
+            del self.levels[price]
+            del self.prices[bisect_left(self.prices, price)]
+            self._tree = None
+        elif self._tree is not None:
+            self._update_tree(price, -volume)
+
+    @property
+    def best_price(self) -> Optional[float]:
+        """The best price, or ``None`` if the ladder is empty."""
+        if not self.prices:
+            return None
+        return self.prices[-1] if self.is_buy_order else self.prices[0]
+
+    def volume_at(self, price: float) -> int:
+        """
+        The volume at exactly a price.
+
+        :param price: The price.
+        :return: The total `volume_remain` at the price.
+        """
+        level = self.levels.get(price)
+        return 0 if level is None else level.volume
+
+    def depth(self, limit_price: float) -> int:
+        """
+        The volume at prices as good as or better than a limit.
+
+        That is the volume a counter order at `limit_price` could fill.
+
+        :param limit_price: The worst price to include.
+        :return: The total `volume_remain` of the included levels.
+        """
+        if self.is_buy_order:
+            return self._prefix_volume(len(self.prices)) - self._prefix_volume(
+                bisect_left(self.prices, limit_price)
+            )
+        return self._prefix_volume(bisect_right(self.prices, limit_price))
+
+    def _build_tree(self) -> List[int]:
+        size = len(self.prices)
+        tree = [0] * (size + 1)
+        for position, price in enumerate(self.prices, start=1):
+            tree[position] += self.levels[price].volume
+            parent = position + (position & -position)
+            if parent <= size:
+                tree[parent] += tree[position]
+        self._tree = tree
+        return tree
+
+    def _update_tree(self, price: float, volume: int):
+        tree = self._tree
+        position = bisect_left(self.prices, price) + 1
+        while position < len(tree):
+            tree[position] += volume
+            position += position & -position
+
+    def _prefix_volume(self, count: int) -> int:
+        # The volume of the first count prices.
+        tree = self._tree if self._tree is not None else self._build_tree()
+        total = 0
+        while count:
+            total += tree[count]
+            count -= count & -count
+        return total
+
+
+class OrderBook:
+    """
+    The buy and sell orders for one type at one location.
+
+    :param type_id: The type of the orders.
+    :param location_id: The location of the orders.
+    """
+
+    def __init__(self, type_id: int, location_id: int):
+        self.type_id = type_id
+        self.location_id = location_id
+        self.bids = PriceLadder(is_buy_order=True)
+        self.asks = PriceLadder(is_buy_order=False)
+
+    def __repr__(self):
+        return (
+            f"<OrderBook(type_id={self.type_id}, location_id={self.location_id}, "
+            f"best_bid={self.best_bid}, best_ask={self.best_ask})>"
+        )
+
+    def side(self, is_buy_order: bool) -> PriceLadder:
+        """The ladder for buy orders, or sell orders."""
+        return self.bids if is_buy_order else self.asks
+
+    def add(self, order: MarketOrder):
+        """Add an order to its side of the book."""
+        self.side(order.is_buy_order).add(order.price, order.volume_remain)
+
+    def remove(self, order: MarketOrder):
+        """Remove an order previously added with :meth:`add`."""
+        self.side(order.is_buy_order).remove(order.price, order.volume_remain)
+
+    @property
+    def best_bid(self) -> Optional[float]:
+        """The highest buy price, or ``None`` if there are no buy orders."""
+        return self.bids.best_price
+
+    @property
+    def best_ask(self) -> Optional[float]:
+        """The lowest sell price, or ``None`` if there are no sell orders."""
+        return self.asks.best_price
+
+    @property
+    def spread(self) -> Optional[float]:
+        """Best ask less best bid, or ``None`` if either side is empty."""
+        best_bid = self.best_bid
+        best_ask = self.best_ask
+        if best_bid is None or best_ask is None:
+            return None
+        return best_ask - best_bid
+
+    @property
+    def empty(self) -> bool:
+        """``True`` if the book has no orders."""
+        return not self.bids and not self.asks
+
+
+class MarketOrderIndex:
+    """
+    Hash indexes and order books over a collection of market orders.
+
+    Orders are keyed by `order_id`. Adding an order with an `order_id` already in
+    the index replaces the earlier order.
+
+    :Example:
+        with open(file_path, newline="") as file_in:
+            index = MarketOrderIndex(
+                MarketOrderRecordReader().read_records(csv.reader(file_in))
+            )
+        index.spread(type_id=34, location_id=60003760)
+
+    :param orders: Initial orders to add. Defaults to ``None``.
+    """
+
+    def __init__(self, orders: Optional[Iterable[MarketOrder]] = None):
+        self.orders: Dict[int, MarketOrder] = {}
+        self.by_type_id: Dict[int, Dict[int, MarketOrder]] = {}
+        self.by_location_id: Dict[int, Dict[int, MarketOrder]] = {}
+        self.by_system_id: Dict[int, Dict[int, MarketOrder]] = {}
+        self.books: Dict[Tuple[int, int], OrderBook] = {}
+        if orders is not None:
+            self.extend(orders)
+
+    def __len__(self) -> int:
+        return len(self.orders)
+
+    def __contains__(self, order_id: int) -> bool:
+        return order_id in self.orders
+
+    def add(self, order: MarketOrder):
+        """
+        Add an order, replacing any order with the same `order_id`.
+
+        :param order: The order to add.
+        """
+        if order.order_id in self.orders:
+            self.remove(order.order_id)
+        self.orders[order.order_id] = order
+        self.by_type_id.setdefault(order.type_id, {})[order.order_id] = order
+        self.by_location_id.setdefault(order.location_id, {})[order.order_id] = order
+        self.by_system_id.setdefault(order.system_id, {})[order.order_id] = order
+        key = (order.type_id, order.location_id)
+        book = self.books.get(key)
+        if book is None:
+            book = self.books[key] = OrderBook(order.type_id, order.location_id)
+        book.add(order)
+
+    def extend(self, orders: Iterable[MarketOrder]):
+        """
+        Add orders one at a time, e.g. as they are read from a file.
+
+        :param orders: The orders to add.
+        """
+        for order in orders:
+            self.add(order)
+
+    def remove(self, order_id: int) -> MarketOrder:
+        """
+        Remove an order.
+
+        :param order_id: The `order_id` of the order to remove.
+        :raises KeyError: If the order is not in the index.
+        :return: The removed order.
+        """
+        order = self.orders.pop(order_id)
+        for index, key in (
+            (self.by_type_id, order.type_id),
+            (self.by_location_id, order.location_id),
+            (self.by_system_id, order.system_id),
+        ):
+            orders = index[key]
+            del orders[order_id]
+            if not orders:
+                del index[key]
+        book_key = (order.type_id, order.location_id)
+        book = self.books[book_key]
+        book.remove(order)
+        if book.empty:
+            del self.books[book_key]
+        return order
+
+    def orders_by_type_id(self, type_id: int) -> List[MarketOrder]:
+        """All the orders for a type."""
+        return list(self.by_type_id.get(type_id, {}).values())
+
+    def orders_by_location_id(self, location_id: int) -> List[MarketOrder]:
+        """All the orders at a location."""
+        return list(self.by_location_id.get(location_id, {}).values())
+
+    def orders_by_system_id(self, system_id: int) -> List[MarketOrder]:
+        """All the orders in a solar system."""
+        return list(self.by_system_id.get(system_id, {}).values())
+
+    def book(self, type_id: int, location_id: int) -> Optional[OrderBook]:
+        """
+        The order book for a type at a location.
+
+        :param type_id: The type.
+        :param location_id: The location.
+        :return: The book, or ``None`` if there are no orders.
+        """
+        return self.books.get((type_id, location_id))
+
+    def best_bid(self, type_id: int, location_id: int) -> Optional[float]:
+        """The highest buy price for a type at a location, or ``None``."""
+        book = self.book(type_id, location_id)
+        return None if book is None else book.best_bid
+
+    def best_ask(self, type_id: int, location_id: int) -> Optional[float]:
+        """The lowest sell price for a type at a location, or ``None``."""
+        book = self.book(type_id, location_id)
+        return None if book is None else book.best_ask
+
+    def spread(self, type_id: int, location_id: int) -> Optional[float]:
+        """Best ask less best bid for a type at a location, or ``None``."""
+        book = self.book(type_id, location_id)
+        return None if book is None else book.spread
+
+    def volume_at(
+        self, type_id: int, location_id: int, is_buy_order: bool, price: float
+    ) -> int:
+        """
+        The volume at exactly a price, on one side of a book.
+
+        :param type_id: The type.
+        :param location_id: The location.
+        :param is_buy_order: ``True`` for buy orders, ``False`` for sell orders.
+        :param price: The price.
+        :return: The total `volume_remain` at the price.
+        """
+        book = self.book(type_id, location_id)
+        return 0 if book is None else book.side(is_buy_order).volume_at(price)
+
+    def depth(
+        self, type_id: int, location_id: int, is_buy_order: bool, limit_price: float
+    ) -> int:
+        """
+        The volume at prices as good as or better than a limit, on one side of a book.
+
+        :param type_id: The type.
+        :param location_id: The location.
+        :param is_buy_order: ``True`` for buy orders, ``False`` for sell orders.
+        :param limit_price: The worst price to include.
+        :return: The total `volume_remain` of the included orders.
+        """
+        book = self.book(type_id, location_id)
+        return 0 if book is None else book.side(is_buy_order).depth(limit_price)
@@ -0,0 +1,260 @@
+"""Find the orders added, removed and changed between two market order dumps.
+
+Orders are matched on `order_id`. When both dumps are sorted by `order_id`, a
+merge join streams through them in step, in constant memory. Otherwise a hash
+join indexes the old dump by `order_id`, and streams the new one past it.
+Either way each dump is read once, and events are yielded as they are found.
+"""
+import logging
+from operator import attrgetter, itemgetter, lt
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generator,
+    Iterable,
+    Iterator,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
+
+from pfmsoft.util.file.eve_market_order_snapshot import (
+    RECORD_FIELDS,
+    MarketOrderSnapshotReader,
+)
+from pfmsoft.util.file.eve_market_orders import MarketOrder
+
+#### setting up logger ####
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+NEW = "new"
+REMOVED = "removed"
+CHANGED = "changed"
+#: The fields compared to detect a changed order, by default.
+CHANGE_FIELDS = ("price", "volume_remain")
+
+T = TypeVar("T")
+
+
+class OrderEvent(NamedTuple):
+    """
+    A difference between two market order dumps.
+
+    :param kind: :data:`NEW`, :data:`REMOVED` or :data:`CHANGED`.
+    :param order_id: The `order_id` of the order.
+    :param old_order: The order in the old dump, ``None`` if new.
+    :param new_order: The order in the new dump, ``None`` if removed.
+    """
+
+    kind: str
+    order_id: int
+    old_order: Optional[MarketOrder]
+    new_order: Optional[MarketOrder]
+
+
+def _sorted_items(
+    items: Iterable[T], get_id: Callable[[T], int], name: str
+) -> Iterator[T]:
+    previous = None
+    for item in items:
+        item_id = get_id(item)
+        if previous is not None and item_id <= previous:
+            raise ValueError(
+                f"{name} orders are not sorted by order_id, "
+                f"{item_id} follows {previous}."
+            )
+        previous = item_id
+        yield item
+
+
+def merge_join(
+    old_items: Iterable[T],
+    new_items: Iterable[T],
+    get_id: Callable[[T], int],
+    changed: Callable[[T, T], bool],
+) -> Generator[Tuple[str, int, Optional[T], Optional[T]], None, None]:
+    """
+    Diff two streams sorted by id, holding one item from each at a time.
+
+    :param old_items: The old items, sorted by id.
+    :param new_items: The new items, sorted by id.
+    :param get_id: Get the id of an item.
+    :param changed: Compare an old item and a new item with the same id.
+    :raises ValueError: If either stream is not sorted by id, without duplicates.
+    :yield: (kind, id, old item, new item) for each difference.
+    """
+    old_iter = _sorted_items(old_items, get_id, "Old")
+    new_iter = _sorted_items(new_items, get_id, "New")
+    old = next(old_iter, None)
+    new = next(new_iter, None)
+    while old is not None or new is not None:
+        old_id = None if old is None else get_id(old)
+        new_id = None if new is None else get_id(new)
+        if new_id is None or (old_id is not None and old_id < new_id):
+            yield REMOVED, old_id, old, None
+            old = next(old_iter, None)
+        elif old_id is None or new_id < old_id:
+            yield NEW, new_id, None, new
+            new = next(new_iter, None)
+        else:
+            if changed(old, new):
+                yield CHANGED, old_id, old, new
+            old = next(old_iter, None)
+            new = next(new_iter, None)
+
+
+def _change_check(compare_fields: Sequence[str]) -> Callable[[Any, Any], bool]:
+    key = attrgetter(*compare_fields)
+
+    def changed(old, new):
+        return key(old) != key(new)
+
+    return changed
+
+
+def diff_sorted_orders(
+    old_orders: Iterable[MarketOrder],
+    new_orders: Iterable[MarketOrder],
+    compare_fields: Sequence[str] = CHANGE_FIELDS,
+) -> Generator[OrderEvent, None, None]:
+    """
+    Diff two streams of orders sorted by `order_id`, in constant memory.
+
+    :param old_orders: The old orders, sorted by `order_id`.
+    :param new_orders: The new orders, sorted by `order_id`.
+    :param compare_fields: The :class:`MarketOrder` fields compared to detect a
+        changed order. Defaults to :data:`CHANGE_FIELDS`.
+    :raises ValueError: If either stream is not sorted by `order_id`.
+    :yield: An event for each new, removed or changed order, in `order_id` order.
+    """
+    for event in merge_join(
+        old_orders,
+        new_orders,
+        attrgetter("order_id"),
+        _change_check(compare_fields),
+    ):
+        yield OrderEvent(*event)
+
+
+def diff_orders(
+    old_orders: Iterable[MarketOrder],
+    new_orders: Iterable[MarketOrder],
+    compare_fields: Sequence[str] = CHANGE_FIELDS,
+) -> Generator[OrderEvent, None, None]:
+    """
+    Diff two collections of orders in any order, with a hash join.
+
+    The old orders are held in a dict, the new orders are streamed.
+
+    :param old_orders: The old orders.
+    :param new_orders: The new orders.
+    :param compare_fields: The :class:`MarketOrder` fields compared to detect a
+        changed order. Defaults to :data:`CHANGE_FIELDS`.
+    :yield: An event for each new or changed order, in the order of `new_orders`,
+        then an event for each removed order.
+    """
+    changed = _change_check(compare_fields)
+    old_by_id: Dict[int, MarketOrder] = {x.order_id: x for x in old_orders}
+    for new in new_orders:
+        old = old_by_id.pop(new.order_id, None)
+        if old is None:
+            yield OrderEvent(NEW, new.order_id, None, new)
+        elif changed(old, new):
+            yield OrderEvent(CHANGED, new.order_id, old, new)
+    for old in old_by_id.values():
+        yield OrderEvent(REMOVED, old.order_id, old, None)
+
+
+def diff_market_order_snapshots(
+    old_path: Path,
+    new_path: Path,
+    compare_fields: Sequence[str] = CHANGE_FIELDS,
+) -> Generator[OrderEvent, None, None]:
+    """
+    Diff two binary snapshots, see :mod:`eve_market_order_snapshot`.
+
+    The raw records are compared, and only orders in events are unpacked. If both
+    snapshots are sorted by `order_id`, e.g. saved from
+    ``table.sorted_by("order_id")``, they are merge joined in constant memory.
+    Otherwise the old snapshot is indexed by `order_id` in a dict of record
+    indexes, and the records are re-read from the memory map as needed.
+
+    :param old_path: The :py:class:`pathlib.Path` of the old snapshot.
+    :param new_path: The :py:class:`pathlib.Path` of the new snapshot.
+    :param compare_fields: The :class:`MarketOrder` fields compared to detect a
+        changed order. Defaults to :data:`CHANGE_FIELDS`.
+    :yield: An event for each new, removed or changed order.
+    """
+    with MarketOrderSnapshotReader(old_path) as old_reader:
+        with MarketOrderSnapshotReader(new_path) as new_reader:
+            yield from _diff_snapshot_readers(old_reader, new_reader, compare_fields)
+
+
+def _diff_snapshot_readers(
+    old_reader: MarketOrderSnapshotReader,
+    new_reader: MarketOrderSnapshotReader,
+    compare_fields: Sequence[str],
+) -> Generator[OrderEvent, None, None]:
+    field_indexes = [RECORD_FIELDS.index(x) for x in compare_fields]
+    range_index = RECORD_FIELDS.index("range_")
+    old_key = _record_key(field_indexes, range_index, old_reader.range_categories)
+    new_key = _record_key(field_indexes, range_index, new_reader.range_categories)
+    get_id = itemgetter(RECORD_FIELDS.index("order_id"))
+    old_ids = old_reader.columns(["order_id"])["order_id"]
+    new_ids = new_reader.columns(["order_id"])["order_id"]
+    if _is_sorted(old_ids) and _is_sorted(new_ids):
+        del old_ids, new_ids
+        events = merge_join(
+            old_reader.records(),
+            new_reader.records(),
+            get_id,
+            lambda old, new: old_key(old) != new_key(new),
+        )
+        for kind, order_id, old, new in events:
+            yield OrderEvent(
+                kind,
+                order_id,
+                None if old is None else old_reader.to_order(old),
+                None if new is None else new_reader.to_order(new),
+            )
+        return
+    old_positions = dict(zip(old_ids, range(len(old_ids))))
+    del old_ids, new_ids
+    for new in new_reader.records():
+        order_id = get_id(new)
+        position = old_positions.pop(order_id, None)
+        if position is None:
+            yield OrderEvent(NEW, order_id, None, new_reader.to_order(new))
+            continue
+        old = old_reader.record(position)
+        if old_key(old) != new_key(new):
+            yield OrderEvent(
+                CHANGED, order_id, old_reader.to_order(old), new_reader.to_order(new)
+            )
+    for order_id, position in old_positions.items():
+        old = old_reader.record(position)
+        yield OrderEvent(REMOVED, order_id, old_reader.to_order(old), None)
+
+
+def _is_sorted(values: Sequence[int]) -> bool:
+    return all(map(lt, values, values[1:]))
+
+
+def _record_key(
+    field_indexes: Sequence[int], range_index: int, range_categories: Sequence[str]
+) -> Callable[[Tuple], Any]:
+    if range_index not in field_indexes:
+        return itemgetter(*field_indexes)
+
+    def key(record: Tuple) -> Tuple:
+        return tuple(
+            range_categories[record[x]] if x == range_index else record[x]
+            for x in field_indexes
+        )
+
+    return key
@@ -0,0 +1,277 @@
+"""Bulk loading of market order csv files, a chunk of rows at a time.
+
+Instead of building each :class:`MarketOrder` with :meth:`MarketOrder.from_strings`,
+rows are read in chunks, split into columns, and each column converted with a
+single :func:`map` call. Timestamps are parsed with :meth:`datetime.fromisoformat`
+rather than :func:`datetime.strptime`, and booleans by table lookup.
+"""
+import csv
+import gc
+import logging
+from contextlib import contextmanager, nullcontext
+from datetime import timedelta
+from itertools import chain, islice
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generator,
+    List,
+    Optional,
+    Sequence,
+    TextIO,
+    Union,
+)
+
+from pfmsoft.util.file.eve_market_order_table import (
+    COLUMN_NAMES,
+    EPOCH,
+    MarketOrderTable,
+)
+from pfmsoft.util.file.eve_market_orders import (
+    MarketOrder,
+    make_remapped_headers,
+    parse_bool,
+    parse_issued,
+)
+
+#### setting up logger ####
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+DEFAULT_CHUNK_SIZE = 65536
+#: Columns with few distinct values, converted once per distinct value.
+LOW_CARDINALITY_COLUMNS = frozenset(
+    (
+        "duration",
+        "is_buy_order",
+        "location_id",
+        "min_volume",
+        "range_",
+        "system_id",
+        "type_id",
+    )
+)
+_ONE_SECOND = timedelta(seconds=1)
+
+
+def parse_issued_epoch(value: str) -> int:
+    """
+    Parse an ESI timestamp, e.g. "2021-03-01T12:30:07Z", to seconds since the epoch.
+
+    :param value: The timestamp string.
+    :raises ValueError: If the value is not a valid timestamp.
+    :return: Seconds since the epoch.
+    """
+    return (parse_issued(value) - EPOCH) // _ONE_SECOND
+
+
+@contextmanager
+def _gc_paused():
+    """
+    Pause the cyclic garbage collector.
+
+    Loading allocates millions of objects without reference cycles, and each
+    allocation burst would otherwise trigger full collections of the growing heap.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _str(value: str) -> str:
+    return value
+
+
+def column_converters(issued_as_epoch: bool = False) -> Dict[str, Callable[[str], Any]]:
+    """
+    The converter for each market order column.
+
+    :param issued_as_epoch: Convert `issued` to seconds since the epoch, instead of
+        a datetime. Defaults to ``False``.
+    :return: A dict of field name to converter, in :class:`MarketOrder` field order.
+    """
+    return {
+        "duration": int,
+        "is_buy_order": parse_bool,
+        "issued": parse_issued_epoch if issued_as_epoch else parse_issued,
+        "location_id": int,
+        "min_volume": int,
+        "order_id": int,
+        "price": float,
+        "range_": _str,
+        "system_id": int,
+        "type_id": int,
+        "volume_remain": int,
+        "volume_total": int,
+    }
+
+
+def convert_column(
+    converter: Callable[[str], Any], values: Sequence[str], distinct: bool = False
+) -> List[Any]:
+    """
+    Convert a column of strings.
+
+    :param converter: The conversion function, see :func:`column_converters`.
+    :param values: The strings.
+    :param distinct: Convert each distinct string once, and map the rest by lookup.
+        Faster for columns with few distinct values. Defaults to ``False``.
+    :return: The converted values.
+    """
+    if distinct:
+        lookup = {x: converter(x) for x in set(values)}
+        return list(map(lookup.__getitem__, values))
+    return list(map(converter, values))
+
+
+def _column_positions(headers: Sequence[str]) -> List[int]:
+    renamed = {x.file_field: x.data_field for x in make_remapped_headers()}
+    data_fields = [renamed.get(x, x) for x in headers]
+    missing = [x for x in COLUMN_NAMES if x not in data_fields]
+    if missing:
+        raise ValueError(f"Market order headers are missing {missing}")
+    return [data_fields.index(x) for x in COLUMN_NAMES]
+
+
+def _split_chunk(lines: List[str], width: int) -> Optional[List[List[str]]]:
+    """
+    Split unquoted csv lines into columns with one :meth:`str.split` call.
+
+    Returns ``None`` for a chunk with quotes, or with any line of the wrong width,
+    so that :func:`csv.reader` reads it and reports the line.
+    """
+    text = "".join(lines)
+    if '"' in text:
+        return None
+    separators = width - 1
+    for line in lines:
+        if line.count(",") != separators:
+            return None
+    if "\r" in text:
+        text = text.replace("\r\n", "\n")
+    fields = text.rstrip("\n").replace("\n", ",").split(",")
+    return [fields[x::width] for x in range(width)]
+
+
+def read_market_order_columns(
+    file_in: TextIO,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    headers_in_first_row: bool = True,
+    issued_as_epoch: bool = False,
+) -> Generator[Dict[str, List[Any]], None, None]:
+    """
+    Read market order csv rows in chunks, converted column by column.
+
+    Chunks without quotes are split with plain string methods, which is much
+    faster than :py:mod:`csv`. A chunk with quotes, or with a row of the wrong
+    width, and everything after it, is read with :func:`csv.reader`.
+
+    :param file_in: A text stream opened with ``newline=""``.
+    :param chunk_size: Rows per chunk. Defaults to 65536.
+    :param headers_in_first_row: The first row names the columns, in any order.
+        Otherwise columns are in :class:`MarketOrder` field order. Defaults to ``True``.
+    :param issued_as_epoch: Convert `issued` to seconds since the epoch, instead of
+        a datetime. Defaults to ``False``.
+    :raises ValueError: If a header or value is not valid, or a row has the wrong
+        number of fields.
+    :yield: A dict of field name to a list of converted values, for each chunk.
+    """
+    converters = column_converters(issued_as_epoch)
+    width = len(COLUMN_NAMES)
+    positions = list(range(width))
+    if headers_in_first_row:
+        header_line = file_in.readline()
+        if not header_line:
+            return
+        headers = next(csv.reader([header_line]))
+        width = len(headers)
+        positions = _column_positions(headers)
+    reader = None
+    # Lines read before the csv reader took over, to report file line numbers.
+    lines_read = 1 if headers_in_first_row else 0
+    while True:
+        if reader is None:
+            lines = list(islice(file_in, chunk_size))
+            if not lines:
+                return
+            columns = _split_chunk(lines, width)
+            if columns is None:
+                # A quoted value may span lines, so the csv module reads the rest.
+                reader = csv.reader(chain(lines, file_in))
+            else:
+                lines_read += len(lines)
+        if reader is not None:
+            rows = []
+            for row in islice(reader, chunk_size):
+                if not row:
+                    continue
+                if len(row) != width:
+                    raise ValueError(
+                        f"Market order row at line {lines_read + reader.line_num} "
+                        f"has {len(row)} fields, expected {width}."
+                    )
+                rows.append(row)
+            if not rows:
+                return
+            columns = list(zip(*rows))
+        yield {
+            name: convert_column(
+                converters[name], columns[position], name in LOW_CARDINALITY_COLUMNS
+            )
+            for name, position in zip(COLUMN_NAMES, positions)
+        }
+
+
+def load_market_orders(
+    file_path: Path,
+    as_table: bool = False,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    headers_in_first_row: bool = True,
+    pause_gc: bool = False,
+) -> Union[List[MarketOrder], MarketOrderTable]:
+    """
+    Load a market order csv file in bulk.
+
+    A faster equivalent of reading the file with :class:`MarketOrderRecordReader`.
+
+    :param file_path: The :py:class:`pathlib.Path` to the csv file.
+    :param as_table: Return a :class:`MarketOrderTable` instead of a list.
+        Defaults to ``False``.
+    :param chunk_size: Rows converted at a time. Defaults to 65536.
+    :param headers_in_first_row: The first row names the columns. Defaults to ``True``.
+    :param pause_gc: Disable the cyclic garbage collector while loading, which
+        saves repeated collections of the growing heap on large files. This affects
+        the whole process, including other threads, until loading finishes, so
+        only use it when nothing else relies on cycles being collected meanwhile.
+        Defaults to ``False``.
+    :raises ValueError: If the file is not valid market order csv.
+    :return: The orders, as a list of :class:`MarketOrder` or a :class:`MarketOrderTable`.
+    """
+    orders: List[MarketOrder] = []
+    table = MarketOrderTable()
+    try:
+        gc_context = _gc_paused() if pause_gc else nullcontext()
+        with gc_context, open(file_path, encoding="utf8", newline="") as file_in:
+            chunks = read_market_order_columns(
+                file_in,
+                chunk_size=chunk_size,
+                headers_in_first_row=headers_in_first_row,
+                issued_as_epoch=as_table,
+            )
+            for chunk in chunks:
+                if as_table:
+                    table.extend_columns(chunk)
+                else:
+                    orders.extend(map(MarketOrder, *chunk.values()))
+    except Exception as ex:
+        logger.exception("Error loading market orders from %s", file_path)
+        raise ex
+    if as_table:
+        return table
+    return orders
@@ -0,0 +1,412 @@
+"""A compact binary snapshot format for market orders, read through mmap.
+
+The layout, all little endian, is:
+
+- A 32 byte header, see :data:`HEADER_STRUCT`.
+- One fixed width record per order, see :data:`RECORD_STRUCT`.
+- A string table of the `range_` values, a 4 byte count and then each string as a
+  2 byte length and its utf8 bytes. Records store an index into this table.
+
+Snapshots are opened with :py:mod:`mmap`, so opening is near instant whatever
+the file size, and processes reading the same snapshot share its pages in the
+operating system cache instead of each holding a copy.
+"""
+import logging
+import mmap
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple, Union
+
+from pfmsoft.util.file.eve_market_order_table import (
+    MarketOrderTable,
+    datetime_to_epoch,
+    epoch_to_datetime,
+)
+from pfmsoft.util.file.eve_market_orders import MarketOrder
+from pfmsoft.util.file.read_write import commit_temp_file, make_temp_file
+
+#### setting up logger ####
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+MAGIC = b"PFMMOSNP"
+FORMAT_VERSION = 1
+#: magic, format version, record size, reserved, record count, string table offset.
+HEADER_STRUCT = struct.Struct("<8sHHIQQ")
+#: The fields of :data:`RECORD_STRUCT`, widest first to keep them aligned.
+RECORD_FIELDS = (
+    "order_id",
+    "issued",
+    "location_id",
+    "system_id",
+    "price",
+    "type_id",
+    "min_volume",
+    "volume_remain",
+    "volume_total",
+    "duration",
+    "range_",
+    "is_buy_order",
+)
+RECORD_STRUCT = struct.Struct("<qqqqdqqqqiH?x")
+_RECORDS_PER_BLOCK = 4096
+#: Field name, :py:mod:`array` type code and byte offset of each record field.
+_RECORD_LAYOUT = tuple(
+    (
+        name,
+        "b" if code == "?" else code,
+        struct.calcsize("<" + RECORD_STRUCT.format[1 : index + 1]),
+    )
+    for index, (name, code) in enumerate(zip(RECORD_FIELDS, RECORD_STRUCT.format[1:]))
+)
+_RANGE_INDEX = RECORD_FIELDS.index("range_")
+_STRING_LENGTH_STRUCT = struct.Struct("<H")
+_STRING_COUNT_STRUCT = struct.Struct("<I")
+
+
+class MarketOrderSnapshotWriter:
+    """
+    Write market orders to a binary snapshot file.
+
+    The snapshot is written to a uniquely named temporary file next to
+    `file_path`, and renamed into place by :meth:`close`, so readers never see a
+    partial snapshot.
+
+    :Example:
+        with MarketOrderSnapshotWriter(file_path) as writer:
+            writer.write_orders(orders)
+
+    :param file_path: Output :py:class:`pathlib.Path` of the snapshot.
+    :param parents: Make parent directories if they don't exist. As used by
+        :func:`pathlib.Path.mkdir()`. Defaults to ``False``.
+    :param exist_ok: Suppress exception if parent directory exists as directory.
+        As used by :func:`pathlib.Path.mkdir`. Defaults to ``True``.
+    """
+
+    def __init__(self, file_path: Path, parents: bool = False, exist_ok: bool = True):
+        self.file_path = file_path
+        self.record_count = 0
+        self.range_categories: List[str] = []
+        self._range_codes: Dict[str, int] = {}
+        if not file_path.parent.exists():
+            file_path.parent.mkdir(parents=parents, exist_ok=exist_ok)
+        fd, self._temp_path = make_temp_file(file_path)
+        self._file_out = open(fd, "wb")
+        self._file_out.write(bytes(HEADER_STRUCT.size))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def _range_code(self, range_: str) -> int:
+        code = self._range_codes.get(range_)
+        if code is None:
+            code = len(self.range_categories)
+            self.range_categories.append(range_)
+            self._range_codes[range_] = code
+        return code
+
+    def write(self, order: MarketOrder):
+        """
+        Write one order.
+
+        :param order: The order to write.
+        """
+        self._file_out.write(
+            RECORD_STRUCT.pack(
+                order.order_id,
+                datetime_to_epoch(order.issued),
+                order.location_id,
+                order.system_id,
+                order.price,
+                order.type_id,
+                order.min_volume,
+                order.volume_remain,
+                order.volume_total,
+                order.duration,
+                self._range_code(order.range_),
+                order.is_buy_order,
+            )
+        )
+        self.record_count += 1
+
+    def write_orders(self, orders: Iterable[MarketOrder]):
+        """
+        Write orders, e.g. from :meth:`MarketOrderRecordReader.read_records`.
+
+        :param orders: The orders to write.
+        """
+        for order in orders:
+            self.write(order)
+
+    def write_table(self, table: MarketOrderTable):
+        """
+        Write all the orders in a table, straight from its columns.
+
+        :param table: The table to write.
+        """
+        codes = [self._range_code(x) for x in table.range_categories]
+        columns: List[Iterable] = [table.columns[name] for name in RECORD_FIELDS]
+        columns[_RANGE_INDEX] = map(codes.__getitem__, table.columns["range_"])
+        self._file_out.writelines(map(RECORD_STRUCT.pack, *columns))
+        self.record_count += len(table)
+
+    def close(self):
+        """Write the string table and header, and move the snapshot into place."""
+        if self._file_out.closed:
+            return
+        try:
+            string_table_offset = self._file_out.tell()
+            self._file_out.write(_STRING_COUNT_STRUCT.pack(len(self.range_categories)))
+            for value in self.range_categories:
+                encoded = value.encode("utf8")
+                self._file_out.write(_STRING_LENGTH_STRUCT.pack(len(encoded)))
+                self._file_out.write(encoded)
+            self._file_out.seek(0)
+            self._file_out.write(
+                HEADER_STRUCT.pack(
+                    MAGIC,
+                    FORMAT_VERSION,
+                    RECORD_STRUCT.size,
+                    0,
+                    self.record_count,
+                    string_table_offset,
+                )
+            )
+            self._file_out.close()
+            commit_temp_file(self._temp_path, self.file_path)
+        except Exception as error:
+            logger.exception(
+                "Error trying to save market order snapshot to %s", self.file_path
+            )
+            self.abort()
+            raise error
+
+    def abort(self):
+        """Discard the snapshot being written."""
+        self._file_out.close()
+        if self._temp_path.exists():
+            self._temp_path.unlink()
+
+
+class MarketOrderSnapshotReader:
+    """
+    Read a market order snapshot through a read only memory map.
+
+    Orders are unpacked as they are accessed, by index or by iterating.
+
+    :param file_path: The :py:class:`pathlib.Path` of the snapshot.
+    :raises ValueError: If the file is not a snapshot, or has an unsupported
+        format version.
+    """
+
+    def __init__(self, file_path: Path):
+        self.file_path = file_path
+        with open(file_path, "rb") as file_in:
+            self._mmap = mmap.mmap(file_in.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._read_header()
+        except Exception:
+            self._mmap.close()
+            raise
+
+    def _read_header(self):
+        if len(self._mmap) < HEADER_STRUCT.size:
+            raise ValueError(f"{self.file_path} is not a market order snapshot.")
+        (
+            magic,
+            version,
+            record_size,
+            _,
+            self.record_count,
+            string_table_offset,
+        ) = HEADER_STRUCT.unpack_from(self._mmap)
+        if magic != MAGIC:
+            raise ValueError(f"{self.file_path} is not a market order snapshot.")
+        if version != FORMAT_VERSION or record_size != RECORD_STRUCT.size:
+            raise ValueError(
+                f"{self.file_path} has unsupported snapshot version {version}."
+            )
+        (count,) = _STRING_COUNT_STRUCT.unpack_from(self._mmap, string_table_offset)
+        offset = string_table_offset + _STRING_COUNT_STRUCT.size
+        self.range_categories: List[str] = []
+        for _ in range(count):
+            (length,) = _STRING_LENGTH_STRUCT.unpack_from(self._mmap, offset)
+            offset += _STRING_LENGTH_STRUCT.size
+            self.range_categories.append(
+                self._mmap[offset : offset + length].decode("utf8")
+            )
+            offset += length
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self) -> int:
+        return self.record_count
+
+    def __getitem__(self, index: int) -> MarketOrder:
+        if index < 0:
+            index += self.record_count
+        if not 0 <= index < self.record_count:
+            raise IndexError("MarketOrderSnapshotReader index out of range")
+        return self.to_order(self.record(index))
+
+    def __iter__(self) -> Iterator[MarketOrder]:
+        return map(self.to_order, self.records())
+
+    def close(self):
+        """Close the memory map. Orders already read remain valid."""
+        self._mmap.close()
+
+    def record(self, index: int) -> Tuple:
+        """
+        Unpack one raw record, see :meth:`records`.
+
+        :param index: The record index, which must be in range.
+        :return: The record.
+        """
+        return RECORD_STRUCT.unpack_from(
+            self._mmap, HEADER_STRUCT.size + index * RECORD_STRUCT.size
+        )
+
+    def records(self) -> Iterator[Tuple]:
+        """
+        Iterate over the raw records, in :data:`RECORD_FIELDS` order.
+
+        `issued` is seconds since the epoch, and `range_` an index into
+        :attr:`range_categories`.
+
+        :yield: The unpacked records.
+        """
+        end = HEADER_STRUCT.size + self.record_count * RECORD_STRUCT.size
+        block_size = _RECORDS_PER_BLOCK * RECORD_STRUCT.size
+        for offset in range(HEADER_STRUCT.size, end, block_size):
+            # Slicing the mmap copies the block, so no buffer export outlives it
+            # and the reader can be closed part way through iterating.
+            block = self._mmap[offset : min(offset + block_size, end)]
+            yield from RECORD_STRUCT.iter_unpack(block)
+
+    def to_order(self, record: Tuple) -> MarketOrder:
+        """
+        Make a :class:`MarketOrder` from a raw record of this snapshot.
+
+        :param record: The record, see :meth:`records`.
+        :return: The order.
+        """
+        (
+            order_id,
+            issued,
+            location_id,
+            system_id,
+            price,
+            type_id,
+            min_volume,
+            volume_remain,
+            volume_total,
+            duration,
+            range_code,
+            is_buy_order,
+        ) = record
+        return MarketOrder(
+            duration=duration,
+            is_buy_order=is_buy_order,
+            issued=epoch_to_datetime(issued),
+            location_id=location_id,
+            min_volume=min_volume,
+            order_id=order_id,
+            price=price,
+            range_=self.range_categories[range_code],
+            system_id=system_id,
+            type_id=type_id,
+            volume_remain=volume_remain,
+            volume_total=volume_total,
+        )
+
+    def columns(self, names: Sequence[str] = RECORD_FIELDS) -> Dict[str, array]:
+        """
+        Copy fields out of the records into arrays.
+
+        Every field of :data:`RECORD_STRUCT` is aligned to its own size, so each
+        column is read from a block of records with an :py:mod:`array` slice,
+        without unpacking the records.
+
+        :param names: The fields to copy. Defaults to all of :data:`RECORD_FIELDS`.
+        :return: A dict of field name to array, with the type codes of
+            :class:`MarketOrderTable` columns.
+        """
+        layout = [x for x in _RECORD_LAYOUT if x[0] in names]
+        columns = {name: array(type_code) for name, type_code, _ in layout}
+        end = HEADER_STRUCT.size + self.record_count * RECORD_STRUCT.size
+        block_size = _RECORDS_PER_BLOCK * 16 * RECORD_STRUCT.size
+        for offset in range(HEADER_STRUCT.size, end, block_size):
+            block = self._mmap[offset : min(offset + block_size, end)]
+            for name, type_code, field_offset in layout:
+                values = array(type_code, block)
+                if sys.byteorder != "little":
+                    values.byteswap()
+                step = RECORD_STRUCT.size // values.itemsize
+                columns[name].extend(values[field_offset // values.itemsize :: step])
+        return columns
+
+    def to_table(self) -> MarketOrderTable:
+        """
+        Copy the snapshot into a :class:`MarketOrderTable`.
+
+        :return: The table, with the `range_` categories of the snapshot.
+        """
+        table = MarketOrderTable(range_categories=self.range_categories)
+        table.columns.update(self.columns())
+        return table
+
+
+def save_market_order_snapshot(
+    orders: Union[Iterable[MarketOrder], MarketOrderTable],
+    file_path: Path,
+    parents: bool = False,
+    exist_ok: bool = True,
+) -> int:
+    """
+    Save market orders as a binary snapshot.
+
+    :param orders: The orders, or a :class:`MarketOrderTable`.
+    :param file_path: Output :py:class:`pathlib.Path` of the snapshot.
+    :param parents: Make parent directories if they don't exist. Defaults to ``False``.
+    :param exist_ok: Suppress exception if parent directory exists as directory.
+        Defaults to ``True``.
+    :return: The number of orders saved.
+    """
+    with MarketOrderSnapshotWriter(file_path, parents, exist_ok) as writer:
+        if isinstance(orders, MarketOrderTable):
+            writer.write_table(orders)
+        else:
+            writer.write_orders(orders)
+    return writer.record_count
+
+
+def load_market_order_snapshot(
+    file_path: Path, as_table: bool = False
+) -> Union[List[MarketOrder], MarketOrderTable]:
+    """
+    Load all the orders from a binary snapshot.
+
+    To read only some orders, use a :class:`MarketOrderSnapshotReader` directly.
+
+    :param file_path: The :py:class:`pathlib.Path` of the snapshot.
+    :param as_table: Return a :class:`MarketOrderTable` instead of a list.
+        Defaults to ``False``.
+    :return: The orders.
+    """
+    with MarketOrderSnapshotReader(file_path) as reader:
+        if as_table:
+            return reader.to_table()
+        return list(reader)
@@ -0,0 +1,314 @@
+"""Single pass, mergeable price and volume statistics over market order streams.
+
+A :class:`MarketOrderAggregator` keeps a :class:`PriceStats` per group, by
+default per type and side. Each group holds a fixed set of counters and a
+:class:`QuantileSketch`, so memory depends on the number of groups rather than
+the number of orders. Aggregators over separate chunks of data, e.g. in separate
+processes, can be merged into one.
+"""
+import logging
+import math
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence
+
+from pfmsoft.util.file.eve_market_order_loader import read_market_order_columns
+from pfmsoft.util.file.eve_market_orders import MarketOrder
+
+#### setting up logger ####
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+DEFAULT_GROUP_BY = ("type_id", "is_buy_order")
+DEFAULT_RELATIVE_ACCURACY = 0.01
+
+
+class QuantileSketch:
+    """
+    A mergeable sketch for approximate quantiles of positive values.
+
+    Values are counted in logarithmic buckets, so any quantile is returned
+    within `relative_accuracy` of a true value. The number of buckets grows
+    with the log of the range of values, not with the count.
+
+    :param relative_accuracy: The relative error of quantiles. Defaults to 0.01.
+    """
+
+    def __init__(self, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1.")
+        self.relative_accuracy = relative_accuracy
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.buckets: Dict[int, float] = {}
+        self.zero_count = 0.0
+        self.count = 0.0
+
+    def add(self, value: float, weight: float = 1.0):
+        """
+        Add a value.
+
+        :param value: The value, zero or more.
+        :param weight: The weight of the value, e.g. a volume. Defaults to 1.
+        :raises ValueError: If the value is negative.
+        """
+        if value > 0:
+            key = math.ceil(math.log(value) / self._log_gamma)
+            self.buckets[key] = self.buckets.get(key, 0.0) + weight
+        elif value == 0:
+            self.zero_count += weight
+        else:
+            raise ValueError(f"Can not add negative value {value} to the sketch.")
+        self.count += weight
+
+    def merge(self, other: "QuantileSketch"):
+        """
+        Add the values of another sketch to this one.
+
+        :param other: A sketch with the same `relative_accuracy`.
+        :raises ValueError: If the sketches have different accuracies.
+        """
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Can not merge sketches with different accuracies.")
+        for key, weight in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0.0) + weight
+        self.zero_count += other.zero_count
+        self.count += other.count
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Estimate a quantile.
+
+        :param q: The quantile, from 0 to 1, e.g. 0.5 for the median.
+        :raises ValueError: If `q` is out of range.
+        :return: The estimate, or ``None`` if the sketch is empty.
+        """
+        if not 0 <= q <= 1:
+            raise ValueError("q must be between 0 and 1.")
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        cumulative = self.zero_count
+        if rank <= cumulative and self.zero_count:
+            return 0.0
+        key = None
+        for key in sorted(self.buckets):
+            cumulative += self.buckets[key]
+            if cumulative >= rank:
+                break
+        # The bucket covers (gamma ** (key - 1), gamma ** key], return its midpoint
+        # in relative terms.
+        return 2 * self._gamma**key / (self._gamma + 1)
+
+
+@dataclass
+class PriceStats:
+    """
+    Price and volume statistics for a group of orders.
+
+    Volumes are the `volume_remain` of the orders.
+
+    :param count: Number of orders.
+    :param volume: Total volume.
+    :param price_sum: Sum of the prices, for the mean price.
+    :param price_volume_sum: Sum of price times volume, for the volume weighted
+        average price.
+    :param min_price: Lowest price, ``None`` if there are no orders.
+    :param max_price: Highest price, ``None`` if there are no orders.
+    :param sketch: Volume weighted :class:`QuantileSketch` of the prices.
+    """
+
+    count: int = 0
+    volume: int = 0
+    price_sum: float = 0.0
+    price_volume_sum: float = 0.0
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    sketch: QuantileSketch = field(default_factory=QuantileSketch)
+
+    def add(self, price: float, volume: int):
+        """
+        Add one order.
+
+        :param price: The order price.
+        :param volume: The order volume.
+        """
+        self.count += 1
+        self.volume += volume
+        self.price_sum += price
+        self.price_volume_sum += price * volume
+        if self.min_price is None or price < self.min_price:
+            self.min_price = price
+        if self.max_price is None or price > self.max_price:
+            self.max_price = price
+        self.sketch.add(price, volume)
+
+    def merge(self, other: "PriceStats"):
+        """
+        Add the statistics of another group to this one.
+
+        :param other: The other statistics.
+        """
+        self.count += other.count
+        self.volume += other.volume
+        self.price_sum += other.price_sum
+        self.price_volume_sum += other.price_volume_sum
+        if other.min_price is not None:
+            if self.min_price is None or other.min_price < self.min_price:
+                self.min_price = other.min_price
+        if other.max_price is not None:
+            if self.max_price is None or other.max_price > self.max_price:
+                self.max_price = other.max_price
+        self.sketch.merge(other.sketch)
+
+    @property
+    def mean_price(self) -> Optional[float]:
+        """The mean price, or ``None`` if there are no orders."""
+        return self.price_sum / self.count if self.count else None
+
+    @property
+    def vwap(self) -> Optional[float]:
+        """The volume weighted average price, or ``None`` if there is no volume."""
+        return self.price_volume_sum / self.volume if self.volume else None
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """
+        Estimate a volume weighted price percentile.
+
+        :param percent: The percentile, from 0 to 100.
+        :return: The estimate, or ``None`` if there is no volume.
+        """
+        estimate = self.sketch.quantile(percent / 100)
+        if estimate is None or self.min_price is None or self.max_price is None:
+            return estimate
+        return min(max(estimate, self.min_price), self.max_price)
+
+
+class MarketOrderAggregator:
+    """
+    Streaming statistics of market orders, grouped by order fields.
+
+    :Example:
+        aggregator = MarketOrderAggregator()
+        aggregator.extend(MarketOrderRecordReader().read_records(csv.reader(file_in)))
+        aggregator.groups[(34, False)].vwap
+
+    :param group_by: The :class:`MarketOrder` fields to group by. Defaults to
+        :data:`DEFAULT_GROUP_BY`, type and side.
+    :param relative_accuracy: The relative error of percentiles. Defaults to 0.01.
+    """
+
+    def __init__(
+        self,
+        group_by: Sequence[str] = DEFAULT_GROUP_BY,
+        relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY,
+    ):
+        self.group_by = tuple(group_by)
+        self.relative_accuracy = relative_accuracy
+        self.groups: Dict[Hashable, PriceStats] = {}
+
+    def _group(self, key: Hashable) -> PriceStats:
+        stats = self.groups.get(key)
+        if stats is None:
+            stats = self.groups[key] = PriceStats(
+                sketch=QuantileSketch(self.relative_accuracy)
+            )
+        return stats
+
+    def _key(self, values: Sequence) -> Hashable:
+        return values[0] if len(values) == 1 else tuple(values)
+
+    def add(self, order: MarketOrder):
+        """
+        Add one order.
+
+        :param order: The order.
+        """
+        key = self._key([getattr(order, x) for x in self.group_by])
+        self._group(key).add(order.price, order.volume_remain)
+
+    def extend(self, orders: Iterable[MarketOrder]):
+        """
+        Add orders one at a time, e.g. from :meth:`MarketOrderRecordReader.read_records`.
+
+        :param orders: The orders.
+        """
+        for order in orders:
+            self.add(order)
+
+    def add_columns(self, columns: Dict[str, Sequence]):
+        """
+        Add a chunk of orders as columns, see :func:`read_market_order_columns`.
+
+        :param columns: A dict of field name to values.
+        """
+        keys = zip(*(columns[x] for x in self.group_by))
+        for key, price, volume in zip(keys, columns["price"], columns["volume_remain"]):
+            self._group(self._key(key)).add(price, volume)
+
+    def merge(self, other: "MarketOrderAggregator") -> "MarketOrderAggregator":
+        """
+        Add the groups of another aggregator to this one.
+
+        :param other: An aggregator with the same `group_by` and `relative_accuracy`.
+        :raises ValueError: If the aggregators are not compatible.
+        :return: This aggregator.
+        """
+        if (other.group_by, other.relative_accuracy) != (
+            self.group_by,
+            self.relative_accuracy,
+        ):
+            raise ValueError("Can not merge aggregators with different settings.")
+        for key, stats in other.groups.items():
+            self._group(key).merge(stats)
+        return self
+
+
+def aggregate_market_order_file(
+    file_path: Path,
+    group_by: Sequence[str] = DEFAULT_GROUP_BY,
+    relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY,
+) -> MarketOrderAggregator:
+    """
+    Aggregate a market order csv file, one chunk of rows at a time.
+
+    :param file_path: The :py:class:`pathlib.Path` to the csv file.
+    :param group_by: The fields to group by. Defaults to :data:`DEFAULT_GROUP_BY`.
+    :param relative_accuracy: The relative error of percentiles. Defaults to 0.01.
+    :return: The aggregated statistics.
+    """
+    aggregator = MarketOrderAggregator(group_by, relative_accuracy)
+    with open(file_path, encoding="utf8", newline="") as file_in:
+        for columns in read_market_order_columns(file_in):
+            aggregator.add_columns(columns)
+    return aggregator
+
+
+def aggregate_market_order_files(
+    file_paths: Iterable[Path],
+    group_by: Sequence[str] = DEFAULT_GROUP_BY,
+    relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY,
+    max_workers: Optional[int] = None,
+) -> MarketOrderAggregator:
+    """
+    Aggregate market order csv files in separate processes, and merge the results.
+
+    :param file_paths: The :py:class:`pathlib.Path` of each csv file.
+    :param group_by: The fields to group by. Defaults to :data:`DEFAULT_GROUP_BY`.
+    :param relative_accuracy: The relative error of percentiles. Defaults to 0.01.
+    :param max_workers: Number of processes. Defaults to ``os.cpu_count()``.
+    :return: The merged statistics of all the files.
+    """
+    file_paths = list(file_paths)
+    aggregator = MarketOrderAggregator(group_by, relative_accuracy)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        partials: List[Future] = [
+            executor.submit(
+                aggregate_market_order_file, file_path, group_by, relative_accuracy
+            )
+            for file_path in file_paths
+        ]
+        for partial in partials:
+            aggregator.merge(partial.result())
+    return aggregator
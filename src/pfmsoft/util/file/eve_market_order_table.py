@@ -0,0 +1,378 @@
+"""A columnar, array backed store for large collections of :class:`MarketOrder`.
+
+Each field is held in a typed :py:mod:`array`, so an order costs 87 bytes of
+column data instead of a dataclass instance with its own `__dict__`. `issued` is stored as
+integer seconds since the epoch, and `range_` as a code into a shared list of
+categories.
+"""
+import logging
+from array import array
+from datetime import datetime, timedelta
+from itertools import compress, repeat
+from operator import eq
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from pfmsoft.util.file.eve_market_orders import MarketOrder
+
+#### setting up logger ####
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+EPOCH = datetime(1970, 1, 1)
+
+#: The `range_` values used by ESI, pre-seeded so their codes are stable.
+RANGE_CATEGORIES = (
+    "station",
+    "solarsystem",
+    "region",
+    "1",
+    "2",
+    "3",
+    "4",
+    "5",
+    "10",
+    "20",
+    "30",
+    "40",
+)
+
+#: Column name and :py:mod:`array` type code, in :class:`MarketOrder` field order.
+COLUMN_TYPES = (
+    ("duration", "i"),
+    ("is_buy_order", "b"),
+    ("issued", "q"),
+    ("location_id", "q"),
+    ("min_volume", "q"),
+    ("order_id", "q"),
+    ("price", "d"),
+    ("range_", "H"),
+    ("system_id", "q"),
+    ("type_id", "q"),
+    ("volume_remain", "q"),
+    ("volume_total", "q"),
+)
+COLUMN_NAMES = tuple(x[0] for x in COLUMN_TYPES)
+
+
+def datetime_to_epoch(value: datetime) -> int:
+    """Convert a naive UTC datetime to whole seconds since the epoch."""
+    return (value - EPOCH) // timedelta(seconds=1)
+
+
+def epoch_to_datetime(value: int) -> datetime:
+    """Convert seconds since the epoch to a naive UTC datetime."""
+    return EPOCH + timedelta(seconds=value)
+
+
+class MarketOrderTable:
+    """
+    Market orders stored column by column.
+
+    Indexing or iterating the table gives :class:`MarketOrderRow` views, which
+    read like a :class:`MarketOrder`. Use :meth:`to_orders` to get real
+    :class:`MarketOrder` objects back.
+
+    :param orders: Initial orders to add. Defaults to ``None``.
+    :param range_categories: Initial `range_` categories. Defaults to
+        :data:`RANGE_CATEGORIES`, unknown values are added as they are seen.
+    """
+
+    def __init__(
+        self,
+        orders: Optional[Iterable[MarketOrder]] = None,
+        range_categories: Sequence[str] = RANGE_CATEGORIES,
+    ):
+        self.columns: Dict[str, array] = {
+            name: array(type_code) for name, type_code in COLUMN_TYPES
+        }
+        self.range_categories: List[str] = list(range_categories)
+        self._range_codes: Dict[str, int] = {
+            value: code for code, value in enumerate(self.range_categories)
+        }
+        if orders is not None:
+            self.extend(orders)
+
+    def __len__(self) -> int:
+        return len(self.columns["order_id"])
+
+    def __getitem__(self, index: int) -> "MarketOrderRow":
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("MarketOrderTable index out of range")
+        return MarketOrderRow(self, index)
+
+    def __iter__(self) -> Iterator["MarketOrderRow"]:
+        return (MarketOrderRow(self, index) for index in range(len(self)))
+
+    def __repr__(self):
+        return f"<MarketOrderTable(orders={len(self)})>"
+
+    def range_code(self, range_: str) -> int:
+        """
+        Get the code for a `range_` value, adding a new category if needed.
+
+        :param range_: The range value, e.g. "region".
+        :return: The category code.
+        """
+        code = self._range_codes.get(range_)
+        if code is None:
+            code = len(self.range_categories)
+            self.range_categories.append(range_)
+            self._range_codes[range_] = code
+        return code
+
+    def append(self, order: MarketOrder):
+        """
+        Add one order to the end of the table.
+
+        :param order: The order to add.
+        :raises TypeError: If a value has the wrong type for its column.
+        :raises OverflowError: If a value is out of range for its column.
+        """
+        columns = self.columns
+        size = len(self)
+        try:
+            columns["duration"].append(order.duration)
+            columns["is_buy_order"].append(order.is_buy_order)
+            columns["issued"].append(datetime_to_epoch(order.issued))
+            columns["location_id"].append(order.location_id)
+            columns["min_volume"].append(order.min_volume)
+            columns["order_id"].append(order.order_id)
+            columns["price"].append(order.price)
+            columns["range_"].append(self.range_code(order.range_))
+            columns["system_id"].append(order.system_id)
+            columns["type_id"].append(order.type_id)
+            columns["volume_remain"].append(order.volume_remain)
+            columns["volume_total"].append(order.volume_total)
+        except Exception:
+            # Keep the columns the same length if a value can not be stored.
+            for column in columns.values():
+                del column[size:]
+            raise
+
+    def extend(self, orders: Iterable[MarketOrder]):
+        """
+        Add orders to the end of the table.
+
+        :param orders: The orders to add, e.g. from :meth:`MarketOrderRecordReader.read_records`.
+        """
+        for order in orders:
+            self.append(order)
+
+    def extend_columns(self, values: Dict[str, Iterable[Any]]):
+        """
+        Add orders given as whole columns.
+
+        `issued` values are seconds since the epoch, and `range_` values are the
+        range strings, which are converted to codes.
+
+        :param values: An iterable of values for every column in :data:`COLUMN_NAMES`.
+        :raises ValueError: If a column is missing, or the columns differ in length.
+        """
+        missing = set(COLUMN_NAMES) - set(values)
+        if missing:
+            raise ValueError(f"Missing columns {sorted(missing)}")
+        converted = {}
+        for name in COLUMN_NAMES:
+            column_values = values[name]
+            if name == "range_":
+                column_values = map(self.range_code, column_values)
+            converted[name] = array(self.columns[name].typecode, column_values)
+        if len({len(x) for x in converted.values()}) != 1:
+            raise ValueError("All columns must have the same number of values.")
+        for name, column_values in converted.items():
+            self.columns[name].extend(column_values)
+
+    def column(self, name: str) -> array:
+        """
+        Get the array holding a column.
+
+        :param name: A name from :data:`COLUMN_NAMES`.
+        :return: The column array. Changes to it change the table.
+        """
+        return self.columns[name]
+
+    def to_order(self, index: int) -> MarketOrder:
+        """
+        Make a :class:`MarketOrder` from one row.
+
+        :param index: The row index.
+        :return: The order.
+        """
+        columns = self.columns
+        return MarketOrder(
+            duration=columns["duration"][index],
+            is_buy_order=bool(columns["is_buy_order"][index]),
+            issued=epoch_to_datetime(columns["issued"][index]),
+            location_id=columns["location_id"][index],
+            min_volume=columns["min_volume"][index],
+            order_id=columns["order_id"][index],
+            price=columns["price"][index],
+            range_=self.range_categories[columns["range_"][index]],
+            system_id=columns["system_id"][index],
+            type_id=columns["type_id"][index],
+            volume_remain=columns["volume_remain"][index],
+            volume_total=columns["volume_total"][index],
+        )
+
+    def to_orders(self, indexes: Optional[Iterable[int]] = None) -> List[MarketOrder]:
+        """
+        Make :class:`MarketOrder` objects from the table.
+
+        :param indexes: The rows to convert. Defaults to ``None``, all rows.
+        :return: The orders.
+        """
+        if indexes is None:
+            indexes = range(len(self))
+        return [self.to_order(index) for index in indexes]
+
+    def where(self, **criteria: Any) -> List[int]:
+        """
+        Find the rows where columns equal the given values.
+
+        Only the first criterion scans the whole column, at C speed, the rest only
+        check the rows that already matched.
+
+        :Example:
+            table.where(type_id=34, is_buy_order=True)
+
+        :param `**criteria`: Column names and the values they must equal. A
+            `range_` value is given as the range string.
+        :raises ValueError: If a column name is not valid.
+        :return: The matching row indexes, in order.
+        """
+        indexes: Optional[List[int]] = None
+        for name, value in criteria.items():
+            if name not in self.columns:
+                raise ValueError(f"{name} is not a valid column name.")
+            if name == "range_":
+                value = self._range_codes.get(value, -1)
+            elif name == "issued" and isinstance(value, datetime):
+                value = datetime_to_epoch(value)
+            column = self.columns[name]
+            if indexes is None:
+                indexes = list(
+                    compress(range(len(column)), map(eq, column, repeat(value)))
+                )
+            else:
+                indexes = [index for index in indexes if column[index] == value]
+        if indexes is None:
+            return list(range(len(self)))
+        return indexes
+
+    def take(self, indexes: Iterable[int]) -> "MarketOrderTable":
+        """
+        Make a new table from a selection of rows.
+
+        :param indexes: The row indexes to copy.
+        :return: The new table. It shares the `range_` categories of this table.
+        """
+        indexes = list(indexes)
+        table = MarketOrderTable(range_categories=self.range_categories)
+        for name, column in self.columns.items():
+            table.columns[name] = array(column.typecode, [column[x] for x in indexes])
+        return table
+
+    def sorted_by(self, name: str, reverse: bool = False) -> "MarketOrderTable":
+        """
+        Make a new table sorted by a column.
+
+        :param name: A name from :data:`COLUMN_NAMES`. `range_` sorts by category code.
+        :param reverse: Sort in descending order. Defaults to ``False``.
+        :return: The new table.
+        """
+        column = self.columns[name]
+        return self.take(
+            sorted(range(len(column)), key=column.__getitem__, reverse=reverse)
+        )
+
+    def filter(self, **criteria: Any) -> "MarketOrderTable":
+        """
+        Make a new table of the rows matching :meth:`where`.
+
+        :param `**criteria`: Column names and the values they must equal.
+        :return: The new table.
+        """
+        return self.take(self.where(**criteria))
+
+
+class MarketOrderRow:
+    """
+    A read only view of one row of a :class:`MarketOrderTable`.
+
+    Has the same attributes as :class:`MarketOrder`.
+    """
+
+    __slots__ = ("_table", "_index")
+
+    def __init__(self, table: MarketOrderTable, index: int):
+        self._table = table
+        self._index = index
+
+    def __repr__(self):
+        return f"<MarketOrderRow({self.to_order()})>"
+
+    def __eq__(self, other):
+        if isinstance(other, MarketOrderRow):
+            return self.to_order() == other.to_order()
+        if isinstance(other, MarketOrder):
+            return self.to_order() == other
+        return NotImplemented
+
+    def to_order(self) -> MarketOrder:
+        """Make a :class:`MarketOrder` from this row."""
+        return self._table.to_order(self._index)
+
+    def to_string(self):
+        """The row as strings, see :meth:`MarketOrder.to_string`."""
+        return self.to_order().to_string()
+
+    @property
+    def duration(self) -> int:
+        return self._table.columns["duration"][self._index]
+
+    @property
+    def is_buy_order(self) -> bool:
+        return bool(self._table.columns["is_buy_order"][self._index])
+
+    @property
+    def issued(self) -> datetime:
+        return epoch_to_datetime(self._table.columns["issued"][self._index])
+
+    @property
+    def location_id(self) -> int:
+        return self._table.columns["location_id"][self._index]
+
+    @property
+    def min_volume(self) -> int:
+        return self._table.columns["min_volume"][self._index]
+
+    @property
+    def order_id(self) -> int:
+        return self._table.columns["order_id"][self._index]
+
+    @property
+    def price(self) -> float:
+        return self._table.columns["price"][self._index]
+
+    @property
+    def range_(self) -> str:
+        code = self._table.columns["range_"][self._index]
+        return self._table.range_categories[code]
+
+    @property
+    def system_id(self) -> int:
+        return self._table.columns["system_id"][self._index]
+
+    @property
+    def type_id(self) -> int:
+        return self._table.columns["type_id"][self._index]
+
+    @property
+    def volume_remain(self) -> int:
+        return self._table.columns["volume_remain"][self._index]
+
+    @property
+    def volume_total(self) -> int:
+        return self._table.columns["volume_total"][self._index]
@@ -1,10 +1,53 @@
 from dataclasses import dataclass
 from datetime import datetime
-from distutils.util import strtobool
 from typing import Any, Callable, Dict, Sequence
 
 from pfmsoft.util.file.csv_record import RecordReader, RecordWriter, RemappedHeader
 
+ISSUED_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+#: The strings accepted as booleans, the same as ``distutils.util.strtobool``.
+BOOL_STRINGS: Dict[str, bool] = {
+    **{x: True for x in ("y", "yes", "t", "true", "on", "1")},
+    **{x: False for x in ("n", "no", "f", "false", "off", "0")},
+}
+BOOL_STRINGS.update({x.capitalize(): y for x, y in list(BOOL_STRINGS.items())})
+BOOL_STRINGS.update({x.upper(): y for x, y in list(BOOL_STRINGS.items())})
+
+
+def parse_bool(value: str) -> bool:
+    """
+    Parse a boolean string with a table lookup.
+
+    :param value: e.g. "True", "false" or "1".
+    :raises ValueError: If the value is not a boolean string.
+    :return: The boolean.
+    """
+    try:
+        return BOOL_STRINGS[value]
+    except KeyError:
+        result = BOOL_STRINGS.get(value.lower())
+        if result is None:
+            raise ValueError(f"invalid truth value {value!r}") from None
+        return result
+
+
+def parse_issued(value: str) -> datetime:
+    """
+    Parse an ESI timestamp, e.g. "2021-03-01T12:30:07Z".
+
+    Uses :meth:`datetime.fromisoformat`, which is several times faster than
+    :func:`datetime.strptime`. Other formats fall back to :func:`datetime.strptime`
+    with :data:`ISSUED_FORMAT`.
+
+    :param value: The timestamp string.
+    :raises ValueError: If the value is not a valid timestamp.
+    :return: A naive datetime, in UTC.
+    """
+    if len(value) != 20 or value[10] != "T" or value[19] != "Z":
+        return datetime.strptime(value, ISSUED_FORMAT)
+    return datetime.fromisoformat(value[:19])
+
 
 @dataclass
 class MarketOrder:
@@ -25,8 +68,8 @@ class MarketOrder:
     def from_strings(string_data: Sequence[str]):
         values: Dict[str, Any] = {
             "duration": int(string_data[0]),
-            "is_buy_order": bool(strtobool(string_data[1])),
-            "issued": datetime.strptime(string_data[2], "%Y-%m-%dT%H:%M:%SZ"),
+            "is_buy_order": parse_bool(string_data[1]),
+            "issued": parse_issued(string_data[2]),
             "location_id": int(string_data[3]),
             "min_volume": int(string_data[4]),
             "order_id": int(string_data[5]),
@@ -43,7 +86,7 @@ class MarketOrder:
         str_record = (
             str(self.duration),
             "True" if self.is_buy_order else "False",
-            datetime.strftime(self.issued, "%Y-%m-%dT%H:%M:%SZ"),
+            datetime.strftime(self.issued, ISSUED_FORMAT),
             str(self.location_id),
             str(self.min_volume),
             str(self.order_id),
@@ -0,0 +1,157 @@
+"""Encode and decode json with the fastest library available.
+
+orjson, msgspec and ujson are used in that order when installed, falling back
+to the standard library :mod:`json` module. Every backend takes the same
+`indent` and `sort_keys` options as :func:`json.dumps`. Output that a fast
+library can not produce, such as orjson with an indent other than 2, or
+integers wider than 64 bits, is handed to :mod:`json` instead, as is any
+payload holding NaN or Infinity, which orjson and msgspec would write as null.
+Fast backends write non ascii characters as utf8, where :mod:`json` escapes them
+by default. When decoding, orjson reads integers wider than 64 bits as floats,
+so use the "json" backend for such data.
+"""
+import json
+import logging
+import math
+from typing import Any, Callable, Dict, NamedTuple, Optional, Union
+
+#### setting up logger ####
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - depends on the environment
+    msgspec = None
+try:
+    import ujson
+except ImportError:  # pragma: no cover - depends on the environment
+    ujson = None
+
+#: Backends in order of preference.
+BACKEND_NAMES = ("orjson", "msgspec", "ujson", "json")
+
+
+class JsonBackend(NamedTuple):
+    """
+    A json library behind a common interface.
+
+    :param name: The name of the backend, one of :data:`BACKEND_NAMES`.
+    :param dumps: Encode an object to a str, with `indent` and `sort_keys`
+        key word arguments.
+    :param loads: Decode a str or bytes.
+    """
+
+    name: str
+    dumps: Callable[..., str]
+    loads: Callable[[Union[str, bytes]], Any]
+
+
+def _json_dumps(data: Any, indent: Optional[int] = None, sort_keys: bool = False):
+    return json.dumps(data, indent=indent, sort_keys=sort_keys)
+
+
+def _has_non_finite(data: Any) -> bool:
+    # NaN and Infinity are not valid json, and some libraries write them as null.
+    stack = [data]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, float):
+            if not math.isfinite(item):
+                return True
+        elif isinstance(item, dict):
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple)):
+            stack.extend(item)
+    return False
+
+
+def _orjson_dumps(data: Any, indent: Optional[int] = None, sort_keys: bool = False):
+    if indent not in (None, 2):
+        return _json_dumps(data, indent, sort_keys)
+    option = orjson.OPT_NON_STR_KEYS
+    if indent:
+        option |= orjson.OPT_INDENT_2
+    if sort_keys:
+        option |= orjson.OPT_SORT_KEYS
+    try:
+        encoded = orjson.dumps(data, option=option)
+    except orjson.JSONEncodeError:
+        return _json_dumps(data, indent, sort_keys)
+    # Only look for NaN or Infinity when the output holds a null they could be.
+    if b"null" in encoded and _has_non_finite(data):
+        return _json_dumps(data, indent, sort_keys)
+    return encoded.decode("utf8")
+
+
+def _orjson_loads(data: Union[str, bytes]) -> Any:
+    try:
+        return orjson.loads(data)
+    except orjson.JSONDecodeError:
+        return json.loads(data)
+
+
+def _msgspec_dumps(data: Any, indent: Optional[int] = None, sort_keys: bool = False):
+    try:
+        encoded = msgspec.json.encode(data, order="sorted" if sort_keys else None)
+    except (TypeError, OverflowError, msgspec.EncodeError):
+        return _json_dumps(data, indent, sort_keys)
+    if b"null" in encoded and _has_non_finite(data):
+        return _json_dumps(data, indent, sort_keys)
+    if indent:
+        encoded = msgspec.json.format(encoded, indent=indent)
+    return encoded.decode("utf8")
+
+
+def _msgspec_loads(data: Union[str, bytes]) -> Any:
+    try:
+        return msgspec.json.decode(data)
+    except msgspec.DecodeError:
+        return json.loads(data)
+
+
+def _ujson_dumps(data: Any, indent: Optional[int] = None, sort_keys: bool = False):
+    try:
+        return ujson.dumps(
+            data, indent=indent or 0, sort_keys=sort_keys, ensure_ascii=False
+        )
+    except (TypeError, OverflowError):
+        return _json_dumps(data, indent, sort_keys)
+
+
+def _available_backends() -> Dict[str, JsonBackend]:
+    backends = {}
+    if orjson is not None:
+        backends["orjson"] = JsonBackend("orjson", _orjson_dumps, _orjson_loads)
+    if msgspec is not None:
+        backends["msgspec"] = JsonBackend("msgspec", _msgspec_dumps, _msgspec_loads)
+    if ujson is not None:
+        backends["ujson"] = JsonBackend("ujson", _ujson_dumps, ujson.loads)
+    backends["json"] = JsonBackend("json", _json_dumps, json.loads)
+    return backends
+
+
+AVAILABLE_BACKENDS = _available_backends()
+
+
+def get_json_backend(name: Optional[str] = None) -> JsonBackend:
+    """
+    Get a json backend.
+
+    :param name: One of :data:`BACKEND_NAMES`. Defaults to ``None``, the first
+        installed backend in :data:`BACKEND_NAMES`.
+    :raises ValueError: If the backend is unknown, or not installed.
+    :return: The backend.
+    """
+    if name is None:
+        name = next(x for x in BACKEND_NAMES if x in AVAILABLE_BACKENDS)
+    backend = AVAILABLE_BACKENDS.get(name)
+    if backend is None:
+        if name in BACKEND_NAMES:
+            raise ValueError(f"The json backend {name!r} is not installed.")
+        raise ValueError(f"Unknown json backend {name!r}, expected {BACKEND_NAMES}.")
+    return backend
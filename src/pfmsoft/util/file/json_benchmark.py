@@ -0,0 +1,188 @@
+"""Measure json encode and decode speed for each installed json backend.
+
+The payload imitates a page of market order results from an api. Run from the
+command line, and optionally save the results as json::
+
+    python -m pfmsoft.util.file.json_benchmark --records 100000
+    python -m pfmsoft.util.file.json_benchmark --output results.json
+"""
+import logging
+import platform
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from time import perf_counter_ns
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+from pfmsoft.util.argparse.misc import ArgumentParser
+from pfmsoft.util.file.json_backend import AVAILABLE_BACKENDS, get_json_backend
+from pfmsoft.util.file.read_write import save_json
+
+#### setting up logger ####
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+DEFAULT_RECORDS = 50000
+
+
+class JsonBenchmarkResult(NamedTuple):
+    """
+    The result of one benchmark.
+
+    :param backend: The name of the json backend.
+    :param operation: "dumps", "dumps_indent" or "loads".
+    :param data_size: Bytes of encoded json.
+    :param best_ns: Fastest run, in nanoseconds.
+    :param mb_per_second: Throughput of the fastest run, in MB/s.
+    """
+
+    backend: str
+    operation: str
+    data_size: int
+    best_ns: int
+    mb_per_second: float
+
+
+def make_payload(records: int = DEFAULT_RECORDS) -> List[Dict[str, Any]]:
+    """
+    Make a list of dicts shaped like market order api results.
+
+    :param records: Number of records. Defaults to 50000.
+    :return: The payload.
+    """
+    return [
+        {
+            "duration": 90,
+            "is_buy_order": index % 3 == 0,
+            "issued": "2020-09-09T17:54:06Z",
+            "location_id": 60003760 + index % 4,
+            "min_volume": 1,
+            "order_id": 5900000000 + index,
+            "price": round(4.5 + index * 1.25, 2),
+            "range": "region",
+            "system_id": 30000142,
+            "type_id": 34 + index % 500,
+            "volume_remain": 1000 + index,
+            "volume_total": 5000,
+        }
+        for index in range(records)
+    ]
+
+
+def _best_ns(function, repeat: int) -> int:
+    best_ns = sys.maxsize
+    for _ in range(repeat):
+        start = perf_counter_ns()
+        function()
+        best_ns = min(best_ns, perf_counter_ns() - start)
+    return best_ns
+
+
+def benchmark_backend(
+    backend_name: str, payload: Any, repeat: int = 3
+) -> List[JsonBenchmarkResult]:
+    """
+    Benchmark encoding and decoding a payload with one backend.
+
+    :param backend_name: The name of an installed json backend.
+    :param payload: The data to encode.
+    :param repeat: Number of runs, the fastest is kept. Defaults to 3.
+    :return: A result for compact encoding, indented encoding, and decoding.
+    """
+    backend = get_json_backend(backend_name)
+    encoded = backend.dumps(payload).encode("utf8")
+    indented = backend.dumps(payload, indent=2)
+    results = []
+    for operation, data_size, function in (
+        ("dumps", len(encoded), lambda: backend.dumps(payload)),
+        ("dumps_indent", len(indented), lambda: backend.dumps(payload, indent=2)),
+        ("loads", len(encoded), lambda: backend.loads(encoded)),
+    ):
+        best_ns = _best_ns(function, repeat)
+        results.append(
+            JsonBenchmarkResult(
+                backend_name,
+                operation,
+                data_size,
+                best_ns,
+                (data_size / 1_000_000) / (max(best_ns, 1) / 1_000_000_000),
+            )
+        )
+    return results
+
+
+def run_benchmarks(
+    backend_names: Optional[Sequence[str]] = None,
+    records: int = DEFAULT_RECORDS,
+    repeat: int = 3,
+) -> Dict[str, Any]:
+    """
+    Benchmark each json backend on the same payload.
+
+    :param backend_names: The backends to benchmark. Defaults to all installed.
+    :param records: Number of records in the payload. Defaults to 50000.
+    :param repeat: Number of runs for each benchmark, the fastest is kept.
+        Defaults to 3.
+    :return: A json serializable dict with the machine details, and a list of
+        :class:`JsonBenchmarkResult` as dicts.
+    """
+    if backend_names is None:
+        backend_names = list(AVAILABLE_BACKENDS)
+    payload = make_payload(records)
+    results: List[JsonBenchmarkResult] = []
+    for backend_name in backend_names:
+        results.extend(benchmark_backend(backend_name, payload, repeat))
+    return {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "machine": {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+        },
+        "records": records,
+        "results": [x._asdict() for x in results],
+    }
+
+
+def format_results(results: Dict[str, Any]) -> str:
+    """
+    Format the results of :func:`run_benchmarks` as a text table, with the speed up
+    over the standard library json module.
+
+    :param results: The benchmark results.
+    :return: The formatted table.
+    """
+    baseline = {
+        x["operation"]: x["best_ns"]
+        for x in results["results"]
+        if x["backend"] == "json"
+    }
+    lines = [f"{'backend':<8} {'operation':<12} {'ms':>10} {'MB/s':>10} {'vs json':>8}"]
+    for result in results["results"]:
+        base_ns = baseline.get(result["operation"])
+        speed_up = f"{base_ns / max(result['best_ns'], 1):.1f}x" if base_ns else "-"
+        lines.append(
+            f"{result['backend']:<8} {result['operation']:<12} "
+            f"{result['best_ns'] / 1_000_000:>10.1f} "
+            f"{result['mb_per_second']:>10.1f} {speed_up:>8}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = ArgumentParser(description="Benchmark the installed json backends.")
+    parser.add_argument(
+        "--backends", nargs="+", choices=list(AVAILABLE_BACKENDS), default=None
+    )
+    parser.add_argument("--records", type=int, default=DEFAULT_RECORDS)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", type=Path, help="Save the results as json.")
+    args = parser.parse_args(argv)
+    results = run_benchmarks(args.backends, args.records, args.repeat)
+    print(format_results(results))
+    if args.output is not None:
+        save_json(results, args.output, parents=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,277 @@
+"""Write and read large json arrays one element at a time.
+
+:class:`JsonArrayWriter` appends elements to a file as they arrive, and
+:func:`iter_json_array` yields the elements of a saved array without loading the
+whole document. Both also support JSON Lines, one json document per line.
+Files may be compressed, see :func:`open_compressed`.
+"""
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Generator, Iterable, Optional, TextIO
+
+from pfmsoft.util.file.compression import (
+    INFER,
+    compression_from_suffix,
+    open_compressed,
+)
+from pfmsoft.util.file.read_write import commit_temp_file, make_temp_file
+
+#### setting up logger ####
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+_WHITESPACE = " \t\n\r"
+_ELEMENT_ENDS = _WHITESPACE + ",]"
+
+
+class JsonArrayWriter:
+    """
+    Write a json array, or JSON Lines, one element at a time.
+
+    Elements are written to a temporary file next to `file_path`. :meth:`close`
+    closes the array and moves the file into place, so `file_path` only ever holds
+    a complete array. Leaving the ``with`` block through an exception calls
+    :meth:`abort` instead, which deletes the temporary file.
+
+    :Example:
+        with JsonArrayWriter(file_path) as writer:
+            for page in pages:
+                writer.write_many(page)
+
+    :param file_path: Output :py:class:`pathlib.Path` of the file.
+    :param mode: File mode to use. As used in :func:`open`. Limited to 'w' or 'x'.
+        Defaults to 'w'.
+    :param json_lines: Write one element per line, with no enclosing array.
+        Defaults to ``False``.
+    :param parents: Make parent directories if they don't exist. As used by
+        :func:`pathlib.Path.mkdir()`. Defaults to ``False``.
+    :param exist_ok: Suppress exception if parent directory exists as directory.
+        As used by :func:`pathlib.Path.mkdir`. Defaults to ``True``.
+    :param compression: Compression of the file, see :func:`open_compressed`.
+        Defaults to inferring it from the suffix.
+    :param `**kwargs`: Additional key word arguments supplied to
+        :class:`json.JSONEncoder`.
+    :raises ValueError: If unsupported file mode is used, or `indent` is given for
+        JSON Lines.
+    :raises FileExistsError: If mode is 'x' and `file_path` exists.
+    """
+
+    def __init__(
+        self,
+        file_path: Path,
+        mode: str = "w",
+        json_lines: bool = False,
+        parents: bool = False,
+        exist_ok: bool = True,
+        compression: Optional[str] = INFER,
+        **kwargs,
+    ):
+        if mode not in ["w", "x"]:
+            raise ValueError(f"Unsupported file mode '{mode}'.")
+        if json_lines and kwargs.get("indent") is not None:
+            raise ValueError("JSON Lines can not be indented.")
+        self.file_path = file_path
+        self.json_lines = json_lines
+        self.count = 0
+        self._encode = json.JSONEncoder(**kwargs).encode
+        if not file_path.parent.exists():
+            file_path.parent.mkdir(parents=parents, exist_ok=exist_ok)
+        if mode == "x" and file_path.exists():
+            raise FileExistsError(f"File exists: '{file_path}'")
+        self._exclusive = mode == "x"
+        if compression == INFER:
+            compression = compression_from_suffix(file_path)
+        fd, self._temp_path = make_temp_file(file_path)
+        os.close(fd)
+        try:
+            self._file_out: TextIO = open_compressed(
+                self._temp_path, "w", compression, encoding="utf8"
+            )
+            if not json_lines:
+                self._file_out.write("[")
+        except BaseException:
+            self._temp_path.unlink()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def write(self, item: Any):
+        """
+        Write one element.
+
+        :param item: The element, anything :class:`json.JSONEncoder` can encode.
+        """
+        encoded = self._encode(item)
+        if self.json_lines:
+            self._file_out.write(f"{encoded}\n")
+        elif self.count:
+            self._file_out.write(f",\n{encoded}")
+        else:
+            self._file_out.write(f"\n{encoded}")
+        self.count += 1
+
+    def write_many(self, items: Iterable[Any]):
+        """
+        Write elements, e.g. a page of api results.
+
+        :param items: The elements.
+        """
+        for item in items:
+            self.write(item)
+
+    def close(self):
+        """Close the array, and move the file into place."""
+        if self._file_out.closed:
+            return
+        try:
+            if not self.json_lines:
+                self._file_out.write("\n]\n" if self.count else "]\n")
+            self._file_out.close()
+            commit_temp_file(self._temp_path, self.file_path, self._exclusive)
+        except BaseException:
+            self.abort()
+            raise
+
+    def abort(self):
+        """Close the file and delete it, leaving `file_path` untouched."""
+        try:
+            self._file_out.close()
+        finally:
+            if self._temp_path.exists():
+                self._temp_path.unlink()
+
+
+def save_json_stream(
+    items: Iterable[Any],
+    file_path: Path,
+    mode: str = "w",
+    json_lines: bool = False,
+    parents: bool = False,
+    exist_ok: bool = True,
+    compression: Optional[str] = INFER,
+    **kwargs,
+) -> int:
+    """
+    Save an iterable as a json array, or JSON Lines, without building a list.
+
+    :param items: The elements to save.
+    :param file_path: Output :py:class:`pathlib.Path` of the file.
+    :param mode: File mode to use. Limited to 'w' or 'x'. Defaults to 'w'.
+    :param json_lines: Save as JSON Lines. Defaults to ``False``.
+    :param parents: Make parent directories if they don't exist. Defaults to ``False``.
+    :param exist_ok: Suppress exception if parent directory exists as directory.
+        Defaults to ``True``.
+    :param compression: Compression of the file, see :func:`open_compressed`.
+        Defaults to inferring it from the suffix.
+    :param `**kwargs`: Additional key word arguments supplied to
+        :class:`json.JSONEncoder`.
+    :raises Exception: Any exception raised during the saving of the file.
+    :return: The number of elements saved.
+    """
+    try:
+        with JsonArrayWriter(
+            file_path, mode, json_lines, parents, exist_ok, compression, **kwargs
+        ) as writer:
+            writer.write_many(items)
+        return writer.count
+    except Exception as error:
+        logger.exception("Error trying to save json stream to %s", file_path)
+        raise error
+
+
+def iter_json_array(
+    file_path: Path,
+    json_lines: bool = False,
+    chunk_size: int = 65536,
+    compression: Optional[str] = INFER,
+    **kwargs,
+) -> Generator[Any, None, None]:
+    """
+    Yield the elements of a json array file, or the documents of a JSON Lines file.
+
+    The file is read `chunk_size` characters at a time, so memory depends on the
+    size of the largest element rather than the whole file.
+
+    :param file_path: :py:class:`pathlib.Path` to the file.
+    :param json_lines: Read JSON Lines. Defaults to ``False``.
+    :param chunk_size: Characters read at a time. Defaults to 65536.
+    :param compression: Compression of the file, see :func:`open_compressed`.
+        Defaults to inferring it from the suffix.
+    :param `**kwargs`: Additional key word arguments supplied to
+        :class:`json.JSONDecoder`.
+    :raises json.JSONDecodeError: If the file is not a json array, or JSON Lines.
+    :yield: The elements.
+    """
+    decoder = json.JSONDecoder(**kwargs)
+    with open_compressed(file_path, "rt", compression, encoding="utf8") as file_in:
+        if json_lines:
+            for line in file_in:
+                if line.strip():
+                    yield decoder.decode(line)
+            return
+        yield from _iter_array_elements(file_in, decoder, chunk_size)
+
+
+def _iter_array_elements(
+    file_in: TextIO, decoder: json.JSONDecoder, chunk_size: int
+) -> Generator[Any, None, None]:
+    buffer = ""
+    position = 0
+    at_end = False
+
+    def next_token() -> str:
+        # Skip whitespace, reading more as needed. Returns "" at the end of file.
+        nonlocal buffer, position, at_end
+        while True:
+            while position < len(buffer) and buffer[position] in _WHITESPACE:
+                position += 1
+            if position < len(buffer) or at_end:
+                return buffer[position : position + 1]
+            read_more()
+
+    def read_more():
+        nonlocal buffer, position, at_end
+        chunk = file_in.read(chunk_size)
+        at_end = not chunk
+        buffer = buffer[position:] + chunk
+        position = 0
+
+    if next_token() != "[":
+        raise json.JSONDecodeError("Expected a json array", buffer, position)
+    position += 1
+    if next_token() == "]":
+        return
+    while True:
+        next_token()
+        while True:
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if at_end:
+                    raise
+                read_more()
+                continue
+            # A number cut by the end of a chunk, e.g. "1." of "1.5", still decodes,
+            # so only accept an element once the character after it is read.
+            if at_end or (end < len(buffer) and buffer[end] in _ELEMENT_ENDS):
+                break
+            read_more()
+        position = end
+        yield item
+        token = next_token()
+        position += 1
+        if token == "]":
+            return
+        if token != ",":
+            raise json.JSONDecodeError(
+                "Expected ',' or ']' in json array", buffer, position - 1
+            )
@@ -0,0 +1,275 @@
+"""Copy or link a tree of files to a new base path, skipping unchanged targets.
+"""
+import logging
+import os
+import shutil
+import stat
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from time import perf_counter_ns
+from typing import Callable, Optional, Set, Tuple
+
+from pfmsoft.util.file.path import collect_paths, delta_path
+from pfmsoft.util.file.read_write import make_temp_file
+from pfmsoft.util.file_hash.file_hash import file_hasher
+
+#### setting up logger ####
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+MIRROR_MODES = ("copy", "hardlink", "symlink")
+COMPARE_METHODS = ("size_mtime", "hash", "none")
+COMPARE_HASH_METHOD = "blake2b"
+
+
+@dataclass
+class MirrorStats:
+    """
+    Counts and timing from :func:`mirror_paths`.
+
+    :param copied: Files copied.
+    :param linked: Files hard or symbolic linked.
+    :param skipped: Files skipped because the target was unchanged.
+    :param bytes_copied: Total bytes copied.
+    :param elapsed_ns: Time taken, in nanoseconds.
+    """
+
+    copied: int = 0
+    linked: int = 0
+    skipped: int = 0
+    bytes_copied: int = 0
+    elapsed_ns: int = 0
+
+    @property
+    def bytes_per_second(self) -> float:
+        """Copy throughput over the whole run."""
+        if self.elapsed_ns == 0:
+            return 0.0
+        return self.bytes_copied / (self.elapsed_ns / 1000000000)
+
+
+def copy_file_contents(source: Path, target: Path) -> int:
+    """
+    Copy the contents of a file, letting the kernel move the data where possible.
+
+    Tries :func:`os.copy_file_range`, then :func:`os.sendfile`, and falls back to
+    :func:`shutil.copyfileobj` on platforms or file systems that support neither.
+
+    :param source: The :py:class:`pathlib.Path` to copy from.
+    :param target: The :py:class:`pathlib.Path` to copy to. Overwritten if it exists.
+    :return: The number of bytes copied.
+    """
+    with open(source, "rb") as file_in, open(target, "wb") as file_out:
+        size = os.fstat(file_in.fileno()).st_size
+        for kernel_copy in _KERNEL_COPIES:
+            try:
+                copied = kernel_copy(file_in.fileno(), file_out.fileno())
+                if copied == size:
+                    return copied
+            except OSError:
+                pass
+            # Not supported between these files, rewind and try the next method.
+            file_in.seek(0)
+            file_out.seek(0)
+            file_out.truncate()
+        shutil.copyfileobj(file_in, file_out, 1024 * 1024)
+        return file_out.tell()
+
+
+def _copy_file_range(in_fd: int, out_fd: int) -> int:
+    copied = 0
+    while True:
+        count = os.copy_file_range(in_fd, out_fd, _KERNEL_COPY_SIZE)  # type: ignore
+        if count == 0:
+            return copied
+        copied += count
+
+
+def _sendfile(in_fd: int, out_fd: int) -> int:
+    copied = 0
+    while True:
+        count = os.sendfile(out_fd, in_fd, copied, _KERNEL_COPY_SIZE)  # type: ignore
+        if count == 0:
+            return copied
+        copied += count
+
+
+_KERNEL_COPY_SIZE = 1 << 30
+_KERNEL_COPIES = [
+    copy
+    for name, copy in (("copy_file_range", _copy_file_range), ("sendfile", _sendfile))
+    if hasattr(os, name)
+]
+
+
+def target_is_current(source: Path, target: Path, compare: str = "size_mtime") -> bool:
+    """
+    Check if a target file already matches its source.
+
+    :param source: The source :py:class:`pathlib.Path`.
+    :param target: The target :py:class:`pathlib.Path`.
+    :param compare: "size_mtime" compares size and modification time, "hash" compares
+        size and then contents, "none" always reports the target as out of date.
+    :raises ValueError: If `compare` is not valid.
+    :return: ``True`` if the target can be skipped. A target that is a symbolic
+        link is never current.
+    """
+    if compare not in COMPARE_METHODS:
+        raise ValueError(
+            f"Unsupported compare '{compare}'. Must be one of {COMPARE_METHODS}"
+        )
+    if compare == "none":
+        return False
+    try:
+        target_stat = target.lstat()
+    except FileNotFoundError:
+        return False
+    if stat.S_ISLNK(target_stat.st_mode):
+        # A link left by a symlink mirror is not a copy, whatever it points to.
+        return False
+    source_stat = source.stat()
+    if source_stat.st_size != target_stat.st_size:
+        return False
+    if compare == "size_mtime":
+        return source_stat.st_mtime_ns == target_stat.st_mtime_ns
+    return (
+        file_hasher(source, COMPARE_HASH_METHOD).file_hash
+        == file_hasher(target, COMPARE_HASH_METHOD).file_hash
+    )
+
+
+def mirror_file(
+    source: Path, target: Path, mode: str = "copy", compare: str = "size_mtime"
+) -> Tuple[str, int]:
+    """
+    Copy or link one file, unless the target is already current.
+
+    Copies are written to a uniquely named temporary file next to the target and
+    renamed into place, so an interrupted copy never leaves a partial target. The
+    source permissions and modification time are copied to the target.
+
+    :param source: The source :py:class:`pathlib.Path`.
+    :param target: The target :py:class:`pathlib.Path`. Parent directories are created.
+    :param mode: "copy", "hardlink" or "symlink". Defaults to "copy".
+    :param compare: How to detect an unchanged target, see :func:`target_is_current`.
+    :raises ValueError: If `mode` or `compare` is not valid.
+    :return: The action taken, "copied", "linked" or "skipped", and the bytes copied.
+    """
+    if mode not in MIRROR_MODES:
+        raise ValueError(f"Unsupported mode '{mode}'. Must be one of {MIRROR_MODES}")
+    if mode == "copy" and target_is_current(source, target, compare):
+        return "skipped", 0
+    if mode == "hardlink" and target.exists() and os.path.samefile(source, target):
+        return "skipped", 0
+    if mode == "symlink" and target.is_symlink():
+        if os.readlink(target) == os.fspath(source.absolute()):
+            return "skipped", 0
+    target.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_path = make_temp_file(target)
+    os.close(fd)
+    try:
+        if mode != "copy":
+            # Links need a free name, a clash makes the link fail rather than replace.
+            temp_path.unlink()
+        if mode == "copy":
+            count = copy_file_contents(source, temp_path)
+            shutil.copystat(source, temp_path)
+        elif mode == "hardlink":
+            count = 0
+            os.link(source, temp_path)
+        else:
+            count = 0
+            temp_path.symlink_to(source.absolute())
+        temp_path.replace(target)
+    except BaseException:
+        if temp_path.is_symlink() or temp_path.exists():
+            temp_path.unlink()
+        raise
+    return ("copied" if mode == "copy" else "linked"), count
+
+
+def mirror_paths(
+    base_path: Path,
+    glob_pattern: str,
+    new_base_path: Path,
+    path_filter: Optional[Callable[[Path], bool]] = None,
+    mode: str = "copy",
+    compare: str = "size_mtime",
+    max_workers: int = 8,
+    max_in_flight: Optional[int] = None,
+) -> MirrorStats:
+    """
+    Mirror the files matched under `base_path` to the same relative paths under
+    `new_base_path`, as computed by :func:`delta_path`.
+
+    Files are copied or linked on a thread pool, see :func:`mirror_file`. Only
+    files are mirrored, directories are created as needed.
+
+    :param base_path: The starting :py:class:`pathlib.Path`.
+    :param glob_pattern: Glob pattern to match, using `base_path`. e.g `"*"` or `"**/*"`
+    :param new_base_path: The new base path.
+    :param path_filter: An additional filter to use for things that are hard to
+        descirbe with glob. Defaults to ``None``.
+    :param mode: "copy", "hardlink" or "symlink". Defaults to "copy".
+    :param compare: How to detect an unchanged target, see :func:`target_is_current`.
+        Defaults to "size_mtime".
+    :param max_workers: Number of copy threads. Defaults to 8.
+    :param max_in_flight: Maximum number of files submitted but not finished.
+        Defaults to four times `max_workers`.
+    :raises ValueError: `base_path` must exist and be a directory, and `mode` and
+        `compare` must be valid.
+    :return: The counts and timing of the run.
+    """
+    if mode not in MIRROR_MODES:
+        raise ValueError(f"Unsupported mode '{mode}'. Must be one of {MIRROR_MODES}")
+    if compare not in COMPARE_METHODS:
+        raise ValueError(
+            f"Unsupported compare '{compare}'. Must be one of {COMPARE_METHODS}"
+        )
+    if max_in_flight is None:
+        max_in_flight = max_workers * 4
+    start = perf_counter_ns()
+    stats = MirrorStats()
+
+    def record(done: Set[Future]):
+        for future in done:
+            action, count = future.result()
+            if action == "copied":
+                stats.copied += 1
+            elif action == "linked":
+                stats.linked += 1
+            else:
+                stats.skipped += 1
+            stats.bytes_copied += count
+
+    paths_in = collect_paths(base_path, glob_pattern, path_filter)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending: Set[Future] = set()
+        try:
+            for path_in in paths_in:
+                if not path_in.is_file():
+                    continue
+                path_out = delta_path(base_path, path_in, new_base_path)
+                pending.add(
+                    executor.submit(mirror_file, path_in, path_out, mode, compare)
+                )
+                if len(pending) >= max_in_flight:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    record(done)
+            done, pending = wait(pending)
+            record(done)
+        finally:
+            for future in pending:
+                future.cancel()
+    stats.elapsed_ns = perf_counter_ns() - start
+    logger.info(
+        "Mirrored %s to %s - %d copied, %d linked, %d skipped, %s bytes per second.",
+        base_path,
+        new_base_path,
+        stats.copied,
+        stats.linked,
+        stats.skipped,
+        f"{stats.bytes_per_second:.1f}",
+    )
+    return stats
@@ -1,6 +1,18 @@
 import logging
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from fnmatch import fnmatch
 from pathlib import Path
-from typing import Callable, Generator, Optional
+from typing import (
+    Callable,
+    Generator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
 #### setting up logger ####
 logger = logging.getLogger(__name__)
@@ -90,3 +102,105 @@ def collect_paths(
     for path_in in paths_in:
         if path_filter(path_in):
             yield path_in
+
+
+class PathStat(NamedTuple):
+    """
+    A lightweight path record yielded by :func:`scan_paths`.
+
+    :param path: The path as a string.
+    :param stat: The :py:class:`os.stat_result` of the path, not following symlinks.
+    """
+
+    path: str
+    stat: os.stat_result
+
+
+def scan_paths(
+    base_path: Path,
+    pattern: str = "*",
+    prune_patterns: Sequence[str] = (),
+    entry_filter: Optional[Callable[[os.DirEntry], bool]] = None,
+    include_dirs: bool = True,
+    max_workers: int = 1,
+    with_stat: bool = False,
+) -> Generator[Union[Path, PathStat], None, None]:
+    """
+    Recursively collect paths using :func:`os.scandir`.
+
+    A faster alternative to ``collect_paths(base_path, "**/*")`` for large trees.
+    Filters are given the :py:class:`os.DirEntry`, whose type checks and stat
+    results are cached, so a path is stat-ed at most once. Directories are
+    descended without following symlinks, and directories that can not be read
+    are logged and skipped.
+
+    With `max_workers` greater than one, directories are scanned on a thread pool,
+    which helps on network and NVMe file systems. Paths are then yielded in the
+    order the scans complete.
+
+    :param base_path: A starting :py:class:`pathlib.Path`
+    :param pattern: :func:`fnmatch.fnmatch` pattern matched against each entry name.
+        Defaults to ``"*"``.
+    :param prune_patterns: Directories with a name matching any of these patterns are
+        neither yielded nor descended. Defaults to no pruning.
+    :param entry_filter: An additional filter for matched entries. Defaults to ``None``.
+    :param include_dirs: Yield directories as well as files. Defaults to ``True``.
+    :param max_workers: Number of threads used to scan directories. Defaults to 1.
+    :param with_stat: Yield :class:`PathStat` records instead of :py:class:`pathlib.Path`.
+        Defaults to ``False``.
+    :raises ValueError: base_path must exist and be a directory.
+    :yield: The matched paths.
+    """
+
+    if not base_path.is_dir():
+        raise ValueError(f"{base_path} - Not a directory or does not exist.")
+
+    match_all = pattern == "*"
+
+    def scan_dir(dir_path: str) -> Tuple[List[Union[Path, PathStat]], List[str]]:
+        found: List[Union[Path, PathStat]] = []
+        sub_dirs: List[str] = []
+        try:
+            with os.scandir(dir_path) as entries:
+                for entry in entries:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                    if is_dir:
+                        if any(fnmatch(entry.name, x) for x in prune_patterns):
+                            continue
+                        sub_dirs.append(entry.path)
+                        if not include_dirs:
+                            continue
+                    if not match_all and not fnmatch(entry.name, pattern):
+                        continue
+                    if entry_filter is not None and not entry_filter(entry):
+                        continue
+                    if with_stat:
+                        found.append(
+                            PathStat(entry.path, entry.stat(follow_symlinks=False))
+                        )
+                    else:
+                        found.append(Path(entry.path))
+        except OSError as error:
+            logger.warning("Skipping %s - %s", dir_path, error)
+        return found, sub_dirs
+
+    root = os.fspath(base_path)
+    if max_workers <= 1:
+        stack = [root]
+        while stack:
+            found, sub_dirs = scan_dir(stack.pop())
+            yield from found
+            stack.extend(reversed(sub_dirs))
+        return
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = {executor.submit(scan_dir, root)}
+        try:
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    found, sub_dirs = future.result()
+                    pending.update(executor.submit(scan_dir, x) for x in sub_dirs)
+                    yield from found
+        finally:
+            for future in pending:
+                future.cancel()
@@ -7,27 +7,150 @@ __version__ = "1.3.0"
 
 import json
 import logging
+import os
+import tempfile
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Iterable
+from typing import IO, Any, Iterable, Iterator, Optional, Set, Tuple
+
+from pfmsoft.util.file.compression import INFER, open_compressed
+from pfmsoft.util.file.json_backend import get_json_backend
 
 #### setting up logger ####
 logger = logging.getLogger(__name__)
 logger.addHandler(logging.NullHandler())
 
+#: Characters joined in memory by :func:`save_lines` before each write.
+DEFAULT_COALESCE_SIZE = 256 * 1024
+
+# mkstemp creates files readable only by the owner, so temporary files are given
+# the permissions a plain open would have. The umask can only be read by setting it.
+_UMASK = os.umask(0)
+os.umask(_UMASK)
 
-def load_json(file_path: Path, **kwargs) -> Any:
+
+def make_temp_file(file_path: Path) -> Tuple[int, Path]:
     """
-    Load a json file.
+    Create a uniquely named temporary file next to `file_path`.
+
+    :param file_path: :py:class:`pathlib.Path` of the file the temporary file will
+        become, see :func:`commit_temp_file`.
+    :return: An open os level file descriptor, and the path of the temporary file.
+    """
+    fd, temp_name = tempfile.mkstemp(
+        prefix=f".{file_path.name}.", suffix=".partial", dir=file_path.parent
+    )
+    if hasattr(os, "fchmod"):
+        os.fchmod(fd, 0o666 & ~_UMASK)
+    return fd, Path(temp_name)
+
+
+def commit_temp_file(temp_path: Path, file_path: Path, exclusive: bool = False):
+    """
+    Move a closed temporary file into place.
+
+    :param temp_path: :py:class:`pathlib.Path` to the temporary file.
+    :param file_path: :py:class:`pathlib.Path` it becomes.
+    :param exclusive: Fail rather than replace an existing file, by hard linking
+        the temporary file to `file_path`. Defaults to ``False``.
+    :raises FileExistsError: If `exclusive` and `file_path` exists.
+    """
+    if exclusive:
+        os.link(temp_path, file_path)
+        temp_path.unlink()
+    else:
+        temp_path.replace(file_path)
+
+
+@contextmanager
+def open_for_save(
+    file_path: Path,
+    mode: str = "w",
+    atomic: bool = False,
+    fsync: bool = False,
+    **kwargs,
+) -> Iterator[IO]:
+    """
+    Open a file for writing, optionally atomically and durably.
+
+    With `atomic`, data is written to a uniquely named temporary file next to
+    `file_path`, which replaces `file_path` only after it is closed, so a crash
+    never leaves a partial file. In mode 'x' the temporary file is hard linked
+    into place, which fails if `file_path` was created meanwhile. With `fsync`,
+    the data is flushed to disk before the file is closed, and with `atomic` the
+    rename is flushed too.
+
+    :param file_path: :py:class:`pathlib.Path` to the file.
+    :param mode: File mode to use. As used in :func:`open()`. Defaults to 'w'.
+    :param atomic: Write to a temporary file, then rename it. Not supported for
+        append modes. Defaults to ``False``.
+    :param fsync: Flush the data to disk. Defaults to ``False``.
+    :param `**kwargs`: Additional key word arguments supplied to :func:`open()`.
+    :raises ValueError: If `atomic` is used with an append mode.
+    :raises FileExistsError: If mode is 'x' and `file_path` exists.
+    :yield: The open file.
+    """
+    if not atomic:
+        with file_path.open(mode, **kwargs) as file_out:
+            yield file_out
+            if fsync:
+                file_out.flush()
+                os.fsync(file_out.fileno())
+        return
+    if "a" in mode:
+        raise ValueError("Atomic writes can not append.")
+    exclusive = "x" in mode
+    if exclusive:
+        if file_path.exists():
+            raise FileExistsError(f"File exists: '{file_path}'")
+        mode = mode.replace("x", "w")
+    fd, temp_path = make_temp_file(file_path)
+    try:
+        with open(fd, mode, **kwargs) as file_out:
+            yield file_out
+            if fsync:
+                file_out.flush()
+                os.fsync(file_out.fileno())
+        commit_temp_file(temp_path, file_path, exclusive)
+    except BaseException:
+        if temp_path.exists():
+            temp_path.unlink()
+        raise
+    if fsync and os.name == "posix":
+        dir_fd = os.open(file_path.parent, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+def load_json(
+    file_path: Path,
+    compression: Optional[str] = INFER,
+    json_backend: Optional[str] = "json",
+    **kwargs,
+) -> Any:
+    """
+    Load a json file, decompressing it if needed.
 
     :param file_path: :py:class:`pathlib.Path` to the json file.
+    :param compression: Compression of the file, see :func:`open_compressed`. Defaults
+        to inferring it from the suffix, e.g. ".json.gz".
+    :param json_backend: The json library to use, see :func:`get_json_backend`.
+        ``None`` for the fastest installed. Defaults to "json", the standard library.
     :param `**kwargs`: Addtional key word arguments supplied to :func:`json.load()`.
+        If given, :mod:`json` is used whatever the `json_backend`.
     :raises Exception: Any exception raised during the loading of the file, or the conversion to json.
     :return: The loaded json file.
     """
 
     try:
-        with open(file_path, "r") as json_file:
-            data = json.load(json_file, **kwargs)
+        with open_compressed(file_path, "rb", compression) as json_file:
+            if kwargs:
+                data = json.load(json_file, **kwargs)
+            else:
+                data = get_json_backend(json_backend).loads(json_file.read())
         return data
     except Exception as error:
         logger.exception(
@@ -44,10 +167,14 @@ def save_json(
     sort_keys: bool = False,
     parents: bool = False,
     exist_ok: bool = True,
+    compression: Optional[str] = INFER,
+    compression_level: Optional[int] = None,
+    compression_threads: int = 0,
+    json_backend: Optional[str] = "json",
     **kwargs,
 ):
     """
-    Save a json file. Can create parent directories if necessary.
+    Save a json file, compressing it if needed. Can create parent directories if necessary.
 
     'w' for writing (truncating the file if it already exists), 'x' for exclusive
     creation.
@@ -59,21 +186,34 @@ def save_json(
     :param sort_keys: Sort key of json dicts. Defaults to ``False``.
     :param parents: Make parent directories if they don't exist. As used by :func:`pathlib.Path.mkdir()`. Defaults to ``False``.
     :param exist_ok: Suppress exception if parent directory exists as directory. As used by :func:`pathlib.Path.mkdir`. Defaults to ``True``.
-    :param `**kwargs`: Addtional key word arguments supplied to :func:`json.dump()`.
+    :param compression: Compression of the file, see :func:`open_compressed`. Defaults to inferring it from the suffix.
+    :param compression_level: Compression level, ``None`` for the codec default. Defaults to ``None``.
+    :param compression_threads: Compression threads, where the codec supports them. Defaults to 0.
+    :param json_backend: The json library to use, see :func:`get_json_backend`. ``None`` for the fastest installed. Defaults to "json", the standard library.
+    :param `**kwargs`: Addtional key word arguments supplied to :func:`json.dump()`. If given, :mod:`json` is used whatever the `json_backend`.
     :raises ValueError: If unsupported file mode is used.
     :raises Exception: Any exception raised during the saving of the file, or the conversion from json.
     """
 
-    kwargs["indent"] = indent
-    kwargs["sort_keys"] = sort_keys
-
     try:
         if mode not in ["w", "x"]:
             raise ValueError(f"Unsupported file mode '{mode}'.")
         if not file_path.parent.exists():
             file_path.parent.mkdir(parents=parents, exist_ok=exist_ok)
-        with open(file_path, mode) as json_file:
-            json.dump(data, json_file, **kwargs)
+        with open_compressed(
+            file_path,
+            mode,
+            compression,
+            level=compression_level,
+            threads=compression_threads,
+            encoding="utf8",
+        ) as json_file:
+            backend = get_json_backend(json_backend)
+            if kwargs or backend.name == "json":
+                # Streams the document, rather than building it in memory first.
+                json.dump(data, json_file, indent=indent, sort_keys=sort_keys, **kwargs)
+            else:
+                json_file.write(backend.dumps(data, indent=indent, sort_keys=sort_keys))
     except Exception as error:
         logger.exception(
             "Error trying to save json data to %s", file_path, exc_info=True
@@ -87,6 +227,8 @@ def save_string(
     mode: str = "w",
     parents: bool = False,
     exist_ok: bool = True,
+    atomic: bool = False,
+    fsync: bool = False,
     **kwargs,
 ) -> int:
     """
@@ -100,6 +242,8 @@ def save_string(
     :param mode: File mode to use. As used in :func:`open()`. Limited to 'w','x', or 'a'. Defaults to 'w'.
     :param parents: Make parent directories if they don't exist. As used by :func:`pathlib.Path.mkdir()`. Defaults to ``False``.
     :param exist_ok: Suppress exception if parent directory exists as directory. As used by :func:`pathlib.Path.mkdir()`. Defaults to ``True``.
+    :param atomic: Write to a temporary file, then rename it into place. See :func:`open_for_save`. Defaults to ``False``.
+    :param fsync: Flush the file to disk before returning. Defaults to ``False``.
     :param `**kwargs`: Additional key word arguments supplied to :func:`open()`.
     :raises ValueError: If unsupported file mode is used.
     :raises Exception: Any exception raised during the saving of the file.
@@ -111,7 +255,7 @@ def save_string(
             raise ValueError(f"Unsupported file mode '{mode}'.")
         if parents:
             file_path.parent.mkdir(parents=parents, exist_ok=exist_ok)
-        with file_path.open(mode, **kwargs) as file_out:
+        with open_for_save(file_path, mode, atomic, fsync, **kwargs) as file_out:
             count = file_out.write(data)
         return count
     except Exception as error:
@@ -128,6 +272,9 @@ def save_lines(
     line_separator: str = "\n",
     parents: bool = False,
     exist_ok: bool = True,
+    atomic: bool = False,
+    fsync: bool = False,
+    coalesce_size: int = DEFAULT_COALESCE_SIZE,
     **kwargs,
 ):
     r"""
@@ -136,6 +283,9 @@ def save_lines(
     'w' for writing (truncating the file if it already exists), 'x' for exclusive
     creation and 'a' for appending
 
+    Lines are joined in memory into chunks of about `coalesce_size` characters,
+    and each chunk is written with a single call.
+
     :param data: The sequence of lines to save.
     :param file_path: :py:class:`pathlib.Path` to saved file.
     :param mode: File mode to use. As used in `open`. Limited to 'w','x', or 'a'. Defaults to 'w'.
@@ -143,6 +293,9 @@ def save_lines(
     :param parents: Make parent directories if they don't exist. As used by :func:`pathlib.Path.mkdir()`.
         Defaults to ``False``.
     :param exist_ok: Suppress exception if parent directory exists as directory. As used by :py:func:`pathlib.Path.mkdir`. Defaults to ``True``.
+    :param atomic: Write to a temporary file, then rename it into place. See :func:`open_for_save`. Defaults to ``False``.
+    :param fsync: Flush the file to disk before returning. Defaults to ``False``.
+    :param coalesce_size: Characters to join before each write. Defaults to 256 KiB.
     :param `**kwargs`: Addtional key word arguments supplied to :func:`open()`.
     :raises ValueError: If unsupported file mode is used.
     :raises Exception: Any exception raised during the saving of the file.
@@ -153,11 +306,20 @@ def save_lines(
             raise ValueError(f"Unsupported file mode '{mode}'.")
         if parents:
             file_path.parent.mkdir(parents=parents, exist_ok=exist_ok)
-        with file_path.open(mode, **kwargs) as file_out:
-            if line_separator:
-                file_out.writelines((f"{x}{line_separator}" for x in data))
-            else:
-                file_out.writelines(data)
+        if line_separator:
+            data = (f"{x}{line_separator}" for x in data)
+        with open_for_save(file_path, mode, atomic, fsync, **kwargs) as file_out:
+            chunk = []
+            chunk_size = 0
+            for line in data:
+                chunk.append(line)
+                chunk_size += len(line)
+                if chunk_size >= coalesce_size:
+                    file_out.write("".join(chunk))
+                    chunk = []
+                    chunk_size = 0
+            if chunk:
+                file_out.write("".join(chunk))
     except Exception as error:
         logger.exception("Error trying to save lines to %s", file_path, exc_info=True)
         raise error
@@ -170,6 +332,9 @@ def save_stringables(
     line_separator: str = "\n",
     parents: bool = False,
     exist_ok: bool = True,
+    atomic: bool = False,
+    fsync: bool = False,
+    coalesce_size: int = DEFAULT_COALESCE_SIZE,
     **kwargs,
 ):
     r"""
@@ -183,6 +348,9 @@ def save_stringables(
     :param parents: Make parent directories if they don't exist. As used by :func:`pathlib.Path.mkdir`.
         Defaults to ``False``.
     :param exist_ok: Suppress exception if parent directory exists as directory. As used by :func:`pathlib.Path.mkdir`. Defaults to ``True``.
+    :param atomic: Write to a temporary file, then rename it into place. See :func:`open_for_save`. Defaults to ``False``.
+    :param fsync: Flush the file to disk before returning. Defaults to ``False``.
+    :param coalesce_size: Characters to join before each write. Defaults to 256 KiB.
     :param `**kwargs`: Additional key word arguments supplied to :func:`open()`.
     :raises ValueError: If unsupported file mode is used.
     :raises Exception: Any exception raised during the saving of the file.
@@ -195,5 +363,82 @@ def save_stringables(
         line_separator=line_separator,
         parents=parents,
         exist_ok=exist_ok,
+        atomic=atomic,
+        fsync=fsync,
+        coalesce_size=coalesce_size,
         **kwargs,
     )
+
+
+def save_strings_to_files(
+    items: Iterable[Tuple[str, Path]],
+    mode: str = "w",
+    parents: bool = False,
+    exist_ok: bool = True,
+    atomic: bool = False,
+    fsync: bool = False,
+    max_workers: Optional[int] = None,
+    max_in_flight: Optional[int] = None,
+    **kwargs,
+) -> int:
+    """
+    Save many small strings, each to its own file, from a pool of threads.
+
+    Opening, writing, syncing and renaming small files mostly waits on the file
+    system, so threads overlap that waiting. Only `max_in_flight` files are
+    submitted at a time, so `items` may be a lazy iterator.
+
+    :param items: Pairs of the string to save and the :py:class:`pathlib.Path` to
+        save it to.
+    :param mode: File mode to use. Limited to 'w','x', or 'a'. Defaults to 'w'.
+    :param parents: Make parent directories if they don't exist. Defaults to ``False``.
+    :param exist_ok: Suppress exception if parent directory exists as directory.
+        Defaults to ``True``.
+    :param atomic: Write each file atomically. See :func:`open_for_save`. Defaults
+        to ``False``.
+    :param fsync: Flush each file to disk. Defaults to ``False``.
+    :param max_workers: Number of threads. Defaults to ``min(32, os.cpu_count() + 4)``.
+    :param max_in_flight: Maximum number of files submitted but not yet written.
+        Defaults to four times `max_workers`.
+    :param `**kwargs`: Additional key word arguments supplied to :func:`open()`.
+    :raises ValueError: If `max_workers` or `max_in_flight` is less than 1.
+    :raises Exception: The first exception raised saving a file. Files already
+        submitted are still written, later files are not.
+    :return: The number of files saved.
+    """
+    if max_workers is None:
+        max_workers = min(32, (os.cpu_count() or 1) + 4)
+    if max_in_flight is None:
+        max_in_flight = max_workers * 4
+    if max_workers < 1 or max_in_flight < 1:
+        raise ValueError("max_workers and max_in_flight must be at least 1.")
+    saved = 0
+    pending: Set[Future] = set()
+
+    def collect() -> int:
+        nonlocal pending
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            future.result()
+        return len(done)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for data, file_path in items:
+            pending.add(
+                executor.submit(
+                    save_string,
+                    data,
+                    file_path,
+                    mode,
+                    parents,
+                    exist_ok,
+                    atomic,
+                    fsync,
+                    **kwargs,
+                )
+            )
+            if len(pending) >= max_in_flight:
+                saved += collect()
+        while pending:
+            saved += collect()
+    return saved
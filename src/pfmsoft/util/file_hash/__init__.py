@@ -1,14 +1,34 @@
 """[summary]
 """
 
+from .async_hash import AsyncFileHasher
+from .cache import HashCache
+from .chunked import (
+    ChunkManifest,
+    build_chunk_manifest,
+    chunks_for_range,
+    merkle_root,
+    update_chunk_manifest,
+    verify_chunk_manifest,
+)
+from .duplicates import DuplicateGroup, find_duplicate_files, partial_file_hash
 from .file_hash import (
     HASH_METHODS,
     FileHash,
+    MultiFileHash,
     calculate_file_hash_from_file_handle,
     calculate_file_hash_from_path,
+    calculate_file_hashes_from_path,
     file_as_block_iterator,
+    file_as_buffer_iterator,
+    file_as_mmap_iterator,
     file_hasher,
     file_hasher_generator,
+    get_block_size,
     get_hasher,
     hash_a_byte_str_iterator,
+    multi_file_hasher,
+    multi_file_hasher_generator,
+    multi_hash_a_byte_str_iterator,
 )
+from .parallel import parallel_file_hasher_generator
@@ -0,0 +1,131 @@
+"""Hash files from asyncio code without blocking the event loop.
+"""
+import asyncio
+import logging
+from concurrent.futures import Executor
+from functools import partial
+from pathlib import Path
+from typing import BinaryIO, ByteString, Iterable, List, Optional, Union
+
+from pfmsoft.util.file_hash.file_hash import (
+    FileHash,
+    calculate_file_hash_from_file_handle,
+    file_hasher,
+    get_hasher,
+)
+
+#### setting up logger ####
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+
+class AsyncFileHasher:
+    """
+    Run file hashing in an executor, and await the results.
+
+    Reading and hashing happen on worker threads, or in the supplied executor, so
+    the event loop is free to service other tasks, e.g. in flight http requests.
+    No more than `max_concurrent` hashes run at once, further calls wait their
+    turn, so hashing cannot take over the default executor.
+
+    :Example:
+        hasher = AsyncFileHasher(max_concurrent=2)
+        result = await hasher.hash_file(Path("download.json"), "sha256")
+
+    :param max_concurrent: Maximum number of hashes running at the same time.
+        Defaults to 2.
+    :param executor: The executor to run hashes in. Defaults to ``None``, the event
+        loop's default executor.
+    """
+
+    def __init__(self, max_concurrent: int = 2, executor: Optional[Executor] = None):
+        if max_concurrent < 1:
+            raise ValueError("max_concurrent must be at least 1.")
+        self.max_concurrent = max_concurrent
+        self.executor = executor
+        # Created on first use, so that it belongs to the running event loop.
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def _run(self, func, *args):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, partial(func, *args))
+
+    async def hash_file(self, file_path: Path, hash_method: str) -> FileHash:
+        """
+        Hash a file path. The awaitable counterpart to :func:`file_hasher`.
+
+        :param file_path: The `pathlib.Path` to a file.
+        :param hash_method: The name of a hasher. See :func:`get_hasher` for valid values.
+        :returns: A NamedTuple containing hash results.
+        """
+        return await self._run(file_hasher, file_path, hash_method)
+
+    async def hash_files(
+        self, file_paths: Iterable[Path], hash_method: str
+    ) -> List[FileHash]:
+        """
+        Hash several file paths concurrently, within the concurrency limit.
+
+        Paths that are not files are skipped, as in :func:`file_hasher_generator`.
+        The check runs in the executor with the hash, and `file_paths` is consumed
+        as hashes finish, by `max_concurrent` tasks.
+
+        :param file_paths: The `pathlib.Path`s to files.
+        :param hash_method: The name of a hasher. See :func:`get_hasher` for valid values.
+        :returns: The hash results, in the same order as `file_paths`.
+        """
+        indexed_paths = enumerate(file_paths)
+        results = {}
+
+        async def worker():
+            for index, file_path in indexed_paths:
+                result = await self._run(_hash_if_file, file_path, hash_method)
+                if result is not None:
+                    results[index] = result
+
+        await asyncio.gather(*(worker() for _ in range(self.max_concurrent)))
+        return [results[index] for index in sorted(results)]
+
+    async def hash_file_handle(
+        self, file_handle: BinaryIO, hash_method: str, as_hex_str: bool = True
+    ) -> Union[ByteString, str]:
+        """
+        Hash a file handle opened in binary mode. The handle is closed afterwards.
+
+        :param file_handle: The handle for file opened in binary mode.
+        :param hash_method: The name of a hasher. See :func:`get_hasher` for valid values.
+        :param as_hex_str: Return the digest as bytes, or a hexidecimal string, by default True
+        :returns: The digest of the file.
+        """
+        hasher = get_hasher(hash_method)
+        return await self._run(
+            calculate_file_hash_from_file_handle, file_handle, hasher, None, as_hex_str
+        )
+
+    async def hash_bytes(
+        self, data: bytes, hash_method: str, as_hex_str: bool = True
+    ) -> Union[ByteString, str]:
+        """
+        Hash an in memory payload, e.g. a downloaded response body.
+
+        :param data: The bytes to hash.
+        :param hash_method: The name of a hasher. See :func:`get_hasher` for valid values.
+        :param as_hex_str: Return the digest as bytes, or a hexidecimal string, by default True
+        :returns: The digest of `data`.
+        """
+        return await self._run(_hash_bytes, data, hash_method, as_hex_str)
+
+
+def _hash_if_file(file_path: Path, hash_method: str) -> Optional[FileHash]:
+    if not file_path.is_file():
+        return None
+    return file_hasher(file_path, hash_method)
+
+
+def _hash_bytes(data: bytes, hash_method: str, as_hex_str: bool):
+    hasher = get_hasher(hash_method)
+    hasher.update(data)
+    return hasher.hexdigest() if as_hex_str else hasher.digest()
@@ -0,0 +1,296 @@
+"""Measure hashing throughput across hash methods and block sizes.
+
+Run from the command line to benchmark this machine, and optionally save the
+results as json, or compare them against a previous run::
+
+    python -m pfmsoft.util.file_hash.benchmark --output results.json
+    python -m pfmsoft.util.file_hash.benchmark --compare results.json
+"""
+import logging
+import os
+import platform
+import sys
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+from time import perf_counter_ns
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+from pfmsoft.util.argparse.misc import ArgumentParser
+from pfmsoft.util.file.read_write import load_json, save_json
+from pfmsoft.util.file_hash.file_hash import (
+    HASH_METHODS,
+    calculate_file_hash_from_path,
+    get_hasher,
+)
+
+#### setting up logger ####
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+DEFAULT_DATA_SIZES = (64 * 1024, 1024 * 1024, 16 * 1024 * 1024)
+DEFAULT_BLOCK_SIZES = (4096, 65536, 1024 * 1024)
+
+
+class BenchmarkResult(NamedTuple):
+    """
+    The result of one benchmark.
+
+    :param hash_method: The name of the hasher.
+    :param source: "memory", "file" or "mmap".
+    :param data_size: Bytes hashed per run.
+    :param block_size: Bytes passed to each `update` call.
+    :param best_ns: Fastest run, in nanoseconds.
+    :param mb_per_second: Throughput of the fastest run, in MB/s.
+    """
+
+    hash_method: str
+    source: str
+    data_size: int
+    block_size: int
+    best_ns: int
+    mb_per_second: float
+
+
+def _mb_per_second(data_size: int, elapsed_ns: int) -> float:
+    return (data_size / 1_000_000) / (max(elapsed_ns, 1) / 1_000_000_000)
+
+
+def benchmark_memory(
+    hash_method: str, data: bytes, block_size: int, repeat: int = 3
+) -> BenchmarkResult:
+    """
+    Benchmark hashing in memory data, fed to the hasher in blocks.
+
+    :param hash_method: The name of a hasher. See :func:`get_hasher` for valid values.
+    :param data: The data to hash.
+    :param block_size: Bytes passed to each `update` call.
+    :param repeat: Number of runs, the fastest is kept. Defaults to 3.
+    :return: The benchmark result.
+    """
+    view = memoryview(data)
+    blocks = [view[x : x + block_size] for x in range(0, len(view), block_size)]
+    best_ns = sys.maxsize
+    for _ in range(repeat):
+        start = perf_counter_ns()
+        hasher = get_hasher(hash_method)
+        for block in blocks:
+            hasher.update(block)
+        hasher.digest()
+        best_ns = min(best_ns, perf_counter_ns() - start)
+    return BenchmarkResult(
+        hash_method,
+        "memory",
+        len(data),
+        block_size,
+        best_ns,
+        _mb_per_second(len(data), best_ns),
+    )
+
+
+def benchmark_file(
+    hash_method: str,
+    file_path: Path,
+    block_size: int,
+    repeat: int = 3,
+    use_mmap: bool = False,
+) -> BenchmarkResult:
+    """
+    Benchmark hashing a file with :func:`calculate_file_hash_from_path`.
+
+    Later runs will usually read from the page cache, so this measures the
+    hashing and read call overhead more than the storage device.
+
+    :param hash_method: The name of a hasher. See :func:`get_hasher` for valid values.
+    :param file_path: The `pathlib.Path` to a file.
+    :param block_size: The size of the block bytes to read from the file.
+    :param repeat: Number of runs, the fastest is kept. Defaults to 3.
+    :param use_mmap: Memory map the file instead of reading it. Defaults to ``False``.
+    :return: The benchmark result.
+    """
+    data_size = file_path.stat().st_size
+    best_ns = sys.maxsize
+    for _ in range(repeat):
+        start = perf_counter_ns()
+        calculate_file_hash_from_path(
+            file_path, get_hasher(hash_method), block_size, use_mmap=use_mmap
+        )
+        best_ns = min(best_ns, perf_counter_ns() - start)
+    return BenchmarkResult(
+        hash_method,
+        "mmap" if use_mmap else "file",
+        data_size,
+        block_size,
+        best_ns,
+        _mb_per_second(data_size, best_ns),
+    )
+
+
+def benchmark_call_overhead(hash_method: str, calls: int = 10000) -> float:
+    """
+    Measure the fixed cost of hashing, by hashing a single byte many times.
+
+    :param hash_method: The name of a hasher. See :func:`get_hasher` for valid values.
+    :param calls: Number of hashes to time. Defaults to 10000.
+    :return: Average nanoseconds per create, update and digest.
+    """
+    data = b"x"
+    start = perf_counter_ns()
+    for _ in range(calls):
+        hasher = get_hasher(hash_method)
+        hasher.update(data)
+        hasher.digest()
+    return (perf_counter_ns() - start) / calls
+
+
+def run_benchmarks(
+    hash_methods: Optional[Sequence[str]] = None,
+    data_sizes: Sequence[int] = DEFAULT_DATA_SIZES,
+    block_sizes: Sequence[int] = DEFAULT_BLOCK_SIZES,
+    repeat: int = 3,
+    include_files: bool = True,
+    temp_dir: Optional[Path] = None,
+) -> Dict[str, Any]:
+    """
+    Benchmark every combination of hash method, data size and block size.
+
+    :param hash_methods: The hashers to benchmark. Defaults to all of :data:`HASH_METHODS`.
+    :param data_sizes: Sizes of the synthetic data, in bytes.
+    :param block_sizes: Block sizes to try, in bytes.
+    :param repeat: Number of runs for each benchmark, the fastest is kept. Defaults to 3.
+    :param include_files: Also benchmark hashing temporary files, with and without mmap.
+        Defaults to ``True``.
+    :param temp_dir: Directory for the temporary files. Defaults to the system default.
+    :return: A json serializable dict with the machine details, the call overhead
+        per hash method, and a list of :class:`BenchmarkResult` as dicts.
+    """
+    if hash_methods is None:
+        hash_methods = list(HASH_METHODS)
+    results: List[BenchmarkResult] = []
+    overhead = {x: benchmark_call_overhead(x) for x in hash_methods}
+    with tempfile.TemporaryDirectory(dir=temp_dir) as temp_name:
+        for data_size in data_sizes:
+            data = os.urandom(data_size)
+            file_path = Path(temp_name) / f"benchmark_{data_size}.bin"
+            if include_files:
+                file_path.write_bytes(data)
+            for hash_method in hash_methods:
+                for block_size in block_sizes:
+                    results.append(
+                        benchmark_memory(hash_method, data, block_size, repeat)
+                    )
+                    if include_files:
+                        for use_mmap in (False, True):
+                            results.append(
+                                benchmark_file(
+                                    hash_method, file_path, block_size, repeat, use_mmap
+                                )
+                            )
+    return {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "machine": {
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+        },
+        "call_overhead_ns": overhead,
+        "results": [x._asdict() for x in results],
+    }
+
+
+def compare_results(
+    baseline: Dict[str, Any], current: Dict[str, Any], tolerance: float = 0.1
+) -> List[str]:
+    """
+    Find benchmarks that got slower between two runs of :func:`run_benchmarks`.
+
+    :param baseline: The earlier results.
+    :param current: The later results.
+    :param tolerance: The allowed fractional drop in throughput. Defaults to 0.1.
+    :return: A message for each benchmark slower than the tolerance allows.
+    """
+
+    def key(result):
+        return (
+            result["hash_method"],
+            result["source"],
+            result["data_size"],
+            result["block_size"],
+        )
+
+    previous = {key(x): x["mb_per_second"] for x in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        old_speed = previous.get(key(result))
+        if old_speed is None:
+            continue
+        if result["mb_per_second"] < old_speed * (1 - tolerance):
+            regressions.append(
+                f"{'/'.join(str(x) for x in key(result))}: "
+                f"{old_speed:.1f} MB/s -> {result['mb_per_second']:.1f} MB/s"
+            )
+    return regressions
+
+
+def format_results(results: Dict[str, Any]) -> str:
+    """
+    Format the results of :func:`run_benchmarks` as a text table.
+
+    :param results: The benchmark results.
+    :return: The formatted table.
+    """
+    lines = [f"{'hash method':<11} {'overhead':>12}"]
+    for hash_method, overhead in results["call_overhead_ns"].items():
+        lines.append(f"{hash_method:<11} {overhead:>9.0f} ns")
+    lines.append("")
+    lines.append(
+        f"{'hash method':<11} {'source':<6} {'data size':>10} {'block size':>10} {'MB/s':>10}"
+    )
+    for result in results["results"]:
+        lines.append(
+            f"{result['hash_method']:<11} {result['source']:<6} "
+            f"{result['data_size']:>10} {result['block_size']:>10} "
+            f"{result['mb_per_second']:>10.1f}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = ArgumentParser(description="Benchmark the hash methods in HASH_METHODS.")
+    parser.add_argument(
+        "--hash-methods", nargs="+", choices=list(HASH_METHODS), default=None
+    )
+    parser.add_argument("--data-sizes", nargs="+", type=int, default=DEFAULT_DATA_SIZES)
+    parser.add_argument(
+        "--block-sizes", nargs="+", type=int, default=DEFAULT_BLOCK_SIZES
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--memory-only", action="store_true")
+    parser.add_argument("--output", type=Path, help="Save the results as json.")
+    parser.add_argument(
+        "--compare", type=Path, help="Report regressions against saved results."
+    )
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args(argv)
+    results = run_benchmarks(
+        hash_methods=args.hash_methods,
+        data_sizes=args.data_sizes,
+        block_sizes=args.block_sizes,
+        repeat=args.repeat,
+        include_files=not args.memory_only,
+    )
+    print(format_results(results))
+    if args.output is not None:
+        save_json(results, args.output, parents=True)
+    if args.compare is not None:
+        regressions = compare_results(load_json(args.compare), results, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
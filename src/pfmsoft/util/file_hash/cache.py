@@ -0,0 +1,245 @@
+"""A persistent cache of file hashes, keyed on file stat metadata.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+#### setting up logger ####
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS file_hash (
+    file_path TEXT NOT NULL,
+    hash_method TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    file_hash TEXT NOT NULL,
+    last_used INTEGER NOT NULL,
+    PRIMARY KEY (file_path, hash_method)
+);
+CREATE INDEX IF NOT EXISTS file_hash_last_used ON file_hash (last_used);
+"""
+
+
+class HashCache:
+    """
+    An on disk cache of file hashes stored in a SQLite database.
+
+    A cached hash is only returned if the size, modification time and inode of
+    the file still match the values recorded when the hash was stored, otherwise
+    the entry is treated as stale. When `max_entries` is set, the least recently
+    used entries are evicted to keep the cache at that size.
+
+    Writes are committed every `commit_interval` changes, and on :meth:`close`.
+    The cache can be shared between threads, but not between processes.
+
+    :Example:
+        with HashCache(Path("~/.hash_cache.sqlite").expanduser()) as cache:
+            for path in paths:
+                result = file_hasher(path, "sha256", cache=cache)
+            print(cache.hits, cache.misses)
+
+    :param db_path: :py:class:`pathlib.Path` to the SQLite database. Created if it
+        does not exist.
+    :param max_entries: Maximum number of entries to keep. Defaults to ``None``, no limit.
+    :param commit_interval: Number of changes between commits. Defaults to 1000.
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        max_entries: Optional[int] = None,
+        commit_interval: int = 1000,
+    ):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.commit_interval = commit_interval
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._uncommitted = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._connection.executescript(_SCHEMA)
+        self._connection.commit()
+        self._count = self._count_rows()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    @staticmethod
+    def _key(file_path: Path) -> str:
+        return os.fspath(file_path.absolute())
+
+    def get(
+        self,
+        file_path: Path,
+        hash_method: str,
+        stat_result: Optional[os.stat_result] = None,
+    ) -> Optional[str]:
+        """
+        Get the cached hash for a file, if the file is unchanged.
+
+        :param file_path: The `pathlib.Path` to a file.
+        :param hash_method: The name of a hasher. See :func:`get_hasher` for valid values.
+        :param stat_result: The current stat of `file_path`, if already known.
+        :return: The cached hash as a hexidecimal string, or ``None`` if there is no
+            valid entry.
+        """
+        if stat_result is None:
+            stat_result = file_path.stat()
+        key = self._key(file_path)
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT size, mtime_ns, inode, file_hash FROM file_hash "
+                "WHERE file_path = ? AND hash_method = ?",
+                (key, hash_method),
+            ).fetchone()
+            if row is None or tuple(row[:3]) != (
+                stat_result.st_size,
+                stat_result.st_mtime_ns,
+                stat_result.st_ino,
+            ):
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._connection.execute(
+                "UPDATE file_hash SET last_used = ? WHERE file_path = ? AND hash_method = ?",
+                (time.time_ns(), key, hash_method),
+            )
+            self._changed()
+            return row[3]
+
+    def put(
+        self,
+        file_path: Path,
+        hash_method: str,
+        file_hash: str,
+        stat_result: Optional[os.stat_result] = None,
+    ):
+        """
+        Store the hash for a file.
+
+        Pass the stat taken *before* the file was hashed, so that a file modified
+        while it was being hashed is not cached as unchanged.
+
+        :param file_path: The `pathlib.Path` to a file.
+        :param hash_method: The name of the hasher used.
+        :param file_hash: The hash as a hexidecimal string.
+        :param stat_result: The stat of `file_path` when hashing started.
+        """
+        if stat_result is None:
+            stat_result = file_path.stat()
+        key = self._key(file_path)
+        values = (
+            stat_result.st_size,
+            stat_result.st_mtime_ns,
+            stat_result.st_ino,
+            file_hash,
+            time.time_ns(),
+            key,
+            hash_method,
+        )
+        with self._lock:
+            cursor = self._connection.execute(
+                "UPDATE file_hash SET size = ?, mtime_ns = ?, inode = ?, file_hash = ?, "
+                "last_used = ? WHERE file_path = ? AND hash_method = ?",
+                values,
+            )
+            if cursor.rowcount == 0:
+                self._connection.execute(
+                    "INSERT INTO file_hash (size, mtime_ns, inode, file_hash, last_used, "
+                    "file_path, hash_method) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    values,
+                )
+                self._count += 1
+                self._evict()
+            self._changed()
+
+    def invalidate(self, file_path: Optional[Path] = None):
+        """
+        Remove cached entries for a file, or for all files.
+
+        :param file_path: The `pathlib.Path` to remove, all hash methods. Defaults
+            to ``None``, which clears the whole cache.
+        """
+        with self._lock:
+            if file_path is None:
+                self._connection.execute("DELETE FROM file_hash")
+            else:
+                self._connection.execute(
+                    "DELETE FROM file_hash WHERE file_path = ?",
+                    (self._key(file_path),),
+                )
+            self._connection.commit()
+            self._count = self._count_rows()
+            self._uncommitted = 0
+
+    def prune_missing(self) -> int:
+        """
+        Remove entries for files that no longer exist.
+
+        :return: The number of entries removed.
+        """
+        with self._lock:
+            paths = [
+                row[0]
+                for row in self._connection.execute(
+                    "SELECT DISTINCT file_path FROM file_hash"
+                )
+            ]
+            missing = [(path,) for path in paths if not os.path.isfile(path)]
+            before = self._connection.total_changes
+            self._connection.executemany(
+                "DELETE FROM file_hash WHERE file_path = ?", missing
+            )
+            removed = self._connection.total_changes - before
+            self._connection.commit()
+            self._count -= removed
+            self._uncommitted = 0
+        return removed
+
+    def flush(self):
+        """Commit any pending changes to disk."""
+        with self._lock:
+            self._connection.commit()
+            self._uncommitted = 0
+
+    def close(self):
+        """Commit pending changes and close the database."""
+        self.flush()
+        self._connection.close()
+
+    def _changed(self):
+        self._uncommitted += 1
+        if self._uncommitted >= self.commit_interval:
+            self._connection.commit()
+            self._uncommitted = 0
+
+    def _count_rows(self) -> int:
+        return self._connection.execute("SELECT COUNT(*) FROM file_hash").fetchone()[0]
+
+    def _evict(self):
+        if self.max_entries is None:
+            return
+        excess = self._count - self.max_entries
+        if excess > 0:
+            self._connection.execute(
+                "DELETE FROM file_hash WHERE rowid IN "
+                "(SELECT rowid FROM file_hash ORDER BY last_used, rowid LIMIT ?)",
+                (excess,),
+            )
+            self._count -= excess
+            self.evictions += excess
@@ -0,0 +1,303 @@
+"""Chunked file hashes, with a Merkle root, for resumable and partial verification.
+
+A :class:`ChunkManifest` records a digest for each fixed size chunk of a file,
+and a Merkle root over those digests. A mismatch can then be traced to the
+chunks that differ, an interrupted hash can resume from the last saved chunk,
+and after a partial rewrite only the affected chunks need to be read again.
+"""
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from pfmsoft.util.file.read_write import load_json, open_for_save
+from pfmsoft.util.file_hash.file_hash import MIN_BLOCK_SIZE, get_hasher
+
+#### setting up logger ####
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+
+
+@dataclass
+class ChunkManifest:
+    """
+    The per chunk digests of a file, and their Merkle root.
+
+    :param file_size: Size of the file in bytes when it was hashed.
+    :param mtime_ns: Modification time of the file when it was hashed.
+    :param hash_method: The name of the hasher used.
+    :param chunk_size: Size of each chunk in bytes. The last chunk may be shorter.
+    :param chunk_hashes: Hexidecimal digest of each completed chunk, in file order.
+    :param merkle_root: The Merkle root of `chunk_hashes`, once all chunks are hashed.
+    :raises ValueError: If `chunk_size` is less than 1.
+    """
+
+    file_size: int
+    mtime_ns: int
+    hash_method: str
+    chunk_size: int
+    chunk_hashes: List[str] = field(default_factory=list)
+    merkle_root: Optional[str] = None
+
+    def __post_init__(self):
+        _check_chunk_size(self.chunk_size)
+
+    @property
+    def chunk_count(self) -> int:
+        """The number of chunks in the file."""
+        return -(-self.file_size // self.chunk_size)
+
+    @property
+    def complete(self) -> bool:
+        """``True`` if every chunk has been hashed."""
+        return len(self.chunk_hashes) == self.chunk_count
+
+    def save(self, file_path: Path):
+        """
+        Save the manifest as json, replacing any existing manifest atomically.
+
+        :param file_path: :py:class:`pathlib.Path` to the manifest file.
+        """
+        with open_for_save(file_path, atomic=True, encoding="utf8") as file_out:
+            json.dump(asdict(self), file_out, indent=2)
+
+    @staticmethod
+    def load(file_path: Path) -> "ChunkManifest":
+        """
+        Load a manifest saved by :meth:`save`.
+
+        :param file_path: :py:class:`pathlib.Path` to the manifest file.
+        :return: The loaded manifest.
+        """
+        return ChunkManifest(**load_json(file_path))
+
+
+def _check_chunk_size(chunk_size: int):
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1.")
+
+
+def merkle_root(leaf_hashes: Sequence[str], hash_method: str) -> str:
+    """
+    Calculate the Merkle root of a sequence of hexidecimal digests.
+
+    Pairs of nodes are hashed together, level by level. A node without a pair is
+    carried up to the next level unchanged.
+
+    :param leaf_hashes: The hexidecimal digests of the leaves, in order.
+    :param hash_method: The name of a hasher. See :func:`get_hasher` for valid values.
+    :return: The root as a hexidecimal string. The hash of no data if there are
+        no leaves.
+    """
+    if not leaf_hashes:
+        return get_hasher(hash_method).hexdigest()
+    level = [bytes.fromhex(x) for x in leaf_hashes]
+    while len(level) > 1:
+        next_level = []
+        for index in range(0, len(level) - 1, 2):
+            hasher = get_hasher(hash_method)
+            hasher.update(level[index])
+            hasher.update(level[index + 1])
+            next_level.append(hasher.digest())
+        if len(level) % 2:
+            next_level.append(level[-1])
+        level = next_level
+    return level[0].hex()
+
+
+def hash_chunk(file_path: Path, hash_method: str, chunk_size: int, index: int) -> str:
+    """
+    Hash one chunk of a file.
+
+    :param file_path: The `pathlib.Path` to a file.
+    :param hash_method: The name of a hasher. See :func:`get_hasher` for valid values.
+    :param chunk_size: Size of each chunk in bytes.
+    :param index: The index of the chunk to hash.
+    :raises ValueError: If `chunk_size` is less than 1.
+    :return: The digest of the chunk as a hexidecimal string.
+    """
+    _check_chunk_size(chunk_size)
+    hasher = get_hasher(hash_method)
+    buffer = memoryview(bytearray(min(chunk_size, MIN_BLOCK_SIZE * 16)))
+    remaining = chunk_size
+    with open(file_path, "rb") as file_in:
+        file_in.seek(index * chunk_size)
+        while remaining > 0:
+            read_count = file_in.readinto(buffer[: min(remaining, len(buffer))])
+            if not read_count:
+                break
+            hasher.update(buffer[:read_count])
+            remaining -= read_count
+    return hasher.hexdigest()
+
+
+def chunks_for_range(offset: int, length: int, chunk_size: int) -> range:
+    """
+    The indexes of the chunks that overlap a byte range.
+
+    :param offset: Start of the range in bytes.
+    :param length: Length of the range in bytes.
+    :param chunk_size: Size of each chunk in bytes.
+    :raises ValueError: If `chunk_size` is less than 1.
+    :return: The overlapping chunk indexes.
+    """
+    _check_chunk_size(chunk_size)
+    if length <= 0:
+        return range(0)
+    return range(offset // chunk_size, (offset + length - 1) // chunk_size + 1)
+
+
+def build_chunk_manifest(
+    file_path: Path,
+    hash_method: str = "sha256",
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    manifest_path: Optional[Path] = None,
+    checkpoint_interval: int = 16,
+) -> ChunkManifest:
+    """
+    Hash a file chunk by chunk, and calculate the Merkle root.
+
+    If `manifest_path` is given, progress is saved there every
+    `checkpoint_interval` chunks. An incomplete manifest found there is resumed
+    from its last completed chunk, provided the file size, modification time,
+    hash method and chunk size still match. Otherwise hashing starts over.
+
+    :param file_path: The `pathlib.Path` to a file.
+    :param hash_method: The name of a hasher. See :func:`get_hasher` for valid values.
+        Defaults to "sha256".
+    :param chunk_size: Size of each chunk in bytes. Defaults to 8 MiB.
+    :param manifest_path: :py:class:`pathlib.Path` to save progress to. Defaults to
+        ``None``, no checkpoints.
+    :param checkpoint_interval: Chunks hashed between checkpoints. Defaults to 16.
+    :raises ValueError: If the file_path does not exist or is not a file, or
+        `chunk_size` is less than 1.
+    :return: The completed manifest.
+    """
+    _check_chunk_size(chunk_size)
+    if not file_path.is_file():
+        raise ValueError(f"{file_path} is not a file or does not exist")
+    get_hasher(hash_method)
+    stat_result = file_path.stat()
+    manifest = ChunkManifest(
+        stat_result.st_size, stat_result.st_mtime_ns, hash_method, chunk_size
+    )
+    if manifest_path is not None and manifest_path.exists():
+        saved = ChunkManifest.load(manifest_path)
+        if (
+            saved.file_size,
+            saved.mtime_ns,
+            saved.hash_method,
+            saved.chunk_size,
+        ) == (manifest.file_size, manifest.mtime_ns, hash_method, chunk_size):
+            manifest = saved
+            logger.info(
+                "Resuming %s from chunk %d of %d",
+                file_path,
+                len(manifest.chunk_hashes),
+                manifest.chunk_count,
+            )
+    for index in range(len(manifest.chunk_hashes), manifest.chunk_count):
+        manifest.chunk_hashes.append(
+            hash_chunk(file_path, hash_method, chunk_size, index)
+        )
+        if manifest_path is not None and (index + 1) % checkpoint_interval == 0:
+            manifest.save(manifest_path)
+    manifest.merkle_root = merkle_root(manifest.chunk_hashes, hash_method)
+    if manifest_path is not None:
+        manifest.save(manifest_path)
+    return manifest
+
+
+def verify_chunk_manifest(
+    file_path: Path,
+    manifest: ChunkManifest,
+    chunk_indexes: Optional[Iterable[int]] = None,
+    max_workers: Optional[int] = None,
+) -> List[int]:
+    """
+    Find the chunks of a file that no longer match a manifest.
+
+    Chunks are hashed in parallel on a thread pool. To check a file after a
+    partial rewrite, pass only the affected chunks, see :func:`chunks_for_range`.
+
+    :param file_path: The `pathlib.Path` to a file.
+    :param manifest: A complete manifest for the file.
+    :param chunk_indexes: The chunks to verify. Defaults to ``None``, all chunks.
+    :param max_workers: Number of threads. Defaults to ``os.cpu_count()``.
+    :raises ValueError: If the manifest is not complete.
+    :return: The sorted indexes of the chunks that do not match, including any
+        chunks added or removed by a change in file size.
+    """
+    if not manifest.complete:
+        raise ValueError("Can not verify against an incomplete manifest.")
+    current = ChunkManifest(
+        file_path.stat().st_size, 0, manifest.hash_method, manifest.chunk_size
+    )
+    if chunk_indexes is None:
+        chunk_indexes = range(max(current.chunk_count, manifest.chunk_count))
+    mismatched = set()
+    to_hash = []
+    for index in set(chunk_indexes):
+        if index >= current.chunk_count or index >= manifest.chunk_count:
+            mismatched.add(index)
+        else:
+            to_hash.append(index)
+
+    def check(index: int) -> Tuple[int, bool]:
+        digest = hash_chunk(file_path, manifest.hash_method, manifest.chunk_size, index)
+        return index, digest == manifest.chunk_hashes[index]
+
+    with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+        for index, matched in executor.map(check, to_hash):
+            if not matched:
+                mismatched.add(index)
+    return sorted(mismatched)
+
+
+def update_chunk_manifest(
+    file_path: Path,
+    manifest: ChunkManifest,
+    changed_ranges: Sequence[Tuple[int, int]],
+) -> ChunkManifest:
+    """
+    Update a manifest after parts of a file were rewritten, reading only those parts.
+
+    :param file_path: The `pathlib.Path` to a file.
+    :param manifest: A complete manifest for the file before it changed.
+    :param changed_ranges: The (offset, length) byte ranges that were rewritten.
+    :raises ValueError: If the manifest is not complete.
+    :return: A new, complete manifest for the file.
+    """
+    if not manifest.complete:
+        raise ValueError("Can not update an incomplete manifest.")
+    stat_result = file_path.stat()
+    updated = ChunkManifest(
+        stat_result.st_size,
+        stat_result.st_mtime_ns,
+        manifest.hash_method,
+        manifest.chunk_size,
+        manifest.chunk_hashes[: -(-stat_result.st_size // manifest.chunk_size)],
+    )
+    stale = set()
+    for offset, length in changed_ranges:
+        stale.update(chunks_for_range(offset, length, manifest.chunk_size))
+    # A change in size also changes the old and new last chunks, and adds any new ones.
+    if updated.file_size != manifest.file_size:
+        if manifest.chunk_count:
+            stale.add(manifest.chunk_count - 1)
+        if updated.chunk_count:
+            stale.add(updated.chunk_count - 1)
+    stale.update(range(len(updated.chunk_hashes), updated.chunk_count))
+    for index in sorted(x for x in stale if x < updated.chunk_count):
+        digest = hash_chunk(file_path, manifest.hash_method, manifest.chunk_size, index)
+        if index < len(updated.chunk_hashes):
+            updated.chunk_hashes[index] = digest
+        else:
+            updated.chunk_hashes.append(digest)
+    updated.merkle_root = merkle_root(updated.chunk_hashes, manifest.hash_method)
+    return updated
@@ -0,0 +1,125 @@
+"""Find duplicate files, reading as little of each file as possible.
+"""
+import logging
+from collections import defaultdict
+from pathlib import Path
+from stat import S_ISREG
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+from pfmsoft.util.file_hash.file_hash import file_hasher, get_hasher
+
+if TYPE_CHECKING:
+    from pfmsoft.util.file_hash.cache import HashCache
+
+#### setting up logger ####
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+
+class DuplicateGroup(NamedTuple):
+    """
+    Data structure to hold a group of identical files from `find_duplicate_files`
+
+    :param file_hash: The full hash shared by the files.
+    :param hash_method: The name of the hasher used.
+    :param size: The size of each file in bytes.
+    :param file_paths: The paths of the identical files.
+    """
+
+    file_hash: str
+    hash_method: str
+    size: int
+    file_paths: List[Path]
+
+
+def partial_file_hash(file_path: Path, hash_method: str, partial_size: int) -> str:
+    """
+    Hash the first and last `partial_size` bytes of a file.
+
+    Files no larger than twice `partial_size` are hashed completely, so for those
+    files the result is the same as the hash from :func:`file_hasher`.
+
+    :param file_path: The `pathlib.Path` to a file.
+    :param hash_method: The name of a hasher. See :func:`get_hasher` for valid values.
+    :param partial_size: The number of bytes to hash from each end of the file.
+    :returns: The hash as a hexidecimal string.
+    """
+    hasher = get_hasher(hash_method)
+    with open(file_path, "rb") as file_in:
+        head = file_in.read(partial_size * 2 + 1)
+        if len(head) <= partial_size * 2:
+            hasher.update(head)
+        else:
+            hasher.update(head[:partial_size])
+            file_in.seek(-partial_size, 2)
+            hasher.update(file_in.read(partial_size))
+    return hasher.hexdigest()
+
+
+def find_duplicate_files(
+    file_paths: Iterable[Path],
+    hash_method: str = "blake2b",
+    partial_size: int = 65536,
+    include_empty: bool = False,
+    cache: Optional["HashCache"] = None,
+) -> Iterator[DuplicateGroup]:
+    """
+    Find groups of identical files.
+
+    Files are first grouped by size, and only files sharing a size are read. Those
+    are grouped by a hash of their first and last `partial_size` bytes, and only
+    files that still collide are hashed in full. A group is yielded as soon as
+    each size has been checked, largest size first.
+
+    :param file_paths: An iterable of `pathlib.Path`s. Paths that are not files
+        are skipped.
+    :param hash_method: The name of a hasher. See :func:`get_hasher` for valid values.
+        Defaults to "blake2b".
+    :param partial_size: The number of bytes hashed from each end of a file before
+        committing to a full hash. Defaults to 65536.
+    :param include_empty: Report empty files as a group of duplicates. Defaults
+        to ``False``.
+    :param cache: An optional :class:`HashCache` used for the full hashes.
+    :raises ValueError: If `hash_method` is not valid.
+    :yield: A :class:`DuplicateGroup` for each set of two or more identical files.
+    """
+    empty_hash = get_hasher(hash_method).hexdigest()
+    by_size: Dict[int, List[Path]] = defaultdict(list)
+    seen = set()
+    for file_path in file_paths:
+        if file_path in seen:
+            continue
+        try:
+            stat_result = file_path.stat()
+        except OSError:
+            continue
+        if not S_ISREG(stat_result.st_mode):
+            continue
+        seen.add(file_path)
+        by_size[stat_result.st_size].append(file_path)
+    for size in sorted(by_size, reverse=True):
+        same_size = by_size[size]
+        if len(same_size) < 2:
+            continue
+        if size == 0:
+            if include_empty:
+                yield DuplicateGroup(empty_hash, hash_method, size, same_size)
+            continue
+        by_partial: Dict[str, List[Path]] = defaultdict(list)
+        for file_path in same_size:
+            partial_hash = partial_file_hash(file_path, hash_method, partial_size)
+            by_partial[partial_hash].append(file_path)
+        for partial_hash, candidates in by_partial.items():
+            if len(candidates) < 2:
+                continue
+            if size <= partial_size * 2:
+                # The partial hash covered the whole file.
+                yield DuplicateGroup(partial_hash, hash_method, size, candidates)
+                continue
+            by_full: Dict[str, List[Path]] = defaultdict(list)
+            for file_path in candidates:
+                result = file_hasher(file_path, hash_method, cache)
+                by_full[result.file_hash].append(file_path)
+            for full_hash, duplicates in by_full.items():
+                if len(duplicates) > 1:
+                    yield DuplicateGroup(full_hash, hash_method, size, duplicates)
@@ -2,31 +2,50 @@
 """A collection of file hashing utilities.
 """
 import hashlib
+import io
+import mmap
+import os
 from pathlib import Path
 from typing import (
+    TYPE_CHECKING,
     Any,
     BinaryIO,
     ByteString,
     Callable,
     Dict,
     Iterator,
+    List,
     NamedTuple,
     Optional,
     Sequence,
     Union,
 )
 
+if TYPE_CHECKING:
+    from pfmsoft.util.file_hash.cache import HashCache
+
 VERSION = "1.0.0"
 
+#: Any object supporting the buffer protocol, as accepted by `hashlib`.
+Buffer = Union[bytes, bytearray, memoryview]
+
+#: Bounds for the block size chosen by :func:`get_block_size`.
+MIN_BLOCK_SIZE = 65536
+MAX_BLOCK_SIZE = 1048576
+
 # TODO split file readers to file.read_write.
 
 
 def hash_a_byte_str_iterator(
-    bytes_iterator: Iterator[ByteString], hasher: Any, as_hex_str: bool = False
+    bytes_iterator: Iterator[Buffer], hasher: Any, as_hex_str: bool = False
 ) -> Union[ByteString, str]:
     """
     Get the hash digest of a binary string iterator.
 
+    Blocks may be any object supporting the buffer protocol, so the memoryviews
+    yielded by :func:`file_as_buffer_iterator` and :func:`file_as_mmap_iterator`
+    are hashed without being copied.
+
     https://stackoverflow.com/a/3431835/105844
 
     :param bytes_iterator: The byte iterator
@@ -40,12 +59,64 @@ def hash_a_byte_str_iterator(
     return hasher.hexdigest() if as_hex_str else hasher.digest()
 
 
+def multi_hash_a_byte_str_iterator(
+    bytes_iterator: Iterator[Buffer], hashers: Sequence[Any], as_hex_str: bool = False
+) -> List[Union[ByteString, str]]:
+    """
+    Get the hash digests of a binary string iterator from several hashers at once.
+
+    Each block is fed to every hasher before the next block is read, so the
+    input is only iterated over once.
+
+    :param bytes_iterator: The byte iterator
+    :param hashers: The hash functions from `hashlib`
+    :param as_hex_str: Return the digests as bytes, or hexidecimal strings, defaults to False
+    :returns: The digests of the input bytes, in the same order as `hashers`.
+    """
+
+    updaters = [hasher.update for hasher in hashers]
+    for block in bytes_iterator:
+        for update in updaters:
+            update(block)
+    if as_hex_str:
+        return [hasher.hexdigest() for hasher in hashers]
+    return [hasher.digest() for hasher in hashers]
+
+
+def get_block_size(file_handle: BinaryIO) -> int:
+    """
+    Choose a read block size for a file handle.
+
+    Uses a multiple of the file system's preferred block size (``st_blksize``),
+    between :data:`MIN_BLOCK_SIZE` and :data:`MAX_BLOCK_SIZE`, but no larger than
+    needed to read the whole file in one block. Handles without a file descriptor,
+    e.g. :class:`io.BytesIO`, get :data:`MIN_BLOCK_SIZE`.
+
+    :param file_handle: The handle for file opened in binary mode.
+    :returns: The block size in bytes.
+    """
+    try:
+        stat_result = os.fstat(file_handle.fileno())
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return MIN_BLOCK_SIZE
+    fs_block_size = getattr(stat_result, "st_blksize", 0) or 4096
+    block_size = min(max(stat_result.st_size, 1), MAX_BLOCK_SIZE)
+    # round up to a whole number of file system blocks.
+    block_size = -(-block_size // fs_block_size) * fs_block_size
+    if stat_result.st_size >= MIN_BLOCK_SIZE:
+        block_size = max(block_size, MIN_BLOCK_SIZE)
+    return block_size
+
+
 def file_as_block_iterator(
     file_handle: BinaryIO, block_size: int = 65536
 ) -> Iterator[ByteString]:
     """
     Make an iterator for a file opened in binary mode.
 
+    Each block is a new `bytes` object. When the blocks are only needed until the
+    next one is read, :func:`file_as_buffer_iterator` avoids the allocations.
+
     https://stackoverflow.com/a/3431835/105844
 
     :param file_handle: The handle for file opened in binary mode.
@@ -60,8 +131,83 @@ def file_as_block_iterator(
             block = file_handle.read(block_size)
 
 
+def file_as_buffer_iterator(
+    file_handle: BinaryIO, block_size: Optional[int] = None
+) -> Iterator[memoryview]:
+    """
+    Make an iterator for a file opened in binary mode, reusing a single buffer.
+
+    Blocks are read with ``readinto`` into one preallocated `bytearray`, and
+    yielded as a `memoryview` of the filled part of the buffer. A view is only
+    valid until the next block is requested, after which it is released. Copy it
+    with `bytes()` if it has to be kept.
+
+    :param file_handle: The handle for file opened in binary mode.
+    :param block_size: The size of the block bytes to read from the file, by default
+        chosen by :func:`get_block_size`.
+    :yields: A memoryview of each block.
+    """
+
+    with file_handle:
+        if block_size is None:
+            block_size = get_block_size(file_handle)
+        buffer = memoryview(bytearray(block_size))
+        try:
+            read_count = file_handle.readinto(buffer)  # type: ignore
+            while read_count:
+                block = buffer[:read_count]
+                try:
+                    yield block
+                finally:
+                    block.release()
+                read_count = file_handle.readinto(buffer)  # type: ignore
+        finally:
+            buffer.release()
+
+
+def file_as_mmap_iterator(
+    file_handle: BinaryIO, block_size: Optional[int] = None
+) -> Iterator[memoryview]:
+    """
+    Make an iterator over a memory mapped file opened in binary mode.
+
+    The file is mapped read only, and yielded as `memoryview` slices of the map,
+    so the data is never copied into Python objects. Best suited to large files.
+    As with :func:`file_as_buffer_iterator`, a view is released when the next
+    block is requested.
+
+    :param file_handle: The handle for a file opened in binary mode. Must have a
+        file descriptor.
+    :param block_size: The size of each yielded block, by default chosen by
+        :func:`get_block_size`.
+    :yields: A memoryview of each block.
+    """
+
+    with file_handle:
+        if block_size is None:
+            block_size = get_block_size(file_handle)
+        if os.fstat(file_handle.fileno()).st_size == 0:
+            # empty files cannot be mapped.
+            return
+        with mmap.mmap(file_handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                for offset in range(0, len(view), block_size):
+                    block = view[offset : offset + block_size]
+                    try:
+                        yield block
+                    finally:
+                        block.release()
+            finally:
+                view.release()
+
+
 def calculate_file_hash_from_path(
-    file_path: Path, hasher: Any, block_size: int = 65536, as_hex_str: bool = True
+    file_path: Path,
+    hasher: Any,
+    block_size: Optional[int] = None,
+    as_hex_str: bool = True,
+    use_mmap: bool = False,
 ) -> Union[ByteString, str]:
     """
     Calculate a hash digest for a given file path.
@@ -70,8 +216,10 @@ def calculate_file_hash_from_path(
 
     :param file_path: The `pathlib.Path` to a file.
     :param hasher: The hash function from `hashlib`
-    :param block_size: The size of the block bytes to read from the file, by default 65536
+    :param block_size: The size of the block bytes to read from the file, by default
+        chosen by :func:`get_block_size`.
     :param as_hex_str: Return the digest as bytes, or a hexidecimal string, by default True
+    :param use_mmap: Memory map the file instead of reading it, by default False
     :returns: The digest of the file, as bytes or a hexidcimal string, by default bytes.
     :raises ValueError: If the file_path does not exist or is not a file.
     """
@@ -81,35 +229,82 @@ def calculate_file_hash_from_path(
 
     with open(file_path, "rb") as file_in:
         result = calculate_file_hash_from_file_handle(
-            file_in, hasher, block_size, as_hex_str
+            file_in, hasher, block_size, as_hex_str, use_mmap
         )
         return result
 
 
 def calculate_file_hash_from_file_handle(
-    file_handle: BinaryIO, hasher: Any, block_size: int = 65536, as_hex_str: bool = True
+    file_handle: BinaryIO,
+    hasher: Any,
+    block_size: Optional[int] = None,
+    as_hex_str: bool = True,
+    use_mmap: bool = False,
 ) -> Union[ByteString, str]:
     """
     Calculate a hash digest for a given file handle opened in binary mode..
 
     https://stackoverflow.com/a/21565932/105844
 
-    :param file_handle: The handle for  file opened in binary mode.
+    :param file_handle: The handle for  file opened in binary mode. Handles without
+        ``readinto`` are read with ``read``.
     :param hasher: The hash function from `hashlib`
-    :param block_size: The size of the block bytes to read from the file, by default 65536
+    :param block_size: The size of the block bytes to read from the file, by default
+        chosen by :func:`get_block_size`.
     :param as_hex_str: Return the digest as bytes, or a hexidecimal string, by default True
+    :param use_mmap: Memory map the file instead of reading it, by default False
     :returns: The digest of the file, as bytes or a hexidcimal string, by default bytes.
     """
+    if use_mmap:
+        bytes_iterator = file_as_mmap_iterator(file_handle, block_size)
+    elif hasattr(file_handle, "readinto"):
+        bytes_iterator = file_as_buffer_iterator(file_handle, block_size)
+    else:
+        # e.g. a stream wrapper that only implements read().
+        if block_size is None:
+            block_size = get_block_size(file_handle)
+        bytes_iterator = file_as_block_iterator(file_handle, block_size)
     result = hash_a_byte_str_iterator(
-        bytes_iterator=file_as_block_iterator(
-            file_handle=file_handle, block_size=block_size
-        ),
+        bytes_iterator=bytes_iterator,
         hasher=hasher,
         as_hex_str=as_hex_str,
     )
     return result
 
 
+def calculate_file_hashes_from_path(
+    file_path: Path,
+    hashers: Dict[str, Any],
+    block_size: Optional[int] = None,
+    as_hex_str: bool = True,
+    use_mmap: bool = False,
+) -> Dict[str, Union[ByteString, str]]:
+    """
+    Calculate several hash digests for a given file path, reading the file once.
+
+    :param file_path: The `pathlib.Path` to a file.
+    :param hashers: The hash functions from `hashlib`, keyed by name.
+    :param block_size: The size of the block bytes to read from the file, by default
+        chosen by :func:`get_block_size`.
+    :param as_hex_str: Return the digests as bytes, or hexidecimal strings, by default True
+    :param use_mmap: Memory map the file instead of reading it, by default False
+    :returns: The digests of the file, keyed by the names in `hashers`.
+    :raises ValueError: If the file_path does not exist or is not a file.
+    """
+
+    if not file_path.exists() or not file_path.is_file():
+        raise ValueError(f"{file_path} is not a file or does not exist")
+
+    block_iterator = file_as_mmap_iterator if use_mmap else file_as_buffer_iterator
+    with open(file_path, "rb") as file_in:
+        digests = multi_hash_a_byte_str_iterator(
+            bytes_iterator=block_iterator(file_handle=file_in, block_size=block_size),
+            hashers=list(hashers.values()),
+            as_hex_str=as_hex_str,
+        )
+    return dict(zip(hashers.keys(), digests))
+
+
 # The guaranteed available hash methods (Python 3.7).
 HASH_METHODS: Dict[str, Callable] = {
     "blake2b": hashlib.blake2b,
@@ -165,7 +360,38 @@ class FileHash(NamedTuple):
         hash_method={self.hash_method})>"
 
 
-def file_hasher(file_path: Path, hash_method: str) -> FileHash:
+class MultiFileHash(NamedTuple):
+    """
+    Data structure to hold return from `multi_file_hasher`.
+
+    The first three fields match :class:`FileHash`, and hold the hash of the first
+    requested hash method.
+
+    :param file_path:
+    :param file_hash:
+    :param hash_method:
+    :param file_hashes: All of the hashes, keyed by hash method.
+    """
+
+    file_path: Path
+    file_hash: str
+    hash_method: str
+    file_hashes: Dict[str, str]
+
+    def __repr__(self):
+        return f"<MultiFileHash(file_path={self.file_path}, file_hashes={self.file_hashes})>"
+
+    def to_file_hashes(self) -> List[FileHash]:
+        """Split into a :class:`FileHash` for each hash method."""
+        return [
+            FileHash(self.file_path, file_hash, hash_method)
+            for hash_method, file_hash in self.file_hashes.items()
+        ]
+
+
+def file_hasher(
+    file_path: Path, hash_method: str, cache: Optional["HashCache"] = None
+) -> FileHash:
     """
     Convenience method to hash a file path.
 
@@ -173,17 +399,27 @@ def file_hasher(file_path: Path, hash_method: str) -> FileHash:
     ----------
     :oaram file_path: The `pathlib.Path` to a file.
     :oaram hash_method: The name of a hasher. See :func:`get_hasher` for valid values.
+    :param cache: An optional :class:`HashCache`. If the file is unchanged since it
+        was cached, the cached hash is returned without reading the file.
     :returns: A NamedTuple containing hash results.
     """
     hasher = get_hasher(hash_method)
+    stat_result = None
+    if cache is not None:
+        stat_result = file_path.stat()
+        cached_hash = cache.get(file_path, hash_method, stat_result)
+        if cached_hash is not None:
+            return FileHash(file_path, cached_hash, hash_method)
     file_hash_str: str = calculate_file_hash_from_path(
         file_path, hasher
     )  # type: ignore
+    if cache is not None:
+        cache.put(file_path, hash_method, file_hash_str, stat_result)
     return FileHash(file_path, file_hash_str, hash_method)
 
 
 def file_hasher_generator(
-    file_paths: Sequence[Path], hash_method: str
+    file_paths: Sequence[Path], hash_method: str, cache: Optional["HashCache"] = None
 ) -> Iterator[FileHash]:
     """
     Using a list of file paths, make an iterator that returns a :class:`FileHash`
@@ -192,10 +428,50 @@ def file_hasher_generator(
     ----------
     :oaram file_paths: A sequence of  `pathlib.Path`s to files.
     :oaram hash_method: The name of a hasher. See :func:`get_hasher` for valid values.
+    :param cache: An optional :class:`HashCache`, see :func:`file_hasher`.
     :returns: The FileHash iterator.
     """
     generator = (
-        file_hasher(file_path, hash_method)
+        file_hasher(file_path, hash_method, cache)
+        for file_path in file_paths
+        if file_path.is_file()
+    )
+    return generator
+
+
+def multi_file_hasher(file_path: Path, hash_methods: Sequence[str]) -> MultiFileHash:
+    """
+    Hash a file path with several hash methods, in a single read of the file.
+
+    :param file_path: The `pathlib.Path` to a file.
+    :param hash_methods: The names of the hashers. See :func:`get_hasher` for valid values.
+    :raises ValueError: If no hash methods are given, or a hash method is not valid.
+    :returns: A NamedTuple containing hash results.
+    """
+    if not hash_methods:
+        raise ValueError("At least one hash method is required.")
+    hashers = {hash_method: get_hasher(hash_method) for hash_method in hash_methods}
+    file_hashes: Dict[str, str] = calculate_file_hashes_from_path(
+        file_path, hashers
+    )  # type: ignore
+    first_method = hash_methods[0]
+    return MultiFileHash(
+        file_path, file_hashes[first_method], first_method, file_hashes
+    )
+
+
+def multi_file_hasher_generator(
+    file_paths: Sequence[Path], hash_methods: Sequence[str]
+) -> Iterator[MultiFileHash]:
+    """
+    Using a list of file paths, make an iterator that returns a :class:`MultiFileHash`
+
+    :param file_paths: A sequence of  `pathlib.Path`s to files.
+    :param hash_methods: The names of the hashers. See :func:`get_hasher` for valid values.
+    :returns: The MultiFileHash iterator.
+    """
+    generator = (
+        multi_file_hasher(file_path, hash_methods)
         for file_path in file_paths
         if file_path.is_file()
     )
@@ -0,0 +1,141 @@
+"""Hash many files concurrently across a pool of workers.
+"""
+import logging
+import os
+from collections import deque
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from pathlib import Path
+from typing import Deque, Iterable, Iterator, Optional, Set
+
+from pfmsoft.util.file_hash.file_hash import FileHash, file_hasher, get_hasher
+
+#### setting up logger ####
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+EXECUTOR_TYPES = ("process", "thread")
+
+
+def _make_executor(executor_type: str, max_workers: int) -> Executor:
+    if executor_type == "process":
+        return ProcessPoolExecutor(max_workers=max_workers)
+    if executor_type == "thread":
+        return ThreadPoolExecutor(max_workers=max_workers)
+    raise ValueError(
+        f"Unsupported executor type '{executor_type}'. Must be one of {EXECUTOR_TYPES}"
+    )
+
+
+def parallel_file_hasher_generator(
+    file_paths: Iterable[Path],
+    hash_method: str,
+    max_workers: Optional[int] = None,
+    executor_type: str = "process",
+    ordered: bool = True,
+    max_in_flight: Optional[int] = None,
+) -> Iterator[FileHash]:
+    """
+    Hash file paths concurrently, yielding a :class:`FileHash` for each file.
+
+    A parallel counterpart to :func:`file_hasher_generator`. Paths that are not
+    files are skipped. Only `max_in_flight` paths are submitted to the pool at
+    any one time, so `file_paths` may be a lazy iterator over a very large tree
+    without the pending work piling up in memory.
+
+    Use a "process" executor for the cpu bound hashers (sha*, blake2*), and a
+    "thread" executor when reads dominate, e.g. on network file systems.
+    `hashlib` releases the GIL while hashing large blocks, so threads still
+    scale when files are large.
+
+    :param file_paths: An iterable of `pathlib.Path`s to files.
+    :param hash_method: The name of a hasher. See :func:`get_hasher` for valid values.
+    :param max_workers: Number of workers in the pool. Defaults to ``os.cpu_count()``.
+    :param executor_type: Either "process" or "thread". Defaults to "process".
+    :param ordered: Yield results in the order of `file_paths`, otherwise yield
+        results as they complete. Defaults to ``True``.
+    :param max_in_flight: Maximum number of paths submitted but not yet yielded.
+        Defaults to four times `max_workers`.
+    :raises ValueError: If `hash_method` or `executor_type` is not valid.
+    :return: An iterator of the :class:`FileHash` for each file.
+    """
+    # Validate now, not on the first next() of the generator.
+    get_hasher(hash_method)
+    if executor_type not in EXECUTOR_TYPES:
+        raise ValueError(
+            f"Unsupported executor type '{executor_type}'. "
+            f"Must be one of {EXECUTOR_TYPES}"
+        )
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    if max_in_flight is None:
+        max_in_flight = max_workers * 4
+    if max_workers < 1 or max_in_flight < 1:
+        raise ValueError("max_workers and max_in_flight must be at least 1.")
+    return _parallel_results(
+        file_paths, hash_method, max_workers, executor_type, ordered, max_in_flight
+    )
+
+
+def _parallel_results(
+    file_paths: Iterable[Path],
+    hash_method: str,
+    max_workers: int,
+    executor_type: str,
+    ordered: bool,
+    max_in_flight: int,
+) -> Iterator[FileHash]:
+    # The pool is only started once iteration begins, so an unused generator
+    # leaves nothing to shut down.
+    executor = _make_executor(executor_type, max_workers)
+    path_iter = (path for path in file_paths if path.is_file())
+    results: Iterator[FileHash]
+    if ordered:
+        results = _ordered_results(executor, path_iter, hash_method, max_in_flight)
+    else:
+        results = _unordered_results(executor, path_iter, hash_method, max_in_flight)
+    yield from results
+
+
+def _ordered_results(
+    executor: Executor, path_iter: Iterator[Path], hash_method: str, window: int
+) -> Iterator[FileHash]:
+    pending: Deque[Future] = deque()
+    try:
+        for file_path in path_iter:
+            pending.append(executor.submit(file_hasher, file_path, hash_method))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+
+def _unordered_results(
+    executor: Executor, path_iter: Iterator[Path], hash_method: str, window: int
+) -> Iterator[FileHash]:
+    pending: Set[Future] = set()
+    try:
+        for file_path in path_iter:
+            pending.add(executor.submit(file_hasher, file_path, hash_method))
+            if len(pending) >= window:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
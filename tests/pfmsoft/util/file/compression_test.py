@@ -0,0 +1,76 @@
+import gzip
+from pathlib import Path
+
+import pytest
+
+from pfmsoft.util.file import compression as compression_module
+from pfmsoft.util.file.compression import compression_from_suffix, open_compressed
+from pfmsoft.util.file.csv import (
+    read_csv_to_row_factory,
+    tuple_factory,
+    write_list_to_csv,
+)
+from pfmsoft.util.file.read_write import load_json, save_json
+
+CODECS = [
+    pytest.param(
+        ".zst",
+        marks=pytest.mark.skipif(
+            compression_module.zstandard is None, reason="zstandard not installed"
+        ),
+    ),
+    ".gz",
+    ".bz2",
+    ".xz",
+]
+
+
+def test_compression_from_suffix():
+    assert compression_from_suffix(Path("a.csv.GZ")) == "gzip"
+    assert compression_from_suffix(Path("a.json.xz")) == "xz"
+    assert compression_from_suffix(Path("a.csv")) is None
+
+
+@pytest.mark.parametrize("suffix", CODECS)
+def test_open_compressed(tmp_path: Path, suffix):
+    file_path = tmp_path / f"data.txt{suffix}"
+    text = "line\n" * 1000
+    with open_compressed(file_path, "wt", level=1, encoding="utf8") as file_out:
+        file_out.write(text)
+    assert len(file_path.read_bytes()) < len(text)
+    with open_compressed(file_path, encoding="utf8") as file_in:
+        assert file_in.read() == text
+    with pytest.raises(FileExistsError):
+        open_compressed(file_path, "x")
+
+
+def test_open_compressed_explicit(tmp_path: Path):
+    file_path = tmp_path / "data.bin"
+    with open_compressed(file_path, "wb", compression="gzip") as file_out:
+        file_out.write(b"data")
+    assert gzip.decompress(file_path.read_bytes()) == b"data"
+    with pytest.raises(ValueError):
+        open_compressed(file_path, compression="rar")
+
+
+@pytest.mark.parametrize("suffix", CODECS)
+def test_json_compressed(tmp_path: Path, json_data, suffix):
+    file_path = tmp_path / f"data.json{suffix}"
+    save_json(json_data, file_path, compression_level=1)
+    assert load_json(file_path) == json_data
+    with pytest.raises(FileExistsError):
+        save_json(json_data, file_path, mode="x")
+
+
+@pytest.mark.parametrize("suffix", CODECS)
+def test_csv_compressed(tmp_path: Path, suffix):
+    rows = [("a", "b"), ("1", "x,y"), ("2", "z\nz"), ("3", "w")]
+    plain_path = tmp_path / "data.csv"
+    file_path = tmp_path / f"data.csv{suffix}"
+    write_list_to_csv(rows, plain_path)
+    write_list_to_csv(rows, file_path)
+    with open_compressed(file_path, "rb") as file_in:
+        assert file_in.read() == plain_path.read_bytes()
+    read_rows = read_csv_to_row_factory(file_path, tuple_factory)
+    with open(plain_path, encoding="utf8", newline="") as file_in:
+        assert list(read_rows) == list(read_csv_to_row_factory(file_in, tuple_factory))
@@ -1,8 +1,11 @@
 import json
+from datetime import datetime
 from pathlib import Path
 
 import pytest
 
+from pfmsoft.util.file.eve_market_orders import MarketOrder
+
 
 @pytest.fixture(scope="module")
 def test_path_root(tmp_path_factory):
@@ -50,3 +53,27 @@ def delta_files(delta_root: Path):
     file_3.touch()
     files.append(file_3)
     return files
+
+
+@pytest.fixture(scope="module")
+def market_orders():
+    ranges = ["region", "station", "solarsystem", "5", "40"]
+    orders = []
+    for index in range(40):
+        orders.append(
+            MarketOrder(
+                duration=90,
+                is_buy_order=index % 3 == 0,
+                issued=datetime(2021, 3, 1 + index % 28, index % 24, index, 7),
+                location_id=60003760 + index % 4,
+                min_volume=1,
+                order_id=5900000000 + index,
+                price=round(4.5 + index * 1.25, 2),
+                range_=ranges[index % len(ranges)],
+                system_id=30000142 + index % 2,
+                type_id=34 + index % 5,
+                volume_remain=1000 + index,
+                volume_total=2000 + index * 10,
+            )
+        )
+    return orders
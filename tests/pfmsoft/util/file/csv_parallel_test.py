@@ -0,0 +1,95 @@
+import csv
+from pathlib import Path
+
+import pytest
+
+from pfmsoft.util.file.csv_parallel import parallel_read_records, record_boundaries
+from pfmsoft.util.file.csv_record import (
+    DictRecordReader,
+    TupleRecordReader,
+    read_records_from_file,
+)
+from pfmsoft.util.file.eve_market_orders import (
+    MarketOrderRecordReader,
+    make_remapped_headers,
+)
+
+
+@pytest.fixture(scope="function")
+def quoted_csv(tmp_path: Path):
+    file_path = tmp_path / "quoted.csv"
+    rows = [["id", "text", "value"]]
+    for index in range(200):
+        text = f"line {index}"
+        if index % 3 == 0:
+            text += '\nwith a "quoted" newline,\nand commas'
+        if index % 7 == 0:
+            text = '"' + text
+        rows.append([str(index), text, f"{index * 1.5}"])
+    with open(file_path, "w", encoding="utf8", newline="") as file_out:
+        csv.writer(file_out).writerows(rows)
+    return file_path, rows
+
+
+@pytest.mark.parametrize("chunk_size", [1, 37, 500, 1000000])
+def test_record_boundaries(quoted_csv, chunk_size):
+    file_path, rows = quoted_csv
+    boundaries = record_boundaries(file_path, chunk_size, skip_header=True)
+    data = file_path.read_bytes()
+    assert boundaries[-1] == len(data)
+    parsed = []
+    for start, end in zip(boundaries, boundaries[1:]):
+        text = data[start:end].decode("utf8")
+        parsed.extend(csv.reader(text.splitlines(keepends=True)))
+    assert parsed == rows[1:]
+
+
+@pytest.mark.parametrize("ordered", [True, False])
+def test_parallel_read_records(quoted_csv, ordered):
+    file_path, rows = quoted_csv
+    expected = read_records_from_file(file_path, DictRecordReader())
+    reader = DictRecordReader()
+    records = list(
+        parallel_read_records(
+            file_path, reader, chunk_size=300, max_workers=2, ordered=ordered
+        )
+    )
+    if ordered:
+        assert records == expected
+    else:
+        assert sorted(records, key=lambda x: int(x["id"])) == expected
+    assert list(reader.headers()) == rows[0]
+
+
+def test_parallel_read_records_no_header(quoted_csv):
+    file_path, rows = quoted_csv
+    records = parallel_read_records(
+        file_path,
+        TupleRecordReader(read_headers_in_first_row=False),
+        chunk_size=1000,
+        max_workers=2,
+    )
+    assert [list(x) for x in records] == rows
+
+
+def test_parallel_read_records_bad_arguments(quoted_csv, tmp_path: Path):
+    file_path, _ = quoted_csv
+    # Raised by the call itself, before any iteration.
+    with pytest.raises(ValueError):
+        parallel_read_records(file_path, DictRecordReader(), max_workers=0)
+    with pytest.raises(ValueError):
+        parallel_read_records(file_path, DictRecordReader(), max_in_flight=0)
+    with pytest.raises(FileNotFoundError):
+        parallel_read_records(tmp_path / "missing.csv", DictRecordReader())
+
+
+def test_parallel_read_market_orders(tmp_path: Path, market_orders):
+    file_path = tmp_path / "orders.csv"
+    with open(file_path, "w", encoding="utf8", newline="") as file_out:
+        writer = csv.writer(file_out)
+        writer.writerow([x.file_field for x in make_remapped_headers()])
+        writer.writerows(x.to_string() for x in market_orders)
+    records = parallel_read_records(
+        file_path, MarketOrderRecordReader(), chunk_size=512, max_workers=2
+    )
+    assert list(records) == market_orders
@@ -0,0 +1,186 @@
+import csv
+import gc
+import sys
+from pathlib import Path
+
+import pytest
+
+from pfmsoft.util.file.csv_record import (
+    Column,
+    DictRecordReader,
+    DictRecordWriter,
+    RecordSchema,
+    RemappedHeader,
+    SchemaRecordReader,
+    SlotsRecordReader,
+    TupleRecordReader,
+    bulk_write_record_to_csv,
+    iter_records_from_file,
+    make_record_class,
+    read_records_from_file,
+    write_record_to_csv,
+)
+
+
+@pytest.fixture(scope="function")
+def sample_csv(tmp_path: Path):
+    file_path = tmp_path / "sample.csv"
+    rows = [["id", "name"]] + [[str(x), f"name\n{x}"] for x in range(25)]
+    with open(file_path, "w", encoding="utf8", newline="") as file_out:
+        csv.writer(file_out).writerows(rows)
+    return file_path, rows
+
+
+def test_iter_records_from_file(sample_csv):
+    file_path, rows = sample_csv
+    records = iter_records_from_file(file_path, DictRecordReader())
+    assert not isinstance(records, list)
+    records = list(records)
+    assert records == [dict(zip(rows[0], x)) for x in rows[1:]]
+    assert records == read_records_from_file(file_path, DictRecordReader())
+
+
+def test_iter_records_from_file_batches(sample_csv):
+    file_path, rows = sample_csv
+    batches = list(
+        iter_records_from_file(
+            file_path, TupleRecordReader(read_headers_in_first_row=False), 10
+        )
+    )
+    assert [len(x) for x in batches] == [10, 10, 6]
+    assert [list(x) for batch in batches for x in batch] == rows
+    # Raised by the call itself, before any iteration.
+    with pytest.raises(ValueError):
+        iter_records_from_file(file_path, TupleRecordReader(), 0)
+
+
+def test_iter_records_from_file_closes_early(sample_csv):
+    file_path, _ = sample_csv
+    records = iter_records_from_file(file_path, TupleRecordReader())
+    next(records)
+    file_in = records.gi_frame.f_locals["file_in"]
+    assert not file_in.closed
+    records.close()
+    assert file_in.closed
+    records = iter_records_from_file(file_path, TupleRecordReader())
+    next(records)
+    file_in = records.gi_frame.f_locals["file_in"]
+    del records
+    gc.collect()
+    assert file_in.closed
+
+
+def test_slots_record_reader(sample_csv):
+    file_path, rows = sample_csv
+    reader = SlotsRecordReader(converters={"id": int})
+    records = read_records_from_file(file_path, reader)
+    assert records[3].id == 3
+    assert records[3].name == rows[4][1]
+    assert records[3]._asdict() == {"id": 3, "name": rows[4][1]}
+    assert list(records[3]) == [3, rows[4][1]]
+    assert records[3] == reader.record_class(3, rows[4][1])
+    assert repr(records[0]) == "Record(id=0, name='name\\n0')"
+    assert not hasattr(records[0], "__dict__")
+    assert sys.getsizeof(records[0]) < sys.getsizeof(dict(zip(rows[0], rows[1])))
+
+
+def test_slots_record_reader_remapped_headers(sample_csv):
+    file_path, rows = sample_csv
+    reader = SlotsRecordReader(
+        read_headers_in_first_row=False,
+        remapped_headers=[RemappedHeader("id", "key"), RemappedHeader("name", "text")],
+    )
+    records = read_records_from_file(file_path, reader)
+    assert reader.headers() == ("key", "text")
+    assert [list(x) for x in records] == rows
+
+
+def test_make_record_class_rejects_bad_fields():
+    for fields in (["a b"], ["class"], ["_a"], ["a", "a"]):
+        with pytest.raises(ValueError):
+            make_record_class("Record", fields)
+    with pytest.raises(ValueError):
+        make_record_class("Record", ["a"], {"b": int})
+
+
+def test_schema_record_reader(tmp_path: Path):
+    file_path = tmp_path / "wide.csv"
+    headers = [f"c{x}" for x in range(40)]
+    rows = [[f"{y}.{x}" for x in range(40)] for y in range(10)]
+    rows[2][7] = ""
+    with open(file_path, "w", encoding="utf8", newline="") as file_out:
+        csv.writer(file_out).writerows([headers] + rows)
+    schema = RecordSchema(
+        [
+            Column("c7", float, default=-1.0, data_field="price"),
+            Column("c0"),
+            Column("c39", lambda x: x.upper()),
+        ]
+    )
+    reader = SchemaRecordReader(schema)
+    records = read_records_from_file(file_path, reader)
+    assert reader.headers() == ("price", "c0", "c39")
+    assert [tuple(x) for x in records[:3]] == [
+        (0.7, "0.0", "0.39"),
+        (1.7, "1.0", "1.39"),
+        (-1.0, "2.0", "2.39"),
+    ]
+    tuples = read_records_from_file(
+        file_path, SchemaRecordReader(schema.project(["c0"]), as_tuple=True)
+    )
+    assert tuples[9] == ("9.0",)
+    with pytest.raises(ValueError):
+        read_records_from_file(
+            file_path, SchemaRecordReader(RecordSchema([Column("x")]))
+        )
+
+
+def test_schema_record_reader_by_index(tmp_path: Path):
+    file_path = tmp_path / "no_headers.csv"
+    file_path.write_text("1,a\n2,b\n", encoding="utf8")
+    schema = RecordSchema([Column("name", index=1), Column("id", int, index=0)])
+    records = read_records_from_file(
+        file_path, SchemaRecordReader(schema, read_headers_in_first_row=False)
+    )
+    assert [tuple(x) for x in records] == [("a", 1), ("b", 2)]
+
+
+def test_bulk_write_record_to_csv(tmp_path: Path):
+    records = [{"id": str(x), "name": f"name {x}"} for x in range(25)]
+    file_path = tmp_path / "out" / "records.csv"
+    stats = bulk_write_record_to_csv(
+        file_path, DictRecordWriter(records), parents=True, batch_size=7, atomic=True
+    )
+    assert stats.rows == 25
+    assert stats.rows_per_second > 0
+    assert [x.name for x in file_path.parent.iterdir()] == ["records.csv"]
+    assert read_records_from_file(file_path, DictRecordReader()) == records
+    compare_path = tmp_path / "compare.csv"
+    write_record_to_csv(compare_path, DictRecordWriter(records))
+    assert compare_path.read_bytes() == file_path.read_bytes()
+
+
+def test_bulk_write_record_to_csv_atomic_failure(tmp_path: Path):
+    def failing_records():
+        yield {"id": "1"}
+        raise RuntimeError("no more records")
+
+    file_path = tmp_path / "records.csv"
+    file_path.write_text("old", encoding="utf8")
+    with pytest.raises(RuntimeError):
+        bulk_write_record_to_csv(
+            file_path, DictRecordWriter(failing_records()), atomic=True
+        )
+    assert file_path.read_text(encoding="utf8") == "old"
+    assert [x.name for x in tmp_path.iterdir()] == ["records.csv"]
+
+
+def test_schema_record_reader_none_default(tmp_path: Path):
+    file_path = tmp_path / "empty_int.csv"
+    file_path.write_text("id,count\n1,5\n2,\n", encoding="utf8")
+    schema = RecordSchema([Column("id", int), Column("count", int, default=None)])
+    records = read_records_from_file(file_path, SchemaRecordReader(schema))
+    assert [tuple(x) for x in records] == [(1, 5), (2, None)]
+    schema = RecordSchema([Column("count", int)])
+    with pytest.raises(ValueError):
+        read_records_from_file(file_path, SchemaRecordReader(schema))
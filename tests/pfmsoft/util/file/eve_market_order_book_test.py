@@ -0,0 +1,123 @@
+import random
+from dataclasses import replace
+
+import pytest
+
+from pfmsoft.util.file.eve_market_order_book import MarketOrderIndex, PriceLadder
+
+
+def brute_best(orders, type_id, location_id, is_buy_order):
+    prices = [
+        x.price
+        for x in orders
+        if x.type_id == type_id
+        and x.location_id == location_id
+        and x.is_buy_order == is_buy_order
+    ]
+    if not prices:
+        return None
+    return max(prices) if is_buy_order else min(prices)
+
+
+def test_price_ladder():
+    asks = PriceLadder(is_buy_order=False)
+    bids = PriceLadder(is_buy_order=True)
+    for price, volume in ((5.0, 10), (3.0, 1), (4.0, 2), (3.0, 4)):
+        asks.add(price, volume)
+        bids.add(price, volume)
+    assert asks.best_price == 3.0
+    assert bids.best_price == 5.0
+    assert [x.price for x in asks] == [3.0, 4.0, 5.0]
+    assert [x.price for x in bids] == [5.0, 4.0, 3.0]
+    assert asks.volume_at(3.0) == 5
+    assert asks.volume_at(3.5) == 0
+    assert asks.depth(4.0) == 7
+    assert bids.depth(4.0) == 12
+    asks.remove(3.0, 1)
+    assert asks.volume_at(3.0) == 4
+    asks.remove(3.0, 4)
+    assert asks.best_price == 4.0
+    assert len(asks) == 2
+    with pytest.raises(KeyError):
+        asks.remove(3.0, 4)
+
+
+def test_price_ladder_depth_matches_scan():
+    generator = random.Random(7)
+    ladders = [PriceLadder(is_buy_order=True), PriceLadder(is_buy_order=False)]
+    orders = []
+    for _ in range(2000):
+        if orders and generator.random() < 0.4:
+            price, volume = orders.pop(generator.randrange(len(orders)))
+            for ladder in ladders:
+                ladder.remove(price, volume)
+        else:
+            price, volume = generator.randint(1, 40) / 4, generator.randint(1, 100)
+            orders.append((price, volume))
+            for ladder in ladders:
+                ladder.add(price, volume)
+        limit = generator.randint(0, 44) / 4
+        bids, asks = ladders
+        assert bids.depth(limit) == sum(v for p, v in orders if p >= limit)
+        assert asks.depth(limit) == sum(v for p, v in orders if p <= limit)
+
+
+def test_index_best_prices(market_orders):
+    index = MarketOrderIndex(iter(market_orders))
+    assert len(index) == len(market_orders)
+    for order in market_orders:
+        type_id, location_id = order.type_id, order.location_id
+        assert index.best_bid(type_id, location_id) == brute_best(
+            market_orders, type_id, location_id, True
+        )
+        assert index.best_ask(type_id, location_id) == brute_best(
+            market_orders, type_id, location_id, False
+        )
+    assert index.best_bid(1, 1) is None
+    assert index.spread(1, 1) is None
+    assert index.depth(1, 1, True, 1.0) == 0
+    assert sorted(x.order_id for x in index.orders_by_type_id(35)) == sorted(
+        x.order_id for x in market_orders if x.type_id == 35
+    )
+    assert len(index.orders_by_system_id(30000142)) == 20
+    assert len(index.orders_by_location_id(60003760)) == 10
+
+
+def test_index_spread_and_depth(market_orders):
+    index = MarketOrderIndex(market_orders)
+    book = next(x for x in index.books.values() if x.spread is not None)
+    assert book.spread == book.best_ask - book.best_bid
+    sells = [
+        x
+        for x in market_orders
+        if (x.type_id, x.location_id) == (book.type_id, book.location_id)
+        and not x.is_buy_order
+    ]
+    limit = sorted(x.price for x in sells)[len(sells) // 2]
+    assert index.depth(book.type_id, book.location_id, False, limit) == sum(
+        x.volume_remain for x in sells if x.price <= limit
+    )
+    assert index.volume_at(book.type_id, book.location_id, False, limit) == sum(
+        x.volume_remain for x in sells if x.price == limit
+    )
+
+
+def test_index_replace_and_remove(market_orders):
+    index = MarketOrderIndex(market_orders)
+    order = market_orders[1]
+    cheaper = replace(order, price=0.01)
+    index.add(cheaper)
+    assert len(index) == len(market_orders)
+    assert index.best_ask(order.type_id, order.location_id) == 0.01
+    assert index.remove(order.order_id) == cheaper
+    assert order.order_id not in index
+    assert index.best_ask(order.type_id, order.location_id) == brute_best(
+        market_orders[2:] + market_orders[:1], order.type_id, order.location_id, False
+    )
+    for order in market_orders:
+        if order.order_id in index:
+            index.remove(order.order_id)
+    assert not index.books
+    assert not index.by_type_id
+    with pytest.raises(KeyError):
+        index.remove(market_orders[0].order_id)
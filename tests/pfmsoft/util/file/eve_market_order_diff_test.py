@@ -0,0 +1,84 @@
+import random
+from dataclasses import replace
+from pathlib import Path
+
+import pytest
+
+from pfmsoft.util.file.eve_market_order_diff import (
+    CHANGED,
+    NEW,
+    REMOVED,
+    OrderEvent,
+    diff_market_order_snapshots,
+    diff_orders,
+    diff_sorted_orders,
+)
+from pfmsoft.util.file.eve_market_order_snapshot import save_market_order_snapshot
+from pfmsoft.util.file.eve_market_order_table import MarketOrderTable
+
+
+@pytest.fixture(scope="function")
+def order_dumps(market_orders):
+    old_orders = market_orders[:30]
+    new_orders = [
+        replace(x, price=x.price + 1) if x.order_id % 7 == 0 else x
+        for x in market_orders[5:]
+    ]
+    new_orders[3] = replace(new_orders[3], volume_remain=1)
+    new_orders[4] = replace(new_orders[4], min_volume=99)
+    expected = {x.order_id: REMOVED for x in market_orders[:5]}
+    expected.update({x.order_id: NEW for x in market_orders[30:]})
+    expected.update(
+        {x.order_id: CHANGED for x in new_orders[:25] if x.order_id % 7 == 0}
+    )
+    expected[new_orders[3].order_id] = CHANGED
+    return old_orders, new_orders, expected
+
+
+def as_kinds(events):
+    return {x.order_id: x.kind for x in events}
+
+
+def test_diff_sorted_orders(order_dumps):
+    old_orders, new_orders, expected = order_dumps
+    events = list(diff_sorted_orders(iter(old_orders), iter(new_orders)))
+    assert as_kinds(events) == expected
+    assert [x.order_id for x in events] == sorted(expected)
+    removed = next(x for x in events if x.kind == REMOVED)
+    assert removed == OrderEvent(REMOVED, old_orders[0].order_id, old_orders[0], None)
+    changed = [x for x in events if x.kind == CHANGED]
+    assert all(x.old_order.order_id == x.new_order.order_id for x in changed)
+    events = diff_sorted_orders(old_orders, new_orders, ["min_volume"])
+    assert [x.order_id for x in events if x.kind == CHANGED] == [new_orders[4].order_id]
+
+
+def test_diff_sorted_orders_unsorted(order_dumps):
+    old_orders, new_orders, _ = order_dumps
+    with pytest.raises(ValueError):
+        list(diff_sorted_orders(old_orders, list(reversed(new_orders))))
+
+
+def test_diff_orders(order_dumps):
+    old_orders, new_orders, expected = order_dumps
+    old_orders = list(old_orders)
+    random.Random(1).shuffle(old_orders)
+    assert as_kinds(diff_orders(old_orders, reversed(new_orders))) == expected
+
+
+@pytest.mark.parametrize("sort", [True, False])
+def test_diff_market_order_snapshots(tmp_path: Path, order_dumps, sort):
+    old_orders, new_orders, expected = order_dumps
+    old_path = tmp_path / "old.snap"
+    new_path = tmp_path / "new.snap"
+    old_table = MarketOrderTable(old_orders)
+    new_table = MarketOrderTable(reversed(new_orders), range_categories=["40"])
+    if sort:
+        new_table = new_table.sorted_by("order_id")
+    save_market_order_snapshot(old_table, old_path)
+    save_market_order_snapshot(new_table, new_path)
+    events = list(diff_market_order_snapshots(old_path, new_path))
+    assert as_kinds(events) == expected
+    expected_events = sorted(diff_sorted_orders(old_orders, new_orders))
+    assert sorted(events) == expected_events
+    events = diff_market_order_snapshots(old_path, new_path, ["range_", "price"])
+    assert as_kinds(events) == expected
@@ -0,0 +1,103 @@
+import csv
+import gc
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+from pfmsoft.util.file import eve_market_order_loader
+from pfmsoft.util.file.eve_market_order_loader import (
+    load_market_orders,
+    parse_issued_epoch,
+)
+from pfmsoft.util.file.eve_market_orders import (
+    MarketOrder,
+    MarketOrderRecordReader,
+    make_remapped_headers,
+    parse_bool,
+    parse_issued,
+)
+
+
+def write_orders(file_path: Path, orders, quote_first=False):
+    with open(file_path, "w", encoding="utf8", newline="") as file_out:
+        writer = csv.writer(file_out)
+        writer.writerow([x.file_field for x in make_remapped_headers()])
+        for index, order in enumerate(orders):
+            row = list(order.to_string())
+            if quote_first and index == 0:
+                row[7] = f'"{row[7]}"'
+                file_out.write(",".join(row) + "\r\n")
+            else:
+                writer.writerow(row)
+
+
+def test_parse_issued():
+    assert parse_issued("2021-03-01T12:30:07Z") == datetime(2021, 3, 1, 12, 30, 7)
+    assert parse_issued_epoch("1970-01-02T00:00:01Z") == 86401
+    with pytest.raises(ValueError):
+        parse_issued("2021-02-30T12:30:07Z")
+    with pytest.raises(ValueError):
+        parse_issued("2021-03-01 12:30:07")
+
+
+def test_parse_bool():
+    assert parse_bool("True") is True
+    assert parse_bool("false") is False
+    assert parse_bool("yEs") is True
+    with pytest.raises(ValueError):
+        parse_bool("maybe")
+
+
+@pytest.mark.parametrize("quote_first", [False, True])
+def test_load_market_orders(tmp_path: Path, market_orders, quote_first):
+    file_path = tmp_path / "orders.csv"
+    write_orders(file_path, market_orders, quote_first)
+    with open(file_path, encoding="utf8", newline="") as file_in:
+        expected = list(MarketOrderRecordReader().read_records(csv.reader(file_in)))
+    assert expected == market_orders
+    assert load_market_orders(file_path, chunk_size=7) == market_orders
+    table = load_market_orders(file_path, as_table=True, chunk_size=7)
+    assert table.to_orders() == market_orders
+
+
+@pytest.mark.parametrize("pause_gc", [False, True])
+def test_load_market_orders_pause_gc(
+    tmp_path: Path, market_orders, monkeypatch, pause_gc
+):
+    file_path = tmp_path / "orders.csv"
+    write_orders(file_path, market_orders)
+    gc_states = set()
+
+    def recording_market_order(*args):
+        gc_states.add(gc.isenabled())
+        return MarketOrder(*args)
+
+    monkeypatch.setattr(eve_market_order_loader, "MarketOrder", recording_market_order)
+    assert gc.isenabled()
+    assert load_market_orders(file_path, pause_gc=pause_gc) == market_orders
+    assert gc_states == {not pause_gc}
+    assert gc.isenabled()
+
+
+def test_load_market_orders_bad_rows(tmp_path: Path, market_orders):
+    file_path = tmp_path / "orders.csv"
+    write_orders(file_path, market_orders[:3])
+    with open(file_path, "a", encoding="utf8", newline="") as file_out:
+        file_out.write('90,"True"\r\n')
+    with pytest.raises(ValueError):
+        load_market_orders(file_path)
+
+
+@pytest.mark.parametrize("chunk_size", [2, 65536])
+def test_load_market_orders_ragged_rows(tmp_path: Path, market_orders, chunk_size):
+    file_path = tmp_path / "orders.csv"
+    write_orders(file_path, market_orders[:6])
+    lines = file_path.read_text(encoding="utf8").splitlines(keepends=True)
+    # A short row then a long row, so the chunk still has the right field total.
+    short_row = lines[3].rstrip("\r\n").rsplit(",", 1)
+    lines[3] = short_row[0] + "\r\n"
+    lines[4] = lines[4].rstrip("\r\n") + "," + short_row[1] + "\r\n"
+    file_path.write_text("".join(lines), encoding="utf8", newline="")
+    with pytest.raises(ValueError, match="line 4 has 11 fields, expected 12"):
+        load_market_orders(file_path, chunk_size=chunk_size)
@@ -0,0 +1,58 @@
+from pathlib import Path
+
+import pytest
+
+from pfmsoft.util.file.eve_market_order_snapshot import (
+    HEADER_STRUCT,
+    RECORD_STRUCT,
+    MarketOrderSnapshotReader,
+    MarketOrderSnapshotWriter,
+    load_market_order_snapshot,
+    save_market_order_snapshot,
+)
+from pfmsoft.util.file.eve_market_order_table import MarketOrderTable
+
+
+def test_snapshot_round_trip(tmp_path: Path, market_orders):
+    file_path = tmp_path / "snapshots" / "orders.snap"
+    assert save_market_order_snapshot(market_orders, file_path, parents=True) == 40
+    assert file_path.stat().st_size > HEADER_STRUCT.size + 40 * RECORD_STRUCT.size
+    assert not list(file_path.parent.glob(".*"))
+    assert load_market_order_snapshot(file_path) == market_orders
+    table = load_market_order_snapshot(file_path, as_table=True)
+    assert table.to_orders() == market_orders
+    with MarketOrderSnapshotReader(file_path) as reader:
+        assert len(reader) == 40
+        assert reader[5] == market_orders[5]
+        assert reader[-1] == market_orders[-1]
+        with pytest.raises(IndexError):
+            _ = reader[40]
+        orders = iter(reader)
+        assert next(orders) == market_orders[0]
+        reader.close()
+
+
+def test_snapshot_from_table(tmp_path: Path, market_orders):
+    file_path = tmp_path / "orders.snap"
+    table = MarketOrderTable(market_orders, range_categories=["unused", "region"])
+    assert save_market_order_snapshot(table, file_path) == 40
+    assert load_market_order_snapshot(file_path) == market_orders
+    save_market_order_snapshot([], file_path)
+    assert load_market_order_snapshot(file_path) == []
+    assert len(load_market_order_snapshot(file_path, as_table=True)) == 0
+
+
+def test_snapshot_writer_abort(tmp_path: Path, market_orders):
+    file_path = tmp_path / "orders.snap"
+    with pytest.raises(RuntimeError):
+        with MarketOrderSnapshotWriter(file_path) as writer:
+            writer.write_orders(market_orders)
+            raise RuntimeError("stop")
+    assert not list(tmp_path.iterdir())
+
+
+def test_snapshot_not_a_snapshot(tmp_path: Path):
+    file_path = tmp_path / "orders.snap"
+    file_path.write_bytes(b"duration,is_buy_order,issued" * 4)
+    with pytest.raises(ValueError):
+        MarketOrderSnapshotReader(file_path)
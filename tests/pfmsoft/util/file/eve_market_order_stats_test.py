@@ -0,0 +1,105 @@
+import csv
+import random
+from pathlib import Path
+
+import pytest
+
+from pfmsoft.util.file.eve_market_order_stats import (
+    MarketOrderAggregator,
+    QuantileSketch,
+    aggregate_market_order_file,
+    aggregate_market_order_files,
+)
+from pfmsoft.util.file.eve_market_orders import make_remapped_headers
+
+
+def write_orders(file_path: Path, orders):
+    with open(file_path, "w", encoding="utf8", newline="") as file_out:
+        writer = csv.writer(file_out)
+        writer.writerow([x.file_field for x in make_remapped_headers()])
+        writer.writerows(x.to_string() for x in orders)
+
+
+def test_quantile_sketch():
+    values = [random.Random(7).lognormvariate(3, 2) for _ in range(5000)]
+    sketch = QuantileSketch(0.01)
+    for value in values:
+        sketch.add(value)
+    values.sort()
+    for q in (0, 0.1, 0.5, 0.9, 0.99, 1):
+        expected = values[max(0, int(q * len(values)) - 1)]
+        assert sketch.quantile(q) == pytest.approx(expected, rel=0.03)
+    assert QuantileSketch().quantile(0.5) is None
+    with pytest.raises(ValueError):
+        sketch.add(-1)
+    with pytest.raises(ValueError):
+        sketch.merge(QuantileSketch(0.05))
+
+
+def test_quantile_sketch_merge():
+    whole = QuantileSketch()
+    first = QuantileSketch()
+    second = QuantileSketch()
+    for value in range(1, 1001):
+        whole.add(value)
+        (first if value % 2 else second).add(value)
+    first.merge(second)
+    assert first.buckets == whole.buckets
+    assert first.quantile(0.5) == whole.quantile(0.5)
+
+
+def test_aggregator(market_orders):
+    aggregator = MarketOrderAggregator()
+    aggregator.extend(market_orders)
+    key = (35, False)
+    group = [x for x in market_orders if (x.type_id, x.is_buy_order) == key]
+    stats = aggregator.groups[key]
+    assert stats.count == len(group)
+    assert stats.volume == sum(x.volume_remain for x in group)
+    assert stats.min_price == min(x.price for x in group)
+    assert stats.max_price == max(x.price for x in group)
+    assert stats.vwap == pytest.approx(
+        sum(x.price * x.volume_remain for x in group) / stats.volume
+    )
+    assert stats.mean_price == pytest.approx(sum(x.price for x in group) / len(group))
+    assert stats.min_price <= stats.percentile(50) <= stats.max_price
+    assert stats.percentile(0) == pytest.approx(stats.min_price, rel=0.01)
+    by_type = MarketOrderAggregator(group_by=["type_id"])
+    by_type.extend(market_orders)
+    assert sorted(by_type.groups) == [34, 35, 36, 37, 38]
+
+
+def test_aggregator_merge(market_orders):
+    whole = MarketOrderAggregator()
+    whole.extend(market_orders)
+    first = MarketOrderAggregator()
+    first.extend(market_orders[:17])
+    second = MarketOrderAggregator()
+    second.extend(market_orders[17:])
+    assert first.merge(second) is first
+    assert first.groups.keys() == whole.groups.keys()
+    for key, stats in whole.groups.items():
+        merged = first.groups[key]
+        assert (merged.count, merged.volume) == (stats.count, stats.volume)
+        assert (merged.min_price, merged.max_price) == (
+            stats.min_price,
+            stats.max_price,
+        )
+        assert merged.vwap == pytest.approx(stats.vwap)
+    with pytest.raises(ValueError):
+        first.merge(MarketOrderAggregator(group_by=["type_id"]))
+
+
+def test_aggregate_market_order_files(tmp_path: Path, market_orders):
+    whole = MarketOrderAggregator()
+    whole.extend(market_orders)
+    file_paths = [tmp_path / "first.csv", tmp_path / "second.csv"]
+    write_orders(file_paths[0], market_orders[:25])
+    write_orders(file_paths[1], market_orders[25:])
+    single = aggregate_market_order_file(file_paths[0])
+    assert sum(x.count for x in single.groups.values()) == 25
+    merged = aggregate_market_order_files(file_paths, max_workers=2)
+    assert merged.groups.keys() == whole.groups.keys()
+    for key, stats in whole.groups.items():
+        assert merged.groups[key].count == stats.count
+        assert merged.groups[key].vwap == pytest.approx(stats.vwap)
@@ -0,0 +1,96 @@
+from dataclasses import replace
+from datetime import datetime
+
+import pytest
+
+from pfmsoft.util.file.eve_market_order_table import (
+    MarketOrderTable,
+    datetime_to_epoch,
+    epoch_to_datetime,
+)
+
+
+def test_epoch_round_trip():
+    value = datetime(2021, 3, 14, 15, 9, 26)
+    assert datetime_to_epoch(value) == 1615734566
+    assert epoch_to_datetime(datetime_to_epoch(value)) == value
+
+
+def test_table_round_trip(market_orders):
+    table = MarketOrderTable(market_orders)
+    assert len(table) == len(market_orders)
+    assert table.to_orders() == market_orders
+    assert table[0] == market_orders[0]
+    assert table[-1].to_order() == market_orders[-1]
+    row = table[3]
+    assert row.issued == market_orders[3].issued
+    assert row.range_ == market_orders[3].range_
+    assert row.is_buy_order is market_orders[3].is_buy_order
+    assert row.to_string() == market_orders[3].to_string()
+    assert [x.order_id for x in table] == [x.order_id for x in market_orders]
+    with pytest.raises(IndexError):
+        _ = table[len(market_orders)]
+
+
+def test_table_new_range_category(market_orders):
+    table = MarketOrderTable(range_categories=())
+    table.extend(market_orders[:5])
+    assert table.range_categories == ["region", "station", "solarsystem", "5", "40"]
+    assert list(table.column("range_")) == [0, 1, 2, 3, 4]
+
+
+def test_table_where(market_orders):
+    table = MarketOrderTable(market_orders)
+    expected = [
+        index
+        for index, order in enumerate(market_orders)
+        if order.type_id == 35 and order.is_buy_order
+    ]
+    assert table.where(type_id=35, is_buy_order=True) == expected
+    assert table.where(range_="region") == [
+        index for index, order in enumerate(market_orders) if order.range_ == "region"
+    ]
+    assert table.where(range_="unknown") == []
+    assert table.where() == list(range(len(market_orders)))
+    with pytest.raises(ValueError):
+        table.where(not_a_column=1)
+    filtered = table.filter(location_id=60003761)
+    assert filtered.to_orders() == [
+        x for x in market_orders if x.location_id == 60003761
+    ]
+
+
+def test_table_extend_columns(market_orders):
+    table = MarketOrderTable(market_orders)
+    columns = {
+        name: list(table.column(name)) for name in table.columns if name != "range_"
+    }
+    columns["range_"] = [x.range_ for x in market_orders]
+    copied = MarketOrderTable()
+    copied.extend_columns(columns)
+    assert copied.to_orders() == market_orders
+    columns["price"] = columns["price"][:-1]
+    with pytest.raises(ValueError):
+        copied.extend_columns(columns)
+    assert len(copied) == len(market_orders)
+    columns["price"] = list(table.column("price"))
+    columns["volume_total"] = columns["volume_total"][:-1] + ["not a number"]
+    with pytest.raises(TypeError):
+        copied.extend_columns(columns)
+    assert {len(x) for x in copied.columns.values()} == {len(market_orders)}
+
+
+@pytest.mark.parametrize(
+    "changes, error",
+    [
+        ({"price": "not a price"}, TypeError),
+        ({"duration": 2**40}, OverflowError),
+        ({"volume_total": "not a number"}, TypeError),
+    ],
+)
+def test_table_append_bad_order(market_orders, changes, error):
+    table = MarketOrderTable(market_orders[:3])
+    with pytest.raises(error):
+        table.append(replace(market_orders[3], **changes))
+    assert {len(x) for x in table.columns.values()} == {3}
+    assert table.to_orders() == market_orders[:3]
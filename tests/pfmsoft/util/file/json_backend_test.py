@@ -0,0 +1,96 @@
+import json
+
+import pytest
+
+from pfmsoft.util.file import json_benchmark
+from pfmsoft.util.file.json_backend import (
+    AVAILABLE_BACKENDS,
+    BACKEND_NAMES,
+    get_json_backend,
+)
+from pfmsoft.util.file.read_write import load_json, save_json
+
+DATA = {
+    "b": [1, 2.5, None, True, "text", "café"],
+    "a": {"nested": [{"x": 1}], "empty": {}},
+    "big": 2**63 - 1,
+}
+
+
+@pytest.mark.parametrize("name", list(AVAILABLE_BACKENDS))
+def test_backend_round_trip(name):
+    backend = get_json_backend(name)
+    assert backend.name == name
+    for indent in (None, 2, 4):
+        encoded = backend.dumps(DATA, indent=indent, sort_keys=True)
+        assert json.loads(encoded) == DATA
+        assert backend.loads(encoded) == DATA
+        assert backend.loads(encoded.encode("utf8")) == DATA
+    ascii_data = {"b": [1, 2.5, None], "a": {"x": "y"}}
+    assert backend.dumps(ascii_data, indent=2, sort_keys=True) == json.dumps(
+        ascii_data, indent=2, sort_keys=True
+    )
+
+
+@pytest.mark.parametrize("name", list(AVAILABLE_BACKENDS))
+def test_backend_falls_back_to_json(name):
+    backend = get_json_backend(name)
+    data = {"big": 2**70, 1: "int key"}
+    assert json.loads(backend.dumps(data)) == {"big": 2**70, "1": "int key"}
+
+
+def test_get_json_backend():
+    assert get_json_backend().name == next(
+        x for x in BACKEND_NAMES if x in AVAILABLE_BACKENDS
+    )
+    with pytest.raises(ValueError):
+        get_json_backend("simplejson")
+
+
+@pytest.mark.parametrize("name", list(AVAILABLE_BACKENDS))
+def test_read_write_json_backend(tmp_path, name):
+    file_path = tmp_path / "data.json"
+    save_json(DATA, file_path, json_backend=name)
+    assert load_json(file_path, json_backend=name) == DATA
+    save_json(DATA, file_path, separators=(",", ":"), indent=None)
+    assert file_path.read_text(encoding="utf8") == json.dumps(
+        DATA, separators=(",", ":")
+    )
+    assert load_json(file_path, parse_int=str)["big"] == str(DATA["big"])
+
+
+def test_json_benchmark():
+    results = json_benchmark.run_benchmarks(["json"], records=100, repeat=1)
+    assert [x["operation"] for x in results["results"]] == [
+        "dumps",
+        "dumps_indent",
+        "loads",
+    ]
+    assert "1.0x" in json_benchmark.format_results(results)
+
+
+@pytest.mark.parametrize("name", list(AVAILABLE_BACKENDS))
+def test_backend_keeps_non_finite_floats(name):
+    backend = get_json_backend(name)
+    data = {"x": float("nan"), "y": [1.5, {"z": float("-inf")}]}
+    for indent in (None, 2):
+        assert backend.dumps(data, indent=indent) == json.dumps(data, indent=indent)
+
+
+def test_save_json_defaults_to_json(tmp_path):
+    file_path = tmp_path / "data.json"
+    data = {"x": float("inf"), "name": "café"}
+    save_json(data, file_path)
+    assert file_path.read_text(encoding="utf8") == json.dumps(data, indent=2)
+
+
+def test_save_json_streams_with_json(tmp_path, monkeypatch):
+    def no_dumps(*args, **kwargs):
+        raise AssertionError("The json backend should stream with json.dump.")
+
+    monkeypatch.setitem(
+        AVAILABLE_BACKENDS, "json", AVAILABLE_BACKENDS["json"]._replace(dumps=no_dumps)
+    )
+    file_path = tmp_path / "data.json"
+    save_json(DATA, file_path)
+    assert load_json(file_path) == DATA
@@ -0,0 +1,68 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from pfmsoft.util.file.json_stream import (
+    JsonArrayWriter,
+    iter_json_array,
+    save_json_stream,
+)
+
+ITEMS = [
+    {"order_id": x, "price": x * 1.5, "name": f"item ]}},[ {x}", "tags": [x, None]}
+    for x in range(100)
+] + [12345678901234567890, "text", [], {}, True, None, -0.5e-10]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 65536])
+@pytest.mark.parametrize("suffix", [".json", ".json.gz"])
+def test_json_array_round_trip(tmp_path: Path, chunk_size, suffix):
+    file_path = tmp_path / "sub" / f"items{suffix}"
+    count = save_json_stream(iter(ITEMS), file_path, parents=True)
+    assert count == len(ITEMS)
+    assert list(iter_json_array(file_path, chunk_size=chunk_size)) == ITEMS
+    if suffix == ".json":
+        assert json.loads(file_path.read_text(encoding="utf8")) == ITEMS
+
+
+def test_json_lines_round_trip(tmp_path: Path):
+    file_path = tmp_path / "items.jsonl"
+    with JsonArrayWriter(file_path, json_lines=True) as writer:
+        writer.write_many(ITEMS[:50])
+        writer.write_many(ITEMS[50:])
+    lines = file_path.read_text(encoding="utf8").splitlines()
+    assert [json.loads(x) for x in lines] == ITEMS
+    assert list(iter_json_array(file_path, json_lines=True)) == ITEMS
+    with pytest.raises(ValueError):
+        JsonArrayWriter(tmp_path / "indented.jsonl", json_lines=True, indent=2)
+
+
+def test_json_array_empty_and_invalid(tmp_path: Path):
+    file_path = tmp_path / "empty.json"
+    save_json_stream([], file_path)
+    assert json.loads(file_path.read_text(encoding="utf8")) == []
+    assert list(iter_json_array(file_path)) == []
+    with pytest.raises(FileExistsError):
+        save_json_stream([], file_path, mode="x")
+    for text in ('{"a": 1}', "[1, 2", "[1 2]", "[1,]"):
+        file_path.write_text(text, encoding="utf8")
+        with pytest.raises(json.JSONDecodeError):
+            list(iter_json_array(file_path, chunk_size=2))
+
+
+@pytest.mark.parametrize("suffix", [".json", ".json.gz"])
+def test_json_array_writer_failure(tmp_path: Path, suffix):
+    file_path = tmp_path / f"out{suffix}"
+    save_json_stream([1, 2], file_path)
+
+    def failing_items():
+        yield 3
+        raise RuntimeError("api failed")
+
+    with pytest.raises(RuntimeError):
+        save_json_stream(failing_items(), file_path)
+    assert list(iter_json_array(file_path)) == [1, 2]
+    assert [x.name for x in tmp_path.iterdir()] == [file_path.name]
+    with pytest.raises(FileExistsError):
+        JsonArrayWriter(file_path, mode="x")
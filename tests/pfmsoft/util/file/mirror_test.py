@@ -0,0 +1,115 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from pfmsoft.util.file import mirror
+
+
+@pytest.fixture(scope="function")
+def mirror_source(tmp_path):
+    source_root = tmp_path / "mirror_source"
+    (source_root / "one" / "two").mkdir(parents=True)
+    (source_root / "empty_dir").mkdir()
+    files = {
+        "a.txt": b"alpha",
+        "one/b.txt": b"bravo" * 1000,
+        "one/two/c.bin": os.urandom(200000),
+        "one/two/empty.txt": b"",
+    }
+    for name, data in files.items():
+        (source_root / name).write_bytes(data)
+    return source_root, files
+
+
+def test_copy_file_contents(tmp_path: Path):
+    source = tmp_path / "source.bin"
+    data = os.urandom(100000)
+    source.write_bytes(data)
+    target = tmp_path / "target.bin"
+    target.write_bytes(b"old contents, longer than nothing")
+    assert mirror.copy_file_contents(source, target) == len(data)
+    assert target.read_bytes() == data
+
+
+@pytest.mark.parametrize("compare", ["size_mtime", "hash"])
+def test_mirror_copy(tmp_path: Path, mirror_source, compare, caplog):
+    source_root, files = mirror_source
+    target_root = tmp_path / "mirror_target"
+    with caplog.at_level(logging.INFO, logger=mirror.__name__):
+        stats = mirror.mirror_paths(
+            source_root, "**/*", target_root, compare=compare, max_workers=2
+        )
+    assert f"{stats.bytes_per_second:.1f} bytes per second" in caplog.text
+    assert stats.copied == 4
+    assert stats.bytes_copied == sum(len(x) for x in files.values())
+    assert stats.bytes_per_second > 0
+    for name, data in files.items():
+        assert (target_root / name).read_bytes() == data
+    # nothing changed, nothing copied.
+    stats = mirror.mirror_paths(source_root, "**/*", target_root, compare=compare)
+    assert (stats.copied, stats.skipped) == (0, 4)
+    # change one file.
+    (source_root / "a.txt").write_bytes(b"ALPHA!")
+    stats = mirror.mirror_paths(source_root, "**/*", target_root, compare=compare)
+    assert (stats.copied, stats.skipped) == (1, 3)
+    assert (target_root / "a.txt").read_bytes() == b"ALPHA!"
+    assert not list(target_root.glob("**/*.partial"))
+
+
+def test_mirror_links(tmp_path: Path, mirror_source):
+    source_root, files = mirror_source
+    for mode in ["hardlink", "symlink"]:
+        target_root = tmp_path / f"mirror_{mode}"
+        stats = mirror.mirror_paths(
+            source_root, "**/*.txt", target_root, mode=mode, max_workers=2
+        )
+        assert stats.linked == 3
+        assert stats.bytes_copied == 0
+        assert (target_root / "one/b.txt").read_bytes() == files["one/b.txt"]
+        stats = mirror.mirror_paths(source_root, "**/*.txt", target_root, mode=mode)
+        assert stats.skipped == 3
+    assert (tmp_path / "mirror_symlink" / "a.txt").is_symlink()
+    assert os.path.samefile(tmp_path / "mirror_hardlink/a.txt", source_root / "a.txt")
+
+
+def test_mirror_bad_arguments(tmp_path: Path, mirror_source):
+    source_root, _ = mirror_source
+    with pytest.raises(ValueError):
+        mirror.mirror_paths(source_root, "**/*", tmp_path / "out", mode="move")
+    with pytest.raises(ValueError):
+        mirror.mirror_paths(source_root, "**/*", tmp_path / "out", compare="name")
+    with pytest.raises(ValueError):
+        mirror.mirror_paths(source_root / "a.txt", "**/*", tmp_path / "out")
+
+
+def test_mirror_file_same_target(tmp_path: Path, mirror_source):
+    source_root, files = mirror_source
+    target = tmp_path / "target.txt"
+    sources = [source_root / name for name in files]
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(
+            executor.map(
+                lambda source: mirror.mirror_file(source, target, compare="none"),
+                sources * 5,
+            )
+        )
+    assert all(action == "copied" for action, _ in results)
+    assert target.read_bytes() in files.values()
+    assert [x.name for x in tmp_path.iterdir() if x.is_file()] == ["target.txt"]
+
+
+def test_mirror_copy_over_symlinks(tmp_path: Path, mirror_source):
+    source_root, files = mirror_source
+    target_root = tmp_path / "mirror_target"
+    mirror.mirror_paths(source_root, "**/*", target_root, mode="symlink")
+    assert (target_root / "a.txt").is_symlink()
+    stats = mirror.mirror_paths(source_root, "**/*", target_root, mode="copy")
+    assert (stats.copied, stats.skipped) == (len(files), 0)
+    for name, data in files.items():
+        assert not (target_root / name).is_symlink()
+        assert (target_root / name).read_bytes() == data
+    stats = mirror.mirror_paths(source_root, "**/*", target_root, mode="copy")
+    assert (stats.copied, stats.skipped) == (0, len(files))
@@ -3,7 +3,13 @@ from typing import Sequence
 
 import pytest
 
-from pfmsoft.util.file.path import collect_paths, delta_path, delta_paths
+from pfmsoft.util.file.path import (
+    PathStat,
+    collect_paths,
+    delta_path,
+    delta_paths,
+    scan_paths,
+)
 
 
 def test_delta_path():
@@ -72,3 +78,35 @@ def test_delta_paths(delta_root: Path, delta_files: Sequence[Path]):
         path_string = str(path)
         stub = path_string.replace(str(base_path), "")
         assert new_base_path / Path(stub) == path
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_scan_paths(delta_root: Path, delta_files: Sequence[Path], max_workers):
+    expected = set(collect_paths(delta_root, "**/*"))
+    found = list(scan_paths(delta_root, max_workers=max_workers))
+    assert len(found) == 13
+    assert set(found) == expected
+    # files only, by pattern
+    found = list(
+        scan_paths(delta_root, "*.txt", include_dirs=False, max_workers=max_workers)
+    )
+    assert set(found) == set(delta_files)
+    # prune a branch
+    found = list(scan_paths(delta_root, prune_patterns=["branch_2"]))
+    assert len(found) == 6
+    assert all("branch_2" not in str(x) for x in found)
+    # filter on the DirEntry, and yield stat records.
+    found = list(
+        scan_paths(
+            delta_root,
+            entry_filter=lambda entry: entry.is_file(),
+            max_workers=max_workers,
+            with_stat=True,
+        )
+    )
+    assert {Path(x.path) for x in found} == set(delta_files)
+    for path_stat in found:
+        assert isinstance(path_stat, PathStat)
+        assert path_stat.stat.st_size == 0
+    with pytest.raises(ValueError):
+        list(scan_paths(delta_files[0]))
@@ -3,12 +3,14 @@ from pathlib import Path
 
 import pytest
 
+from pfmsoft.util.file import read_write
 from pfmsoft.util.file.read_write import (
     load_json,
     save_json,
     save_lines,
     save_string,
     save_stringables,
+    save_strings_to_files,
 )
 
 
@@ -93,3 +95,81 @@ def test_save_stringable(tmp_path):
     file_path = tmp_path / "bar/saved_stringables.txt"
     with pytest.raises(FileNotFoundError):
         save_stringables(data, file_path, mode="x")
+
+
+def test_save_string_atomic(tmp_path):
+    file_path = tmp_path / "atomic.txt"
+    save_string("old", file_path)
+    save_string("new", file_path, atomic=True, fsync=True)
+    assert file_path.read_text() == "new"
+    with pytest.raises(FileExistsError):
+        save_string("newer", file_path, mode="x", atomic=True)
+    with pytest.raises(ValueError):
+        save_string("more", file_path, mode="a", atomic=True)
+    assert file_path.read_text() == "new"
+    assert [x.name for x in tmp_path.iterdir()] == ["atomic.txt"]
+
+
+def test_save_lines_atomic_failure(tmp_path):
+    def lines():
+        yield "line1"
+        raise RuntimeError("no more lines")
+
+    file_path = tmp_path / "lines.txt"
+    save_lines(["old"], file_path)
+    with pytest.raises(RuntimeError):
+        save_lines(lines(), file_path, atomic=True, coalesce_size=1)
+    assert file_path.read_text() == "old\n"
+    assert [x.name for x in tmp_path.iterdir()] == ["lines.txt"]
+
+
+@pytest.mark.parametrize("coalesce_size", [0, 7, 1024 * 1024])
+def test_save_lines_coalesce(tmp_path, coalesce_size):
+    data = [f"line {x}" for x in range(100)]
+    file_path = tmp_path / "lines.txt"
+    save_lines(data, file_path, coalesce_size=coalesce_size)
+    assert file_path.read_text().splitlines() == data
+    save_stringables(range(10), file_path, line_separator=",", atomic=True)
+    assert file_path.read_text() == "0,1,2,3,4,5,6,7,8,9,"
+
+
+def test_save_strings_to_files(tmp_path):
+    items = ((f"data {x}", tmp_path / f"dir_{x % 3}" / f"{x}.txt") for x in range(50))
+    saved = save_strings_to_files(
+        items, parents=True, atomic=True, max_workers=4, max_in_flight=3
+    )
+    assert saved == 50
+    assert sorted(x.read_text() for x in tmp_path.glob("*/*.txt")) == sorted(
+        f"data {x}" for x in range(50)
+    )
+    with pytest.raises(FileExistsError):
+        save_strings_to_files([("again", tmp_path / "dir_0" / "0.txt")], mode="x")
+
+
+def test_save_string_atomic_concurrent(tmp_path):
+    file_path = tmp_path / "same.txt"
+    data = [str(x) * 10000 for x in range(10)]
+    saved = save_strings_to_files(
+        ((x, file_path) for x in data), atomic=True, max_workers=8
+    )
+    assert saved == 10
+    assert file_path.read_text() in data
+    assert [x.name for x in tmp_path.iterdir()] == ["same.txt"]
+    plain_path = tmp_path / "plain.txt"
+    plain_path.write_text("plain")
+    assert file_path.stat().st_mode & 0o777 == plain_path.stat().st_mode & 0o777
+
+
+def test_save_string_atomic_exclusive_race(tmp_path, monkeypatch):
+    file_path = tmp_path / "exclusive.txt"
+    commit = read_write.commit_temp_file
+
+    def create_then_commit(temp_path, target, exclusive=False):
+        target.write_text("other")
+        commit(temp_path, target, exclusive)
+
+    monkeypatch.setattr(read_write, "commit_temp_file", create_then_commit)
+    with pytest.raises(FileExistsError):
+        save_string("mine", file_path, mode="x", atomic=True)
+    assert file_path.read_text() == "other"
+    assert [x.name for x in tmp_path.iterdir()] == ["exclusive.txt"]
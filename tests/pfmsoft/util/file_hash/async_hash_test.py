@@ -0,0 +1,87 @@
+import asyncio
+import hashlib
+import threading
+from pathlib import Path
+
+import pytest
+
+from pfmsoft.util.file_hash import async_hash, file_hash
+from pfmsoft.util.file_hash.async_hash import AsyncFileHasher
+
+
+@pytest.fixture(scope="function")
+def async_test_files(tmp_path):
+    test_data_root_dir = tmp_path / "async_hash_test_data"
+    test_data_root_dir.mkdir()
+    file_paths = []
+    for count in range(6):
+        file_path = test_data_root_dir / f"test_file_{count}.txt"
+        file_path.write_text(f"test file number {count}\n" * count)
+        file_paths.append(file_path)
+    return file_paths
+
+
+@pytest.mark.asyncio
+async def test_hash_file(async_test_files):
+    hasher = AsyncFileHasher()
+    result = await hasher.hash_file(async_test_files[3], "sha256")
+    assert result == file_hash.file_hasher(async_test_files[3], "sha256")
+
+
+@pytest.mark.asyncio
+async def test_hash_files(async_test_files):
+    hasher = AsyncFileHasher(max_concurrent=2)
+    paths = [*async_test_files, async_test_files[0].parent]
+    results = await hasher.hash_files(paths, "md5")
+    assert results == list(file_hash.file_hasher_generator(async_test_files, "md5"))
+
+
+@pytest.mark.asyncio
+async def test_hash_bytes_and_handle(async_test_files: list):
+    hasher = AsyncFileHasher(max_concurrent=1)
+    data = b"a downloaded payload"
+    assert await hasher.hash_bytes(data, "sha1") == hashlib.sha1(data).hexdigest()
+    file_path: Path = async_test_files[5]
+    with open(file_path, "rb") as file_in:
+        digest = await hasher.hash_file_handle(file_in, "md5", as_hex_str=False)
+    assert digest == hashlib.md5(file_path.read_bytes()).digest()
+
+
+@pytest.mark.asyncio
+async def test_event_loop_not_blocked(async_test_files, monkeypatch):
+    hasher = AsyncFileHasher(max_concurrent=1)
+    loop_thread = threading.get_ident()
+    ticked = threading.Event()
+    events = []
+    stat_threads = set()
+    original_is_file = Path.is_file
+
+    def recording_is_file(self):
+        stat_threads.add(threading.get_ident())
+        return original_is_file(self)
+
+    def slow_hasher(file_path, hash_method):
+        # Only finishes once the event loop has run the ticker.
+        assert ticked.wait(timeout=5)
+        events.append("hashed")
+        return file_hash.file_hasher(file_path, hash_method)
+
+    async def ticker():
+        await asyncio.sleep(0)
+        events.append("tick")
+        ticked.set()
+
+    monkeypatch.setattr(Path, "is_file", recording_is_file)
+    monkeypatch.setattr(async_hash, "file_hasher", slow_hasher)
+    results, _ = await asyncio.gather(
+        hasher.hash_files(async_test_files, "sha512"), ticker()
+    )
+    assert events[0] == "tick"
+    assert events.count("hashed") == len(async_test_files)
+    assert loop_thread not in stat_threads
+    assert results == list(file_hash.file_hasher_generator(async_test_files, "sha512"))
+
+
+def test_bad_concurrency():
+    with pytest.raises(ValueError):
+        AsyncFileHasher(max_concurrent=0)
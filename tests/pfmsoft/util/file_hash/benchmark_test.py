@@ -0,0 +1,60 @@
+import copy
+
+from pfmsoft.util.file.read_write import load_json, save_json
+from pfmsoft.util.file_hash import benchmark
+
+
+def test_run_benchmarks(tmp_path):
+    results = benchmark.run_benchmarks(
+        hash_methods=["md5", "sha256"],
+        data_sizes=[10000],
+        block_sizes=[1000, 4096],
+        repeat=1,
+        temp_dir=tmp_path,
+    )
+    # 2 hash methods * 2 block sizes * (memory, file, mmap)
+    assert len(results["results"]) == 12
+    assert set(results["call_overhead_ns"]) == {"md5", "sha256"}
+    for result in results["results"]:
+        assert result["mb_per_second"] > 0
+    assert "sha256" in benchmark.format_results(results)
+
+
+def test_compare_results():
+    baseline = {
+        "results": [
+            benchmark.BenchmarkResult("md5", "memory", 100, 10, 5, 100.0)._asdict(),
+            benchmark.BenchmarkResult("md5", "file", 100, 10, 5, 100.0)._asdict(),
+        ]
+    }
+    current = copy.deepcopy(baseline)
+    assert benchmark.compare_results(baseline, current) == []
+    current["results"][1]["mb_per_second"] = 50.0
+    regressions = benchmark.compare_results(baseline, current)
+    assert len(regressions) == 1
+    assert "md5/file" in regressions[0]
+    assert benchmark.compare_results(baseline, current, tolerance=0.6) == []
+
+
+def test_main(tmp_path, capsys):
+    output = tmp_path / "results" / "benchmark.json"
+    args = ["--hash-methods", "md5", "--data-sizes", "5000", "--block-sizes", "1000"]
+    assert benchmark.main([*args, "--repeat", "1", "--output", str(output)]) == 0
+    assert len(load_json(output)["results"]) == 3
+    saved = load_json(output)
+    # A baseline far faster than any machine, so every result is a regression.
+    fast_path = tmp_path / "fast.json"
+    for result in saved["results"]:
+        result["mb_per_second"] = 1e12
+    save_json(saved, fast_path)
+    compare_args = [*args, "--repeat", "1", "--memory-only", "--compare"]
+    capsys.readouterr()
+    assert benchmark.main([*compare_args, str(fast_path)]) == 1
+    assert "REGRESSION md5/memory/5000/1000" in capsys.readouterr().out
+    # A baseline far slower, and a generous tolerance, so nothing regressed.
+    slow_path = tmp_path / "slow.json"
+    for result in saved["results"]:
+        result["mb_per_second"] = 1e-6
+    save_json(saved, slow_path)
+    assert benchmark.main([*compare_args, str(slow_path), "--tolerance", "0.5"]) == 0
+    assert "REGRESSION" not in capsys.readouterr().out
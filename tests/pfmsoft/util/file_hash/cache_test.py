@@ -0,0 +1,79 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from pfmsoft.util.file_hash import file_hash
+from pfmsoft.util.file_hash.cache import HashCache
+
+
+@pytest.fixture(scope="function")
+def cache_test_files(tmp_path):
+    test_data_root_dir = tmp_path / "cache_test_data"
+    test_data_root_dir.mkdir()
+    file_paths = []
+    for count in range(5):
+        file_path = test_data_root_dir / f"test_file_{count}.txt"
+        file_path.write_text(f"test file number {count}")
+        file_paths.append(file_path)
+    return file_paths
+
+
+def test_cache_hit_and_miss(tmp_path: Path, cache_test_files):
+    db_path = tmp_path / "hash_cache.sqlite"
+    with HashCache(db_path) as cache:
+        first = list(file_hash.file_hasher_generator(cache_test_files, "md5", cache))
+        assert cache.misses == 5
+        assert cache.hits == 0
+        assert len(cache) == 5
+    # reopen, results survive between runs.
+    with HashCache(db_path) as cache:
+        second = list(file_hash.file_hasher_generator(cache_test_files, "md5", cache))
+        assert cache.hits == 5
+        assert cache.misses == 0
+        # a different hash method is a different entry.
+        file_hash.file_hasher(cache_test_files[0], "sha1", cache)
+        assert cache.misses == 1
+        assert len(cache) == 6
+    assert first == second
+    assert first == list(file_hash.file_hasher_generator(cache_test_files, "md5"))
+
+
+def test_cache_stale_entry(tmp_path: Path, cache_test_files):
+    file_path = cache_test_files[0]
+    with HashCache(tmp_path / "hash_cache.sqlite") as cache:
+        original = file_hash.file_hasher(file_path, "sha256", cache)
+        file_path.write_text("changed contents, and a different size")
+        changed = file_hash.file_hasher(file_path, "sha256", cache)
+        assert cache.misses == 2
+        assert changed != original
+        assert changed == file_hash.file_hasher(file_path, "sha256")
+        # same size, new mtime.
+        file_path.write_text("changed contents, and a different SIZE")
+        stat_result = file_path.stat()
+        os.utime(file_path, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns + 1))
+        assert cache.get(file_path, "sha256") is None
+
+
+def test_cache_eviction(tmp_path: Path, cache_test_files):
+    with HashCache(tmp_path / "hash_cache.sqlite", max_entries=3) as cache:
+        for file_path in cache_test_files:
+            file_hash.file_hasher(file_path, "md5", cache)
+        assert len(cache) == 3
+        assert cache.evictions == 2
+        assert cache.get(cache_test_files[0], "md5") is None
+        assert cache.get(cache_test_files[4], "md5") is not None
+
+
+def test_cache_invalidate_and_prune(tmp_path: Path, cache_test_files):
+    with HashCache(tmp_path / "hash_cache.sqlite") as cache:
+        for file_path in cache_test_files:
+            file_hash.file_hasher(file_path, "md5", cache)
+        cache.invalidate(cache_test_files[0])
+        assert len(cache) == 4
+        assert cache.get(cache_test_files[0], "md5") is None
+        cache_test_files[1].unlink()
+        assert cache.prune_missing() == 1
+        assert len(cache) == 3
+        cache.invalidate()
+        assert len(cache) == 0
@@ -0,0 +1,121 @@
+import hashlib
+from pathlib import Path
+
+import pytest
+
+from pfmsoft.util.file_hash import chunked
+
+CHUNK_SIZE = 1000
+
+
+@pytest.fixture(scope="function")
+def chunked_test_file(tmp_path):
+    file_path = tmp_path / "chunked_test_data.bin"
+    file_path.write_bytes(bytes(range(256)) * 39)  # 9984 bytes, 10 chunks.
+    return file_path
+
+
+def test_merkle_root():
+    leaves = [hashlib.sha256(bytes([x])).hexdigest() for x in range(3)]
+    pair = hashlib.sha256(bytes.fromhex(leaves[0]) + bytes.fromhex(leaves[1]))
+    root = hashlib.sha256(pair.digest() + bytes.fromhex(leaves[2])).hexdigest()
+    assert chunked.merkle_root(leaves, "sha256") == root
+    assert chunked.merkle_root(leaves[:1], "sha256") == leaves[0]
+    assert chunked.merkle_root([], "md5") == hashlib.md5().hexdigest()
+
+
+def test_build_chunk_manifest(chunked_test_file: Path):
+    manifest = chunked.build_chunk_manifest(
+        chunked_test_file, "md5", chunk_size=CHUNK_SIZE
+    )
+    data = chunked_test_file.read_bytes()
+    expected = [
+        hashlib.md5(data[x : x + CHUNK_SIZE]).hexdigest()
+        for x in range(0, len(data), CHUNK_SIZE)
+    ]
+    assert manifest.chunk_count == 10
+    assert manifest.complete
+    assert manifest.chunk_hashes == expected
+    assert manifest.merkle_root == chunked.merkle_root(expected, "md5")
+    assert chunked.verify_chunk_manifest(chunked_test_file, manifest) == []
+
+
+def test_resume_chunk_manifest(chunked_test_file: Path, tmp_path: Path):
+    manifest_path = tmp_path / "manifest.json"
+    full = chunked.build_chunk_manifest(
+        chunked_test_file, chunk_size=CHUNK_SIZE, manifest_path=manifest_path
+    )
+    assert chunked.ChunkManifest.load(manifest_path) == full
+    # simulate an interrupted run, with a corrupt chunk hash to prove it is reused.
+    partial = chunked.ChunkManifest.load(manifest_path)
+    partial.chunk_hashes = partial.chunk_hashes[:4]
+    partial.chunk_hashes[0] = "00" * 32
+    partial.merkle_root = None
+    partial.save(manifest_path)
+    resumed = chunked.build_chunk_manifest(
+        chunked_test_file, chunk_size=CHUNK_SIZE, manifest_path=manifest_path
+    )
+    assert resumed.chunk_hashes[0] == "00" * 32
+    assert resumed.chunk_hashes[1:] == full.chunk_hashes[1:]
+    # a different chunk size starts over.
+    restarted = chunked.build_chunk_manifest(
+        chunked_test_file, chunk_size=500, manifest_path=manifest_path
+    )
+    assert restarted.chunk_count == 20
+    assert chunked.verify_chunk_manifest(chunked_test_file, restarted) == []
+
+
+def test_verify_and_update_after_rewrite(chunked_test_file: Path):
+    manifest = chunked.build_chunk_manifest(chunked_test_file, chunk_size=CHUNK_SIZE)
+    with open(chunked_test_file, "r+b") as file_out:
+        file_out.seek(2500)
+        file_out.write(b"x" * 600)
+    changed = chunked.chunks_for_range(2500, 600, CHUNK_SIZE)
+    assert list(changed) == [2, 3]
+    assert chunked.verify_chunk_manifest(chunked_test_file, manifest) == [2, 3]
+    assert chunked.verify_chunk_manifest(chunked_test_file, manifest, [0, 3]) == [3]
+    updated = chunked.update_chunk_manifest(chunked_test_file, manifest, [(2500, 600)])
+    rebuilt = chunked.build_chunk_manifest(chunked_test_file, chunk_size=CHUNK_SIZE)
+    assert updated == rebuilt
+
+
+def test_update_after_append(chunked_test_file: Path):
+    manifest = chunked.build_chunk_manifest(chunked_test_file, chunk_size=CHUNK_SIZE)
+    with open(chunked_test_file, "ab") as file_out:
+        file_out.write(b"y" * 1500)
+    assert chunked.verify_chunk_manifest(chunked_test_file, manifest) == [9, 10, 11]
+    updated = chunked.update_chunk_manifest(chunked_test_file, manifest, [])
+    rebuilt = chunked.build_chunk_manifest(chunked_test_file, chunk_size=CHUNK_SIZE)
+    assert updated == rebuilt
+    with pytest.raises(ValueError):
+        chunked.verify_chunk_manifest(
+            chunked_test_file, chunked.ChunkManifest(10, 0, "md5", 1)
+        )
+
+
+@pytest.mark.parametrize("chunk_size", [0, -1])
+def test_bad_chunk_size(chunked_test_file: Path, chunk_size):
+    with pytest.raises(ValueError):
+        chunked.build_chunk_manifest(chunked_test_file, chunk_size=chunk_size)
+    with pytest.raises(ValueError):
+        chunked.hash_chunk(chunked_test_file, "md5", chunk_size, 0)
+    with pytest.raises(ValueError):
+        chunked.chunks_for_range(0, 10, chunk_size)
+    with pytest.raises(ValueError):
+        chunked.ChunkManifest(10, 0, "md5", chunk_size)
+
+
+@pytest.mark.parametrize("new_size", [15, 10, 0, 45])
+def test_update_after_resize(tmp_path: Path, new_size):
+    file_path = tmp_path / "resized.bin"
+    file_path.write_bytes(bytes(range(30)))
+    manifest = chunked.build_chunk_manifest(file_path, chunk_size=10)
+    if new_size < 30:
+        with open(file_path, "r+b") as file_out:
+            file_out.truncate(new_size)
+    else:
+        with open(file_path, "ab") as file_out:
+            file_out.write(b"z" * (new_size - 30))
+    updated = chunked.update_chunk_manifest(file_path, manifest, [])
+    assert updated == chunked.build_chunk_manifest(file_path, chunk_size=10)
+    assert chunked.verify_chunk_manifest(file_path, updated) == []
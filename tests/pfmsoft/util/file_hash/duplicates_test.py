@@ -0,0 +1,73 @@
+from pathlib import Path
+
+import pytest
+
+from pfmsoft.util.file_hash import file_hash
+from pfmsoft.util.file_hash.duplicates import (
+    DuplicateGroup,
+    find_duplicate_files,
+    partial_file_hash,
+)
+
+
+@pytest.fixture(scope="function")
+def duplicate_test_files(tmp_path):
+    test_data_root_dir = tmp_path / "duplicate_test_data"
+    test_data_root_dir.mkdir()
+    large = b"a" * 500 + b"b" * 500
+    # same size, head and tail as large, but a different middle.
+    large_middle = b"a" * 400 + b"c" * 200 + b"b" * 400
+    contents = {
+        "large_1.bin": large,
+        "large_2.bin": large,
+        "large_3.bin": large_middle,
+        "small_1.txt": b"small",
+        "small_2.txt": b"small",
+        "small_3.txt": b"SMALL",
+        "unique.txt": b"only one of these",
+        "empty_1.txt": b"",
+        "empty_2.txt": b"",
+    }
+    paths = {}
+    for name, data in contents.items():
+        paths[name] = test_data_root_dir / name
+        paths[name].write_bytes(data)
+    return paths
+
+
+def test_find_duplicate_files(duplicate_test_files):
+    file_paths = list(duplicate_test_files.values())
+    groups = list(find_duplicate_files(file_paths, "md5", partial_size=100))
+    assert len(groups) == 2
+    for group in groups:
+        assert isinstance(group, DuplicateGroup)
+        for file_path in group.file_paths:
+            assert file_hash.file_hasher(file_path, "md5").file_hash == group.file_hash
+    # largest first
+    assert groups[0].size == 1000
+    assert {x.name for x in groups[0].file_paths} == {"large_1.bin", "large_2.bin"}
+    assert {x.name for x in groups[1].file_paths} == {"small_1.txt", "small_2.txt"}
+
+
+def test_find_duplicate_files_empty(duplicate_test_files: dict):
+    file_paths = list(duplicate_test_files.values())
+    # duplicate paths and directories are ignored.
+    file_paths.append(file_paths[0])
+    file_paths.append(file_paths[0].parent)
+    groups = list(find_duplicate_files(file_paths, "md5", include_empty=True))
+    assert len(groups) == 3
+    assert groups[-1].size == 0
+    assert groups[-1].file_hash == file_hash.get_hasher("md5").hexdigest()
+
+
+def test_partial_file_hash(duplicate_test_files):
+    large: Path = duplicate_test_files["large_1.bin"]
+    middle: Path = duplicate_test_files["large_3.bin"]
+    assert partial_file_hash(large, "sha1", 100) == partial_file_hash(
+        middle, "sha1", 100
+    )
+    # small enough to be hashed in full.
+    assert (
+        partial_file_hash(large, "sha1", 500)
+        == file_hash.file_hasher(large, "sha1").file_hash
+    )
@@ -3,6 +3,7 @@
 """
 # TODO test raising exceptions
 import hashlib
+import io
 import string
 from pathlib import Path
 
@@ -191,3 +192,101 @@ def test_all_hashers(hash_test_data):
             string_hash = hasher.hexdigest()
             file_hash_data = file_hash.file_hasher(value["test_path"], hash_method)
             assert string_hash == file_hash_data.file_hash
+
+
+def test_buffer_and_mmap_iterators(tmp_path):
+    file_path = tmp_path / "large_test_file.bin"
+    data = bytes(range(256)) * 5000
+    file_path.write_bytes(data)
+    expected = hashlib.sha256(data).hexdigest()
+    for block_size in [None, 1000, 4096, 65536, len(data) * 2]:
+        for use_mmap in [False, True]:
+            result = file_hash.calculate_file_hash_from_path(
+                file_path, hashlib.sha256(), block_size=block_size, use_mmap=use_mmap
+            )
+            assert result == expected
+    with open(file_path, "rb") as file_in:
+        blocks = list(file_hash.file_as_buffer_iterator(file_in, 65536))
+    # views are released once the next block is read.
+    with pytest.raises(ValueError):
+        bytes(blocks[0])
+    # empty files
+    empty_path = tmp_path / "empty_test_file.bin"
+    empty_path.touch()
+    for use_mmap in [False, True]:
+        result = file_hash.calculate_file_hash_from_path(
+            empty_path, hashlib.md5(), use_mmap=use_mmap
+        )
+        assert result == hashlib.md5(b"").hexdigest()
+
+
+def test_hash_handle_without_readinto():
+    class ReadOnlyStream:
+        # Only read() and close(), like some stream wrappers.
+        def __init__(self, data: bytes):
+            self._stream = io.BytesIO(data)
+
+        def read(self, size: int = -1) -> bytes:
+            return self._stream.read(size)
+
+        def close(self):
+            self._stream.close()
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *args):
+            self.close()
+
+    data = bytes(range(256)) * 1000
+    result = file_hash.calculate_file_hash_from_file_handle(
+        ReadOnlyStream(data), hashlib.sha256(), block_size=1000
+    )
+    assert result == hashlib.sha256(data).hexdigest()
+    result = file_hash.calculate_file_hash_from_file_handle(
+        ReadOnlyStream(data), hashlib.md5()
+    )
+    assert result == hashlib.md5(data).hexdigest()
+
+
+def test_get_block_size(tmp_path):
+    small_path = tmp_path / "small_test_file.bin"
+    small_path.write_bytes(b"x" * 10)
+    large_path = tmp_path / "large_test_file.bin"
+    large_path.write_bytes(b"x" * (file_hash.MAX_BLOCK_SIZE * 2))
+    with open(small_path, "rb") as file_in:
+        small_size = file_hash.get_block_size(file_in)
+    with open(large_path, "rb") as file_in:
+        large_size = file_hash.get_block_size(file_in)
+    assert 10 <= small_size < file_hash.MIN_BLOCK_SIZE
+    assert large_size == file_hash.MAX_BLOCK_SIZE
+    assert file_hash.get_block_size(io.BytesIO(b"abc")) == file_hash.MIN_BLOCK_SIZE
+
+
+def test_multi_file_hasher(hash_test_data):
+    hash_methods = ["md5", "sha256", "blake2b"]
+    for _, value in hash_test_data["test_files"].items():
+        result = file_hash.multi_file_hasher(value["test_path"], hash_methods)
+        assert isinstance(result, file_hash.MultiFileHash)
+        assert list(result.file_hashes) == hash_methods
+        assert result.hash_method == "md5"
+        assert result.file_hash == md5sum(value["test_path"])
+        for single in result.to_file_hashes():
+            assert single == file_hash.file_hasher(
+                value["test_path"], single.hash_method
+            )
+    with pytest.raises(ValueError):
+        file_hash.multi_file_hasher(hash_test_data["test_data_root_dir"], [])
+    with pytest.raises(ValueError):
+        file_hash.multi_file_hasher(hash_test_data["test_data_root_dir"], ["md5"])
+
+
+def test_multi_file_hasher_generator(hash_test_data):
+    dir_path: Path = hash_test_data["test_data_root_dir"]
+    file_path_list = list(dir_path.glob("**/*"))
+    results = list(
+        file_hash.multi_file_hasher_generator(file_path_list, ["sha1", "md5"])
+    )
+    assert len(results) == 4
+    for result in results:
+        assert result.file_hashes["md5"] == md5sum(result.file_path)
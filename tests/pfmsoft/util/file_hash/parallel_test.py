@@ -0,0 +1,70 @@
+from pathlib import Path
+
+import pytest
+
+from pfmsoft.util.file_hash import file_hash
+from pfmsoft.util.file_hash.parallel import parallel_file_hasher_generator
+
+
+@pytest.fixture(scope="function")
+def parallel_test_files(tmp_path):
+    test_data_root_dir = tmp_path / "parallel_hash_test_data"
+    (test_data_root_dir / "sub_dir").mkdir(parents=True)
+    file_paths = []
+    for count in range(25):
+        file_path = test_data_root_dir / "sub_dir" / f"test_file_{count}.bin"
+        file_path.write_bytes(bytes([count]) * (count * 1000))
+        file_paths.append(file_path)
+    return test_data_root_dir
+
+
+@pytest.mark.parametrize("executor_type", ["process", "thread"])
+def test_parallel_ordered(parallel_test_files: Path, executor_type):
+    file_path_list = sorted(parallel_test_files.glob("**/*"))
+    expected = list(file_hash.file_hasher_generator(file_path_list, "sha256"))
+    result = list(
+        parallel_file_hasher_generator(
+            file_path_list,
+            "sha256",
+            max_workers=2,
+            executor_type=executor_type,
+            max_in_flight=3,
+        )
+    )
+    assert result == expected
+    assert len(result) == 25
+
+
+def test_parallel_unordered(parallel_test_files: Path):
+    file_path_list = list(parallel_test_files.glob("**/*"))
+    expected = list(file_hash.file_hasher_generator(file_path_list, "md5"))
+    result = list(
+        parallel_file_hasher_generator(
+            iter(file_path_list),
+            "md5",
+            max_workers=3,
+            executor_type="thread",
+            ordered=False,
+            max_in_flight=2,
+        )
+    )
+    assert sorted(result) == sorted(expected)
+
+
+def test_parallel_abandoned_generator(parallel_test_files: Path):
+    file_path_list = sorted(parallel_test_files.glob("**/*"))
+    gen = parallel_file_hasher_generator(
+        file_path_list, "md5", max_workers=2, executor_type="thread"
+    )
+    first = next(gen)
+    gen.close()
+    assert first == file_hash.file_hasher(file_path_list[1], "md5")
+
+
+def test_parallel_bad_arguments(parallel_test_files: Path):
+    file_path_list = list(parallel_test_files.glob("**/*"))
+    # Raised by the call itself, before any iteration.
+    with pytest.raises(ValueError):
+        parallel_file_hasher_generator(file_path_list, "not_a_hash")
+    with pytest.raises(ValueError):
+        parallel_file_hasher_generator(file_path_list, "md5", executor_type="greenlet")